@@ -0,0 +1,81 @@
+# addon_options.py
+"""
+Opções do add-on declaradas em config.yaml.
+
+O Supervisor grava as opções escolhidas pelo usuário em <INSTANCE_PATH>/options.json
+(/data/options.json dentro do container). Fora do Home Assistant o arquivo não
+existe e valem os padrões abaixo; variáveis de ambiente com o nome da opção em
+maiúsculas (ex.: LOG_LEVEL=debug) têm precedência sobre o arquivo.
+"""
+import json
+import os
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+# Padrões: o tipo do valor padrão define a conversão aplicada a overrides via ambiente
+PADROES = {
+    "log_level": "info",
+    "slow_query_ms": 0,          # 0 = log de consultas lentas desligado
+    "sqlite_journal_mode": "wal",
+    "sqlite_synchronous": "normal",
+    "sqlite_busy_timeout_ms": 5000,
+    "sqlite_cache_mb": 16,
+    "sqlite_mmap_mb": 64,
+    "db_pool_size": 5,
+    "db_max_overflow": 10,
+    "db_pool_timeout": 30,
+    "compress_responses": True,  # gzip/brotli negociado pelo Accept-Encoding (compressao.py)
+    "compress_min_bytes": 1024,  # respostas menores saem sem compressão
+    "prewarm_delay_s": 5,        # 0 = ReportLab/conversor só no primeiro uso (carregamento_tardio.py)
+    "user_cache_ttl_s": 30,      # 0 = user_loader consulta o banco em toda requisição
+    "user_cache_size": 256,
+    "password_hash_method": "scrypt",  # scrypt | pbkdf2 (senhas.py)
+    "password_scrypt_cost": 15,  # log2(N) do scrypt, 10-17
+    "password_pbkdf2_iterations": 1_000_000,  # iterações do pbkdf2, 100 000-10 000 000
+    "login_user_per_min": 5,     # tentativas de login por usuário; 0 = sem limite
+    "login_ip_per_min": 30,      # tentativas de login por IP; 0 = sem limite
+    "change_log_days": 30,       # retenção do log de /api/projeto/changes; 0 = sem poda
+}
+
+_opcoes = None
+
+
+def _converter(valor, padrao):
+    if isinstance(padrao, bool):
+        return str(valor).strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(padrao, int):
+        return int(valor)
+    if isinstance(padrao, float):
+        return float(valor)
+    return valor
+
+
+def carregar_opcoes(recarregar=False):
+    """Lê options.json uma vez por processo e aplica os overrides de ambiente."""
+    global _opcoes
+    if _opcoes is not None and not recarregar:
+        return _opcoes
+
+    opcoes = dict(PADROES)
+    instance_path = os.environ.get("INSTANCE_PATH", os.path.join(BASE_DIR, "instance"))
+    try:
+        with open(os.path.join(instance_path, "options.json"), encoding="utf-8") as f:
+            opcoes.update({k: v for k, v in json.load(f).items() if v is not None})
+    except (OSError, ValueError):
+        pass
+
+    for nome, padrao in PADROES.items():
+        valor = os.environ.get(nome.upper())
+        if valor is None:
+            continue
+        try:
+            opcoes[nome] = _converter(valor, padrao)
+        except ValueError:
+            pass
+
+    _opcoes = opcoes
+    return opcoes
+
+
+def opcao(nome, padrao=None):
+    return carregar_opcoes().get(nome, padrao)
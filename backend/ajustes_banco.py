@@ -0,0 +1,68 @@
+# ajustes_banco.py
+"""
+Ajustes do SQLite e do pool de conexões, lidos das opções do add-on.
+
+- journal_mode=WAL: leitores não bloqueiam durante escritas longas (importação,
+  auto-vinculação); só escritores concorrentes esperam um ao outro.
+- synchronous=NORMAL: seguro com WAL (só perde a última transação num corte de
+  energia, sem corromper o banco) e evita um fsync por commit.
+- mmap_size / cache_size: leituras servidas da memória em vez de read().
+- busy_timeout: escritores esperam o lock em vez de falhar com "database is locked".
+"""
+from addon_options import opcao
+
+JOURNAL_MODES = {"wal", "delete", "truncate", "persist", "memory"}
+SYNCHRONOUS = {"off", "normal", "full", "extra"}
+
+
+def opcoes_engine():
+    """Valor para SQLALCHEMY_ENGINE_OPTIONS (pool adequado a servidor com threads)."""
+    return {
+        "pool_size": opcao("db_pool_size"),
+        "max_overflow": opcao("db_max_overflow"),
+        "pool_timeout": opcao("db_pool_timeout"),
+        "connect_args": {
+            # Conexões do pool circulam entre as threads do servidor
+            "check_same_thread": False,
+            "timeout": opcao("sqlite_busy_timeout_ms") / 1000,
+        },
+    }
+
+
+def pragmas():
+    """PRAGMAs aplicados a cada nova conexão, na ordem."""
+    journal = str(opcao("sqlite_journal_mode")).lower()
+    synchronous = str(opcao("sqlite_synchronous")).lower()
+    return [
+        ("foreign_keys", "ON"),
+        ("journal_mode", journal if journal in JOURNAL_MODES else "wal"),
+        ("synchronous", synchronous if synchronous in SYNCHRONOUS else "normal"),
+        ("busy_timeout", int(opcao("sqlite_busy_timeout_ms"))),
+        # cache_size negativo = KiB
+        ("cache_size", -int(opcao("sqlite_cache_mb")) * 1024),
+        ("mmap_size", int(opcao("sqlite_mmap_mb")) * 1024 * 1024),
+        ("temp_store", "MEMORY"),
+    ]
+
+
+def aplicar_pragmas(dbapi_connection):
+    cursor = dbapi_connection.cursor()
+    try:
+        for nome, valor in pragmas():
+            cursor.execute(f"PRAGMA {nome}={valor}")
+    finally:
+        cursor.close()
+
+
+def iniciar_escrita(session):
+    """
+    Abre já a transação de escrita (BEGIN IMMEDIATE) na conexão da sessão.
+
+    O driver sqlite3 só emite BEGIN antes do primeiro INSERT/UPDATE/DELETE; um
+    SAVEPOINT executado antes disso vira a transação externa e o RELEASE dele
+    faz commit. Com o BEGIN explícito, begin_nested() fica de fato aninhado e o
+    lock de escrita é pego uma vez (esperando busy_timeout, se preciso).
+    """
+    conn = session.connection()
+    if not conn.connection.dbapi_connection.in_transaction:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
@@ -0,0 +1,183 @@
+# alocadores.py
+"""
+Alocação de endereços por projeto.
+
+SAK: cada circuito ocupa `quantidade_saks` endereços contíguos a partir de
+`sak` (luz 1, persiana 2, hvac nenhum). As faixas livres são reconstruídas a
+cada uso a partir do índice (projeto_id, sak), então lacunas deixadas por
+circuitos excluídos voltam a ser usadas. A leitura e o INSERT do circuito
+precisam estar na mesma transação de escrita: alocar_sak abre essa transação
+(BEGIN IMMEDIATE) antes de ler, e dois creates simultâneos não recebem o
+mesmo SAK.
+
+HSNET: endereço de barramento de cada dispositivo, único no projeto entre
+keypads e módulos. Cada classe de dispositivo tem uma faixa reservada
+(FAIXAS_HSNET): módulos a partir de 101 e keypads a partir de 110, como já
+numeravam o conversor e o next-hsnet, e controladores no fim do byte (245, o
+padrão do M4). Esgotada a faixa, a alocação segue pelos livres de 101 a
+HSNET_MAX e depois de 1 a 100; sem nenhum livre, levanta SemHsnetLivre.
+Os endereços ocupados vêm de uma única consulta (UNION pelos índices
+projeto_id, hsnet de keypad e módulo).
+"""
+import bisect
+import itertools
+
+from sqlalchemy import select, union_all
+
+from database import db, Circuito, Keypad, Modulo
+from ajustes_banco import iniciar_escrita
+
+
+def largura_sak(tipo):
+    """Quantos SAKs um circuito do tipo ocupa."""
+    if tipo == "hvac":
+        return 0
+    return 2 if tipo == "persiana" else 1
+
+
+class FaixasLivres:
+    """Endereços livres a partir de `inicio`: lacunas [a, b] ordenadas e uma cauda aberta."""
+
+    def __init__(self, ocupados, inicio=1):
+        """`ocupados`: pares (primeiro, largura) em qualquer ordem; sobreposições são toleradas."""
+        self.lacunas = []
+        proximo = inicio
+        for primeiro, largura in sorted(ocupados):
+            if primeiro > proximo:
+                self.lacunas.append([proximo, primeiro - 1])
+            proximo = max(proximo, primeiro + largura)
+        self.cauda = proximo
+
+    def alocar(self, largura):
+        """Reserva o primeiro bloco contíguo de `largura` endereços e retorna o início dele."""
+        for i, (a, b) in enumerate(self.lacunas):
+            if b - a + 1 >= largura:
+                if b - a + 1 == largura:
+                    del self.lacunas[i]
+                else:
+                    self.lacunas[i][0] = a + largura
+                return a
+        primeiro = self.cauda
+        self.cauda += largura
+        return primeiro
+
+    def alocar_varios(self, larguras):
+        return [self.alocar(largura) for largura in larguras]
+
+    def liberar(self, primeiro, largura):
+        """Devolve um bloco alocado (ex.: circuito excluído), fundindo com as faixas vizinhas."""
+        if largura <= 0:
+            return
+        ultimo = primeiro + largura - 1
+        if ultimo + 1 == self.cauda:
+            self.cauda = primeiro
+            if self.lacunas and self.lacunas[-1][1] + 1 == self.cauda:
+                self.cauda = self.lacunas.pop()[0]
+            return
+        i = bisect.bisect(self.lacunas, [primeiro, ultimo])
+        self.lacunas.insert(i, [primeiro, ultimo])
+        if i + 1 < len(self.lacunas) and self.lacunas[i + 1][0] == ultimo + 1:
+            self.lacunas[i][1] = self.lacunas.pop(i + 1)[1]
+        if i > 0 and self.lacunas[i - 1][1] + 1 == primeiro:
+            self.lacunas[i - 1][1] = self.lacunas.pop(i)[1]
+
+
+def faixas_sak(projeto_id):
+    """SAKs livres do projeto (uma consulta pelo índice projeto_id, sak)."""
+    ocupados = db.session.execute(
+        select(Circuito.sak, Circuito.quantidade_saks)
+        .where(Circuito.projeto_id == projeto_id, Circuito.sak.isnot(None))
+    ).all()
+    return FaixasLivres((sak, quantidade or 1) for sak, quantidade in ocupados)
+
+
+def alocar_sak(projeto_id, tipo):
+    """(sak, quantidade_saks) para um circuito novo do tipo; o INSERT deve vir na mesma transação."""
+    largura = largura_sak(tipo)
+    if not largura:
+        return None, 0
+    iniciar_escrita(db.session)
+    return faixas_sak(projeto_id).alocar(largura), largura
+
+
+# O endereço HSNET cabe em um byte; 0 e 255 não são de dispositivo
+HSNET_MAX = 254
+
+# Faixas reservadas por classe de dispositivo: (primeiro, último)
+FAIXAS_HSNET = {
+    "modulo": (101, 109),
+    "keypad": (110, 244),
+    "controlador": (245, 254),
+}
+
+
+class SemHsnetLivre(Exception):
+    """Não há HSNETs livres suficientes no projeto."""
+
+
+class EnderecosHsnet:
+    """HSNETs ocupados de um projeto, com alocação pela faixa de cada classe."""
+
+    def __init__(self, ocupados):
+        self.ocupados = set(ocupados)
+
+    def em_uso(self, hsnet):
+        return hsnet in self.ocupados
+
+    def reservar(self, hsnet):
+        self.ocupados.add(hsnet)
+
+    def liberar(self, hsnet):
+        self.ocupados.discard(hsnet)
+
+    def alocar(self, classe, quantidade=1):
+        """Reserva `quantidade` endereços livres, primeiro dentro da faixa da classe.
+
+        Levanta SemHsnetLivre, sem reservar nada, se não houver livres suficientes.
+        """
+        inicio, fim = FAIXAS_HSNET[classe]
+        candidatos = itertools.chain(range(inicio, fim + 1), range(101, HSNET_MAX + 1), range(1, 101))
+        alocados = []
+        for hsnet in candidatos:
+            if len(alocados) == quantidade:
+                break
+            if hsnet not in self.ocupados:
+                self.ocupados.add(hsnet)
+                alocados.append(hsnet)
+        if len(alocados) < quantidade:
+            self.ocupados.difference_update(alocados)
+            raise SemHsnetLivre("sem HSNET livre")
+        return alocados
+
+
+def _consulta_hsnets(projeto_id, exceto_keypad_id=None, exceto_modulo_id=None):
+    keypads = select(Keypad.hsnet).where(Keypad.projeto_id == projeto_id)
+    if exceto_keypad_id is not None:
+        keypads = keypads.where(Keypad.id != exceto_keypad_id)
+    modulos = select(Modulo.hsnet).where(Modulo.projeto_id == projeto_id, Modulo.hsnet.isnot(None))
+    if exceto_modulo_id is not None:
+        modulos = modulos.where(Modulo.id != exceto_modulo_id)
+    return keypads, modulos
+
+
+def hsnets_em_uso(projeto_id, exceto_keypad_id=None, exceto_modulo_id=None):
+    """Conjunto dos HSNETs ocupados no projeto por keypads e módulos."""
+    keypads, modulos = _consulta_hsnets(projeto_id, exceto_keypad_id, exceto_modulo_id)
+    return set(db.session.execute(union_all(keypads, modulos)).scalars())
+
+
+def hsnet_em_uso(projeto_id, hsnet, exceto_keypad_id=None, exceto_modulo_id=None):
+    """Se `hsnet` já está ocupado no projeto (uma consulta)."""
+    keypads, modulos = _consulta_hsnets(projeto_id, exceto_keypad_id, exceto_modulo_id)
+    consulta = union_all(keypads.where(Keypad.hsnet == hsnet), modulos.where(Modulo.hsnet == hsnet)).limit(1)
+    return db.session.execute(consulta).first() is not None
+
+
+def enderecos_hsnet(projeto_id):
+    return EnderecosHsnet(hsnets_em_uso(projeto_id))
+
+
+def alocar_hsnet(projeto_id, classe, quantidade=1):
+    """Lista de `quantidade` HSNETs livres da classe; os INSERTs devem vir na mesma transação."""
+    iniciar_escrita(db.session)
+    return enderecos_hsnet(projeto_id).alocar(classe, quantidade)
@@ -0,0 +1,232 @@
+# alteracoes.py
+"""
+Log de alterações por projeto, alimentado por eventos do ORM.
+
+Cada insert/update/delete de uma entidade do projeto gera uma linha em
+ProjetoAlteracao; o id dessa linha é a revisão usada por /api/projeto/changes.
+Alterações em filhos (botões de keypad, ações de cena) são registradas como
+update da entidade pai. Como o keypad serializado embute nome e id do circuito e
+da cena de cada botão, update ou delete de um Circuito/Cena também registra
+update dos keypads que os referenciam (no delete o banco zera as FKs com
+ON DELETE SET NULL, sem passar pelo ORM).
+
+Retenção: `podar_log` apaga as linhas mais antigas que `change_log_days` dias.
+De cada projeto podado sobra a linha mais nova do trecho apagado, regravada como
+marcador "poda": a revisão atual do projeto não recua e o marcador diz até onde
+o log foi apagado; um `since` anterior a ele recebe resync em /api/projeto/changes.
+"""
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, select, func, or_, text
+
+from database import (
+    db, Area, Ambiente, QuadroEletrico, Circuito, Modulo, Vinculacao,
+    Keypad, KeypadButton, Cena, Acao, CustomAcao, ProjetoAlteracao,
+)
+from escopo import pai
+
+# Entidades rastreadas -> nome usado no payload
+ENTIDADES = {
+    Area: "areas",
+    Ambiente: "ambientes",
+    QuadroEletrico: "quadros_eletricos",
+    Circuito: "circuitos",
+    Modulo: "modulos",
+    Vinculacao: "vinculacoes",
+    Keypad: "keypads",
+    Cena: "cenas",
+}
+
+_PENDENTES_KEY = "_alteracoes_pendentes"
+
+PODA = "poda"
+INTERVALO_PODA_S = 6 * 3600
+
+# Configurados por registrar_eventos; poda no próximo flush com alterações após `_proxima_poda`
+_retencao_dias = 0
+_proxima_poda = 0.0
+
+
+def _projeto_id(session, obj):
+    # Todas as entidades rastreadas têm projeto_id próprio (ver escopo.py), exceto Vinculacao
+    if isinstance(obj, Vinculacao):
+        modulo = pai(session, obj, "modulo", "modulo_id", Modulo)
+        return modulo.projeto_id if modulo else None
+    return obj.projeto_id
+
+
+def _entidade_pai(session, obj):
+    """Para filhos não rastreados, devolve a entidade rastreada que os contém."""
+    if isinstance(obj, KeypadButton):
+        return pai(session, obj, "keypad", "keypad_id", Keypad)
+    if isinstance(obj, Acao):
+        return pai(session, obj, "cena", "cena_id", Cena)
+    if isinstance(obj, CustomAcao):
+        acao = pai(session, obj, "acao", "acao_id", Acao)
+        return _entidade_pai(session, acao) if acao is not None else None
+    return None
+
+
+def _keypads_afetados(session, circuito_ids, cena_ids):
+    """(keypad_id, projeto_id) dos keypads com botões ligados aos circuitos/cenas."""
+    condicoes = []
+    if circuito_ids:
+        condicoes.append(KeypadButton.circuito_id.in_(circuito_ids))
+    if cena_ids:
+        condicoes.append(KeypadButton.cena_id.in_(cena_ids))
+    if not condicoes:
+        return []
+    return session.execute(
+        select(Keypad.id, Keypad.projeto_id)
+        .join(KeypadButton, KeypadButton.keypad_id == Keypad.id)
+        .where(or_(*condicoes))
+        .distinct()
+    ).all()
+
+
+def _coletar(session, flush_context, instances):
+    pendentes = session.info.setdefault(_PENDENTES_KEY, [])
+    novos = set(session.new)
+    referenciados = {Circuito: set(), Cena: set()}  # alterados/removidos que botões podem embutir
+
+    grupos = (("insert", session.new), ("update", session.dirty), ("delete", session.deleted))
+    with session.no_autoflush:
+        for operacao, objetos in grupos:
+            for obj in list(objetos):
+                if operacao == "update" and not session.is_modified(obj):
+                    continue
+
+                if type(obj) not in ENTIDADES:
+                    dono = _entidade_pai(session, obj)
+                    # Filho de uma entidade nova já está coberto pelo insert do pai
+                    if dono is None or dono in novos:
+                        continue
+                    obj, operacao = dono, "update"
+
+                projeto_id = _projeto_id(session, obj)
+                if projeto_id is not None:
+                    pendentes.append((obj, ENTIDADES[type(obj)], operacao, projeto_id))
+                if type(obj) in referenciados and obj not in novos:
+                    referenciados[type(obj)].add(obj.id)
+
+        for keypad_id, projeto_id in _keypads_afetados(session, referenciados[Circuito], referenciados[Cena]):
+            pendentes.append((keypad_id, "keypads", "update", projeto_id))
+
+
+def _gravar(session, flush_context):
+    pendentes = session.info.pop(_PENDENTES_KEY, None)
+    if not pendentes:
+        return
+
+    # Uma linha por entidade e flush; insert/delete prevalecem sobre update
+    linhas = {}
+    for obj, entidade, operacao, projeto_id in pendentes:
+        entidade_id = obj if isinstance(obj, int) else obj.id  # keypads afetados vêm só pelo id
+        if entidade_id is None:
+            continue
+        chave = (entidade, entidade_id)
+        atual = linhas.get(chave)
+        if atual is None or atual["operacao"] == "update":
+            linhas[chave] = {
+                "projeto_id": projeto_id,
+                "entidade": entidade,
+                "entidade_id": entidade_id,
+                "operacao": operacao,
+            }
+
+    conn = session.connection()
+    conn.execute(ProjetoAlteracao.__table__.insert(), list(linhas.values()))
+
+    global _proxima_poda
+    if _retencao_dias and time.monotonic() >= _proxima_poda:
+        _proxima_poda = time.monotonic() + INTERVALO_PODA_S
+        podar_log(conn, _retencao_dias)
+
+
+def _descartar(session, *args):
+    session.info.pop(_PENDENTES_KEY, None)
+
+
+def podar_log(conn, dias):
+    """
+    Apaga as alterações com mais de `dias` dias, deixando um marcador por projeto.
+
+    Retorna quantas linhas foram apagadas.
+    """
+    limite = datetime.utcnow() - timedelta(days=dias)
+    # ids crescem com o tempo: o corte é a revisão mais nova anterior ao limite
+    corte = conn.execute(
+        select(func.max(ProjetoAlteracao.id)).where(ProjetoAlteracao.criado_em < limite)
+    ).scalar()
+    if corte is None:
+        return 0
+    mais_novas = "SELECT MAX(id) FROM projeto_alteracao WHERE id <= :corte GROUP BY projeto_id"
+    apagadas = conn.execute(
+        text(f"DELETE FROM projeto_alteracao WHERE id <= :corte AND id NOT IN ({mais_novas})"),
+        {"corte": corte},
+    ).rowcount
+    conn.execute(
+        text(f"UPDATE projeto_alteracao SET entidade = :poda, operacao = :poda, entidade_id = 0 "
+             f"WHERE id IN ({mais_novas})"),
+        {"corte": corte, "poda": PODA},
+    )
+    return apagadas
+
+
+def registrar_eventos(session, retencao_dias=0):
+    """
+    Liga os listeners de flush na sessão (ou scoped_session) informada.
+
+    Com `retencao_dias` > 0 o log é podado (ver `podar_log`) a cada INTERVALO_PODA_S
+    segundos, no flush que grava alterações.
+    """
+    global _retencao_dias
+    _retencao_dias = retencao_dias
+    event.listen(session, "before_flush", _coletar)
+    event.listen(session, "after_flush", _gravar)
+    event.listen(session, "after_rollback", _descartar)
+
+
+def revisao_atual(projeto_id):
+    """Última revisão registrada para o projeto (0 se não houver alterações)."""
+    return db.session.execute(
+        select(func.coalesce(func.max(ProjetoAlteracao.id), 0))
+        .where(ProjetoAlteracao.projeto_id == projeto_id)
+    ).scalar_one()
+
+
+def revisao_podada(projeto_id):
+    """Revisão até a qual o log do projeto foi podado (0 se nunca foi)."""
+    return db.session.execute(
+        select(func.coalesce(func.max(ProjetoAlteracao.id), 0))
+        .where(ProjetoAlteracao.projeto_id == projeto_id, ProjetoAlteracao.operacao == PODA)
+    ).scalar_one()
+
+
+def alteracoes_desde(projeto_id, revisao):
+    """
+    Consolida o log a partir de `revisao` (exclusiva).
+
+    Retorna (revisao_final, {entidade: {"alterados": set(ids), "removidos": set(ids)}}),
+    considerando apenas a última operação de cada entidade.
+    """
+    rows = db.session.execute(
+        select(ProjetoAlteracao.id, ProjetoAlteracao.entidade,
+               ProjetoAlteracao.entidade_id, ProjetoAlteracao.operacao)
+        .where(ProjetoAlteracao.projeto_id == projeto_id, ProjetoAlteracao.id > revisao,
+               ProjetoAlteracao.operacao != PODA)
+        .order_by(ProjetoAlteracao.id.asc())
+    ).all()
+
+    ultima_operacao = {}
+    revisao_final = revisao
+    for rev, entidade, entidade_id, operacao in rows:
+        ultima_operacao[(entidade, entidade_id)] = operacao
+        revisao_final = rev
+
+    resultado = {nome: {"alterados": set(), "removidos": set()} for nome in ENTIDADES.values()}
+    for (entidade, entidade_id), operacao in ultima_operacao.items():
+        destino = "removidos" if operacao == "delete" else "alterados"
+        resultado[entidade][destino].add(entidade_id)
+    return revisao_final, resultado
@@ -0,0 +1,1084 @@
+#!/usr/bin/env python3
+"""
+Benchmarks e verificações de desempenho do backend
+Execute: python bench.py <comando>   (python bench.py --help lista os comandos)
+
+Cada execução usa um banco SQLite temporário, nunca o instance/projetos.db.
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+# O app lê INSTANCE_PATH no import: aponta para um diretório descartável
+os.environ["INSTANCE_PATH"] = tempfile.mkdtemp(prefix="roehn-bench-")
+# Vários clientes logam em sequência: sem o limite de tentativas de /api/login
+os.environ.setdefault("LOGIN_USER_PER_MIN", "0")
+os.environ.setdefault("LOGIN_IP_PER_MIN", "0")
+
+# Adiciona o diretório atual ao path para importar os módulos
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import joinedload
+
+from app import app, db
+from rotas.keypads import serialize_keypad
+from rotas.cenas import serialize_cena
+from database import (
+    User, Projeto, Area, Ambiente, Circuito, Modulo, Vinculacao, QuadroEletrico,
+    Keypad, KeypadButton, Cena, Acao,
+)
+from operacoes_projeto import excluir_projeto
+from alocadores import FAIXAS_HSNET, alocar_hsnet
+from serializadores import keypads_serializados, cenas_serializadas
+import json_backend
+from roehn_converter import RoehnProjectConverter
+import compressao
+
+
+# ---------------------------------------------------------------- utilitários
+
+def cliente_admin():
+    """Test client autenticado com o admin padrão criado na inicialização do app."""
+    client = app.test_client()
+    resp = client.post("/api/login", json={"username": "admin", "password": "admin123"})
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    return client
+
+
+def selecionar_projeto(client, projeto_id):
+    resp = client.put("/api/projeto_atual", json={"projeto_id": projeto_id})
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+
+
+@contextmanager
+def contar_consultas():
+    """Conta os statements SQL executados dentro do bloco."""
+    contagem = {"n": 0}
+
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        contagem["n"] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _antes)
+    try:
+        yield contagem
+    finally:
+        event.remove(engine, "before_cursor_execute", _antes)
+
+
+def medir(fn, repeticoes=5):
+    """Executa fn `repeticoes` vezes e devolve a mediana em milissegundos."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def arquivo_importacao(exportado):
+    """Arquivo para /api/importar-projeto a partir de um export, com GUIDs novos."""
+    # GUIDs de cenas/botões são únicos no banco: cada importação recebe GUIDs novos
+    def renovar(no):
+        if isinstance(no, dict):
+            return {k: (str(uuid.uuid4()) if k == "guid" else renovar(v)) for k, v in no.items()}
+        if isinstance(no, list):
+            return [renovar(v) for v in no]
+        return no
+    return io.BytesIO(json.dumps(renovar(exportado)).encode("utf-8")), "bench.json"
+
+
+def criar_projeto(nome, circuitos=100, circuitos_por_ambiente=10, ambientes_por_area=5, vincular=True,
+                  keypads=0, cenas=0):
+    """
+    Cria um projeto com `circuitos` circuitos de luz, um quadro com um controlador
+    e módulos RL12 suficientes para vincular todos eles. Opcionalmente cria
+    `keypads` keypads de 4 botões e `cenas` cenas de 2 ações, distribuídos pelos
+    ambientes e apontando para os circuitos. Retorna o id do projeto.
+    """
+    with app.app_context():
+        admin = User.query.filter_by(username="admin").first()
+        projeto = Projeto(nome=nome, user_id=admin.id)
+        db.session.add(projeto)
+        db.session.flush()
+
+        n_ambientes = max(1, -(-circuitos // circuitos_por_ambiente))
+        n_areas = max(1, -(-n_ambientes // ambientes_por_area))
+        areas = [Area(nome=f"Área {i + 1}", projeto_id=projeto.id) for i in range(n_areas)]
+        db.session.add_all(areas)
+        db.session.flush()
+
+        ambientes = [
+            Ambiente(nome=f"Ambiente {i + 1}", area_id=areas[i // ambientes_por_area].id)
+            for i in range(n_ambientes)
+        ]
+        db.session.add_all(ambientes)
+        db.session.flush()
+
+        quadro = QuadroEletrico(nome="Quadro 1", ambiente_id=ambientes[0].id, projeto_id=projeto.id)
+        db.session.add(quadro)
+        db.session.flush()
+
+        controlador = Modulo(nome="AQL-GV-M4", tipo="AQL-GV-M4", quantidade_canais=0, projeto_id=projeto.id,
+                             hsnet=245, dev_id=245, is_controller=True, is_logic_server=True,
+                             quadro_eletrico_id=quadro.id)
+        db.session.add(controlador)
+        db.session.flush()
+
+        lista_circuitos = [
+            Circuito(identificador=f"C{i + 1:04d}", nome=f"Luz {i + 1}", tipo="luz", potencia=60.0,
+                     ambiente_id=ambientes[i // circuitos_por_ambiente].id, sak=i + 1, quantidade_saks=1)
+            for i in range(circuitos)
+        ]
+        db.session.add_all(lista_circuitos)
+        db.session.flush()
+
+        if vincular:
+            modulos = [
+                Modulo(nome=f"RL12 {i + 1}", tipo="RL12", quantidade_canais=12, projeto_id=projeto.id,
+                       hsnet=i + 1, dev_id=i + 1, quadro_eletrico_id=quadro.id,
+                       parent_controller_id=controlador.id)
+                for i in range(-(-circuitos // 12))
+            ]
+            db.session.add_all(modulos)
+            db.session.flush()
+            db.session.add_all([
+                Vinculacao(circuito_id=c.id, modulo_id=modulos[i // 12].id, canal=i % 12 + 1)
+                for i, c in enumerate(lista_circuitos)
+            ])
+
+        if keypads:
+            lista_keypads = [
+                Keypad(nome=f"Keypad {i + 1}", hsnet=110 + i, dev_id=110 + i, button_count=4,
+                       ambiente_id=ambientes[i % n_ambientes].id, projeto_id=projeto.id)
+                for i in range(keypads)
+            ]
+            db.session.add_all(lista_keypads)
+            db.session.flush()
+            db.session.add_all([
+                KeypadButton(keypad_id=k.id, ordem=ordem, circuito_id=lista_circuitos[(i * 4 + ordem) % circuitos].id)
+                for i, k in enumerate(lista_keypads)
+                for ordem in range(1, 5)
+            ])
+
+        if cenas:
+            lista_cenas = [
+                Cena(nome=f"Cena {i + 1}", ambiente_id=ambientes[i % n_ambientes].id)
+                for i in range(cenas)
+            ]
+            db.session.add_all(lista_cenas)
+            db.session.flush()
+            db.session.add_all([
+                Acao(cena_id=c.id, level=100 if j == 0 else 50, action_type=0,
+                     target_guid=str(lista_circuitos[(i * 2 + j) % circuitos].id))
+                for i, c in enumerate(lista_cenas)
+                for j in range(2)
+            ])
+
+        db.session.commit()
+        return projeto.id
+
+
+# ---------------------------------------------------------------- comandos
+
+CONSULTAS_ENDPOINTS = ["/api/circuitos", "/api/vinculacoes", "/api/vinculacao/options", "/api/modulos"]
+
+
+def cmd_consultas(args):
+    """Garante que as listagens executam um número constante de consultas (sem N+1)."""
+    client = cliente_admin()
+    pequeno = criar_projeto("Bench consultas pequeno", circuitos=10)
+    grande = criar_projeto("Bench consultas grande", circuitos=args.circuitos)
+
+    falhas = 0
+    for url in CONSULTAS_ENDPOINTS:
+        contagens = []
+        for projeto_id in (pequeno, grande):
+            selecionar_projeto(client, projeto_id)
+            with contar_consultas() as contagem:
+                resp = client.get(url)
+            assert resp.status_code == 200, resp.get_data(as_text=True)
+            contagens.append(contagem["n"])
+
+        ok = contagens[0] == contagens[1] and contagens[1] <= args.max_consultas
+        falhas += 0 if ok else 1
+        print(f"{'✓' if ok else '✗'} {url}: {contagens[0]} consultas (10 circuitos), "
+              f"{contagens[1]} consultas ({args.circuitos} circuitos)")
+
+    return 1 if falhas else 0
+
+
+def cmd_modulos(args):
+    """Latência de /api/modulos conforme o número de módulos cresce."""
+    client = cliente_admin()
+    print(f"{'módulos':>8} {'consultas':>10} {'mediana (ms)':>13} {'ms/módulo':>10}")
+    for n_modulos in args.tamanhos:
+        projeto_id = criar_projeto(f"Bench módulos {n_modulos}", circuitos=n_modulos * 12)
+        selecionar_projeto(client, projeto_id)
+        with contar_consultas() as contagem:
+            resp = client.get("/api/modulos")
+        assert resp.status_code == 200, resp.get_data(as_text=True)
+        ms = medir(lambda: client.get("/api/modulos"), args.repeticoes)
+        print(f"{n_modulos:>8} {contagem['n']:>10} {ms:>13.1f} {ms / n_modulos:>10.3f}")
+    return 0
+
+
+def _remover_indices_fk():
+    """Remove os índices ix_* criados a partir de index=True (simula o schema antigo)."""
+    with app.app_context():
+        with db.engine.begin() as conn:
+            nomes = [r[0] for r in conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'ix\\_%' ESCAPE '\\' "
+                "AND name != 'ix_projeto_alteracao_projeto_rev'"
+            )]
+            for nome in nomes:
+                conn.exec_driver_sql(f'DROP INDEX "{nome}"')
+    return len(nomes)
+
+
+def _medir_projetos(client, projetos, exclusoes, repeticoes):
+    """Mediana de /api/projeto_tree no projeto do meio e de DELETE /api/projetos/<id>."""
+    selecionar_projeto(client, projetos[len(projetos) // 2])
+    tree_ms = medir(lambda: client.get("/api/projeto_tree"), repeticoes)
+
+    tempos = []
+    for projeto_id in projetos[:exclusoes]:
+        inicio = time.perf_counter()
+        resp = client.delete(f"/api/projetos/{projeto_id}")
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        assert resp.status_code == 200, resp.get_data(as_text=True)
+    return tree_ms, statistics.median(tempos)
+
+
+def cmd_indices(args):
+    """Exclusão de projeto e /api/projeto_tree com N projetos, com e sem os índices de FK."""
+    client = cliente_admin()
+    print(f"Criando {args.projetos} projetos com {args.circuitos} circuitos, "
+          f"{args.keypads} keypads e {args.cenas} cenas cada...")
+    projetos = [
+        criar_projeto(f"Bench índices {i + 1}", circuitos=args.circuitos, keypads=args.keypads, cenas=args.cenas)
+        for i in range(args.projetos)
+    ]
+
+    com = _medir_projetos(client, projetos, args.exclusoes, args.repeticoes)
+    removidos = _remover_indices_fk()
+    sem = _medir_projetos(client, projetos[args.exclusoes:], args.exclusoes, args.repeticoes)
+
+    print(f"{'':22} {'com índices':>12} {'sem índices':>12}   ({removidos} índices removidos)")
+    print(f"{'projeto_tree (ms)':22} {com[0]:>12.1f} {sem[0]:>12.1f}")
+    print(f"{'excluir projeto (ms)':22} {com[1]:>12.1f} {sem[1]:>12.1f}")
+    return 0
+
+
+def _leitores(n_threads, projeto_id, parar):
+    """Threads que chamam /api/projeto_tree até `parar` ser sinalizado."""
+    resultados = {"latencias": [], "falhas": 0}
+    lock = threading.Lock()
+
+    def leitor():
+        client = cliente_admin()
+        selecionar_projeto(client, projeto_id)
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            resp = client.get("/api/projeto_tree")
+            ms = (time.perf_counter() - inicio) * 1000
+            with lock:
+                if resp.status_code == 200:
+                    resultados["latencias"].append(ms)
+                else:
+                    resultados["falhas"] += 1
+
+    threads = [threading.Thread(target=leitor) for _ in range(n_threads)]
+    for t in threads:
+        t.start()
+    return threads, resultados
+
+
+def _resumo_latencias(rotulo, resultados, segundos):
+    lat = sorted(resultados["latencias"])
+    if not lat:
+        print(f"{rotulo:28} nenhuma leitura concluída ({resultados['falhas']} falhas)")
+        return
+    p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+    print(f"{rotulo:28} {len(lat) / segundos:>7.1f} req/s  p50 {statistics.median(lat):>7.1f} ms  "
+          f"p95 {p95:>7.1f} ms  máx {lat[-1]:>7.1f} ms  falhas {resultados['falhas']}")
+
+
+def cmd_concorrencia(args):
+    """Leitores em /api/projeto_tree com e sem uma importação de projeto rodando."""
+    with app.app_context():
+        with db.engine.connect() as conn:
+            journal = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+    print(f"journal_mode={journal}, {args.leitores} leitores, {args.segundos}s por fase")
+
+    leitura = criar_projeto("Bench concorrência leitura", circuitos=200, keypads=20, cenas=20)
+    origem = criar_projeto("Bench concorrência import", circuitos=args.circuitos_import,
+                           keypads=args.circuitos_import // 10, cenas=args.circuitos_import // 10)
+    escritor = cliente_admin()
+    exportado = escritor.get(f"/exportar-projeto/{origem}").get_json()
+
+    for fase in ("sem importação", "com importação"):
+        parar = threading.Event()
+        threads, resultados = _leitores(args.leitores, leitura, parar)
+        importacoes = []
+        inicio_fase = time.perf_counter()
+        try:
+            fim = inicio_fase + args.segundos
+            while time.perf_counter() < fim:
+                if fase == "sem importação":
+                    time.sleep(0.05)
+                    continue
+                arquivo = arquivo_importacao(exportado)
+                inicio = time.perf_counter()
+                resp = escritor.post("/api/importar-projeto", data={"file": arquivo},
+                                     content_type="multipart/form-data")
+                assert resp.status_code == 200, resp.get_data(as_text=True)
+                importacoes.append((time.perf_counter() - inicio) * 1000)
+        finally:
+            parar.set()
+            for t in threads:
+                t.join()
+        _resumo_latencias(f"projeto_tree {fase}", resultados, time.perf_counter() - inicio_fase)
+        if importacoes:
+            print(f"{'':28} {len(importacoes)} importações, mediana {statistics.median(importacoes):.0f} ms")
+    return 0
+
+
+def _contagens(projeto_id):
+    """Linhas por tabela pertencentes ao projeto."""
+    with app.app_context():
+        cenas = select(Cena.id).where(Cena.projeto_id == projeto_id)
+        circuitos = select(Circuito.id).where(Circuito.projeto_id == projeto_id)
+        consultas = {
+            "areas": select(func.count()).where(Area.projeto_id == projeto_id),
+            "ambientes": select(func.count()).where(Ambiente.projeto_id == projeto_id),
+            "quadros": select(func.count()).where(QuadroEletrico.projeto_id == projeto_id),
+            "modulos": select(func.count()).where(Modulo.projeto_id == projeto_id),
+            "circuitos": select(func.count()).where(Circuito.projeto_id == projeto_id),
+            "vinculacoes": select(func.count()).where(Vinculacao.circuito_id.in_(circuitos)),
+            "keypads": select(func.count()).where(Keypad.projeto_id == projeto_id),
+            "botoes": select(func.count()).where(KeypadButton.projeto_id == projeto_id),
+            "cenas": select(func.count()).where(Cena.projeto_id == projeto_id),
+            "acoes": select(func.count()).where(Acao.cena_id.in_(cenas)),
+        }
+        return {nome: db.session.execute(q).scalar() for nome, q in consultas.items()}
+
+
+def _conferir_clone(origem, clone):
+    """Clone tem as mesmas contagens e as ações apontam para circuitos do próprio clone."""
+    assert _contagens(origem) == _contagens(clone), (_contagens(origem), _contagens(clone))
+    with app.app_context():
+        circuitos = {str(i) for i in db.session.execute(
+            select(Circuito.id).where(Circuito.projeto_id == clone)).scalars()}
+        alvos = db.session.execute(
+            select(Acao.target_guid).join(Cena).where(Cena.projeto_id == clone, Acao.action_type == 0)
+        ).scalars().all()
+        assert alvos and set(alvos) <= circuitos, "target_guid não remapeado"
+        guids = db.session.execute(select(Cena.guid).where(Cena.projeto_id.in_([origem, clone]))).scalars().all()
+        assert len(guids) == len(set(guids)), "GUIDs de cena repetidos"
+
+
+def cmd_clonar(args):
+    """Clonagem no servidor (INSERT ... SELECT) contra exportar + importar JSON."""
+    client = cliente_admin()
+    print(f"{'circuitos':>10} {'clonar (ms)':>12} {'export+import (ms)':>19} {'ganho':>7}")
+    for n in args.tamanhos:
+        origem = criar_projeto(f"Bench clonagem {n}", circuitos=n, keypads=max(1, n // 10),
+                               cenas=max(1, n // 10))
+        clones = []
+
+        def clonar():
+            resp = client.post(f"/api/projetos/{origem}/clonar", json={})
+            assert resp.status_code == 200, resp.get_data(as_text=True)
+            clones.append(resp.get_json()["id"])
+
+        def exportar_importar():
+            exportado = client.get(f"/exportar-projeto/{origem}").get_json()
+            resp = client.post("/api/importar-projeto", data={"file": arquivo_importacao(exportado)},
+                               content_type="multipart/form-data")
+            assert resp.status_code == 200, resp.get_data(as_text=True)
+
+        t_clone = medir(clonar, args.repeticoes)
+        t_import = medir(exportar_importar, args.repeticoes)
+        _conferir_clone(origem, clones[-1])
+        print(f"{n:>10} {t_clone:>12.1f} {t_import:>19.1f} {t_import / t_clone:>6.1f}x")
+    return 0
+
+
+def _excluir_medindo(projeto_id, conjunto):
+    """Apaga o projeto e devolve (ms, pico de memória alocada em MiB)."""
+    with app.app_context():
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        if conjunto:
+            excluir_projeto(projeto_id)
+        else:
+            db.session.delete(db.session.get(Projeto, projeto_id))
+        db.session.commit()
+        ms = (time.perf_counter() - inicio) * 1000
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return ms, pico / 2**20
+
+
+def cmd_excluir(args):
+    """Exclusão de projeto: cascade do ORM x DELETEs por tabela."""
+    client = cliente_admin()
+    print(f"{'circuitos':>10} {'ORM (ms)':>9} {'ORM (MiB)':>10} {'SQL (ms)':>9} {'SQL (MiB)':>10}")
+    for n in args.tamanhos:
+        origem = criar_projeto(f"Bench exclusão {n}", circuitos=n, keypads=max(1, n // 10),
+                               cenas=max(1, n // 10))
+        # A cópia (clonagem no servidor) garante dois projetos idênticos
+        resp = client.post(f"/api/projetos/{origem}/clonar", json={})
+        assert resp.status_code == 200, resp.get_data(as_text=True)
+        copia = resp.get_json()["id"]
+
+        orm_ms, orm_mib = _excluir_medindo(origem, conjunto=False)
+        sql_ms, sql_mib = _excluir_medindo(copia, conjunto=True)
+        assert not any(_contagens(copia).values()), _contagens(copia)
+        with app.app_context():
+            with db.engine.connect() as conn:
+                orfaos = conn.exec_driver_sql("PRAGMA foreign_key_check").fetchall()
+        assert not orfaos, orfaos
+        print(f"{n:>10} {orm_ms:>9.1f} {orm_mib:>10.2f} {sql_ms:>9.1f} {sql_mib:>10.2f}")
+    return 0
+
+
+def cmd_admin_projetos(args):
+    """Listagem paginada /api/admin/projetos com muitos projetos arquivados."""
+    client = cliente_admin()
+    modelo = criar_projeto("Bench listagem modelo", circuitos=args.circuitos, keypads=2, cenas=2)
+    print(f"Clonando {args.projetos} projetos de {args.circuitos} circuitos...")
+    for i in range(args.projetos - 1):
+        resp = client.post(f"/api/projetos/{modelo}/clonar", json={})
+        assert resp.status_code == 200, resp.get_data(as_text=True)
+    with app.app_context():
+        # A maioria arquivada, como numa instalação antiga
+        db.session.execute(Projeto.__table__.update().where(Projeto.id % 10 != 0).values(status="CONCLUIDO"))
+        db.session.commit()
+
+    casos = {
+        "página 1 por id": "/api/admin/projetos?per_page=50",
+        "última página": f"/api/admin/projetos?per_page=50&page={args.projetos // 50}",
+        "ativos por nome": "/api/admin/projetos?status=ATIVO&sort=nome",
+        "mais circuitos": "/api/admin/projetos?sort=circuitos&order=desc",
+        "busca por nome": "/api/admin/projetos?q=cópia 1",
+    }
+    for rotulo, url in casos.items():
+        def chamar():
+            resp = client.get(url)
+            assert resp.status_code == 200, resp.get_data(as_text=True)
+            return resp.get_json()
+        with contar_consultas() as contagem:
+            dados = chamar()
+        ms = medir(chamar, args.repeticoes)
+        print(f"{rotulo:20} {ms:>7.1f} ms  {contagem['n']} consultas  total={dados['total']}")
+    return 0
+
+
+@contextmanager
+def contar_commits():
+    """Conta os COMMITs (fsyncs) feitos dentro do bloco."""
+    contagem = {"n": 0}
+
+    def _commit(conn):
+        contagem["n"] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "commit", _commit)
+    try:
+        yield contagem
+    finally:
+        event.remove(engine, "commit", _commit)
+
+
+def cmd_lote(args):
+    """N circuitos + vinculações: uma requisição por linha x um /api/bulk."""
+    client = cliente_admin()
+    print(f"{'itens':>6} {'por linha (ms)':>15} {'commits':>8} {'lote (ms)':>10} {'commits':>8}")
+    for n in args.tamanhos:
+        tempos, commits = {}, {}
+        for modo in ("linha", "lote"):
+            # Os RL12 criados para os n circuitos iniciais ficam livres para os n novos
+            pid = criar_projeto(f"Bench lote {modo} {n}", circuitos=n, circuitos_por_ambiente=n)
+            selecionar_projeto(client, pid)
+            with app.app_context():
+                db.session.execute(Vinculacao.__table__.delete())
+                db.session.commit()
+                ambiente_id = db.session.execute(select(Ambiente.id).where(Ambiente.projeto_id == pid)).scalar()
+                modulos = db.session.execute(
+                    select(Modulo.id).where(Modulo.projeto_id == pid, Modulo.tipo == "RL12")).scalars().all()
+            circuitos = [{"identificador": f"N{i}", "nome": f"Novo {i}", "tipo": "luz", "ambiente_id": ambiente_id}
+                         for i in range(n)]
+
+            inicio = time.perf_counter()
+            with contar_commits() as contagem:
+                if modo == "linha":
+                    ids = []
+                    for dados in circuitos:
+                        resp = client.post("/api/circuitos", json=dados)
+                        assert resp.status_code == 200, resp.get_data(as_text=True)
+                        ids.append(resp.get_json()["id"])
+                    for i, cid in enumerate(ids):
+                        resp = client.post("/api/vinculacoes", json={
+                            "circuito_id": cid, "modulo_id": modulos[i // 12], "canal": i % 12 + 1})
+                        assert resp.status_code == 200, resp.get_data(as_text=True)
+                else:
+                    resp = client.post("/api/bulk", json={"operations": [
+                        {"entity": "circuitos", "op": "create", "data": dados} for dados in circuitos]})
+                    assert resp.get_json()["ok"], resp.get_data(as_text=True)
+                    ids = [r["id"] for r in resp.get_json()["results"]]
+                    resp = client.post("/api/bulk", json={"operations": [
+                        {"entity": "vinculacoes", "op": "create",
+                         "data": {"circuito_id": cid, "modulo_id": modulos[i // 12], "canal": i % 12 + 1}}
+                        for i, cid in enumerate(ids)]})
+                    assert resp.get_json()["ok"], resp.get_data(as_text=True)
+            tempos[modo] = (time.perf_counter() - inicio) * 1000
+            commits[modo] = contagem["n"]
+        print(f"{n:>6} {tempos['linha']:>15.1f} {commits['linha']:>8} {tempos['lote']:>10.1f} {commits['lote']:>8}")
+    return 0
+
+
+def _faixas_sobrepostas(projeto_id):
+    """Pares de circuitos do projeto cujas faixas de SAK se sobrepõem."""
+    with app.app_context():
+        faixas = sorted(db.session.execute(
+            select(Circuito.sak, Circuito.quantidade_saks)
+            .where(Circuito.projeto_id == projeto_id, Circuito.sak.isnot(None))).all())
+    return [(a, b) for a, b in zip(faixas, faixas[1:]) if a[0] + (a[1] or 1) > b[0]]
+
+
+def cmd_saks(args):
+    """Alocação de SAK: reaproveitamento de lacunas e creates concorrentes."""
+    client = cliente_admin()
+    pid = criar_projeto("Bench SAK lacunas", circuitos=args.circuitos, circuitos_por_ambiente=args.circuitos,
+                        vincular=False)
+    selecionar_projeto(client, pid)
+    with app.app_context():
+        circuitos = db.session.execute(
+            select(Circuito.id, Circuito.ambiente_id).where(Circuito.projeto_id == pid).order_by(Circuito.sak)).all()
+    # Exclui dois de cada cinco circuitos vizinhos: lacunas de 2 SAKs, cabem persianas
+    excluidos = [cid for i, (cid, _) in enumerate(circuitos) if i % 5 in (1, 2)]
+    for cid in excluidos:
+        assert client.delete(f"/api/circuitos/{cid}").status_code == 200
+    ambiente_id = circuitos[0].ambiente_id
+    saks = []
+    for i in range(len(excluidos) // 2):
+        resp = client.post("/api/circuitos", json={"identificador": f"P{i}", "nome": f"Persiana {i}",
+                                                   "tipo": "persiana", "ambiente_id": ambiente_id})
+        assert resp.status_code == 200, resp.get_data(as_text=True)
+        saks.append(resp.get_json()["sak"])
+    maior = max(saks)
+    print(f"lacunas: {len(excluidos)} SAKs livres, {len(saks)} persianas alocadas até o SAK {maior} "
+          f"(projeto tinha {args.circuitos}); sobreposições: {len(_faixas_sobrepostas(pid))}")
+
+    pid = criar_projeto("Bench SAK concorrência", circuitos=10, vincular=False)
+    with app.app_context():
+        ambiente_id = db.session.execute(select(Ambiente.id).where(Ambiente.projeto_id == pid)).scalar()
+    falhas = []
+
+    def criador(n):
+        c = cliente_admin()
+        selecionar_projeto(c, pid)
+        for i in range(args.por_thread):
+            tipo = "persiana" if i % 3 == 0 else "luz"
+            resp = c.post("/api/circuitos", json={"identificador": f"T{n}-{i}", "nome": "x", "tipo": tipo,
+                                                  "ambiente_id": ambiente_id})
+            if resp.status_code != 200:
+                falhas.append(resp.get_data(as_text=True))
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=criador, args=(n,)) for n in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    segundos = time.perf_counter() - inicio
+    sobrepostas = _faixas_sobrepostas(pid)
+    total = args.threads * args.por_thread
+    print(f"concorrência: {args.threads} threads x {args.por_thread} creates em {segundos:.1f}s "
+          f"({total / segundos:.0f}/s), falhas {len(falhas)}, sobreposições {len(sobrepostas)}")
+    return 1 if sobrepostas or falhas else 0
+
+
+def _proximo_hsnet_antigo(projeto_id):
+    # Como /api/keypads/next-hsnet fazia: carrega keypads e módulos e conta a partir de 110
+    usados = {k.hsnet for k in Keypad.query.filter_by(projeto_id=projeto_id).all() if k.hsnet}
+    usados |= {m.hsnet for m in Modulo.query.filter_by(projeto_id=projeto_id).all() if m.hsnet}
+    hs = 110
+    while hs in usados:
+        hs += 1
+    return hs
+
+
+def _hsnets_antigo(projeto_id, quantidade):
+    # Como o loop da importação do planner fazia: duas consultas por endereço testado
+    hsnets, hs = [], 110
+    while len(hsnets) < quantidade:
+        if (Keypad.query.filter_by(hsnet=hs, projeto_id=projeto_id).first() is None
+                and Modulo.query.filter_by(hsnet=hs, projeto_id=projeto_id).first() is None):
+            hsnets.append(hs)
+        hs += 1
+    return hsnets
+
+
+def _hsnets_repetidos(projeto_id):
+    with app.app_context():
+        todos = db.session.execute(select(Keypad.hsnet).where(Keypad.projeto_id == projeto_id)).scalars().all()
+        todos += db.session.execute(select(Modulo.hsnet).where(
+            Modulo.projeto_id == projeto_id, Modulo.hsnet.isnot(None))).scalars().all()
+    return len(todos) - len(set(todos))
+
+
+def cmd_hsnet(args):
+    """Alocação de HSNET: próximo livre, lote de N endereços e creates concorrentes."""
+    client = cliente_admin()
+    pid = criar_projeto("Bench HSNET", circuitos=args.circuitos, keypads=args.keypads)
+    selecionar_projeto(client, pid)
+
+    with app.app_context():
+        with contar_consultas() as c:
+            antigo = _proximo_hsnet_antigo(pid)
+        consultas_antigo = c["n"]
+        t_antigo = medir(lambda: _proximo_hsnet_antigo(pid), args.repeticoes)
+    with contar_consultas() as c:
+        resp = client.get("/api/keypads/next-hsnet")
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    novo = resp.get_json()["hsnet"]
+    consultas_novo = c["n"]
+    t_novo = medir(lambda: client.get("/api/keypads/next-hsnet"), args.repeticoes)
+    print(f"próximo HSNET ({args.keypads} keypads, {-(-args.circuitos // 12) + 1} módulos): "
+          f"antes {antigo} em {t_antigo:.1f} ms/{consultas_antigo} consultas; "
+          f"agora {novo} em {t_novo:.1f} ms/{consultas_novo} consultas (requisição inteira)")
+
+    with app.app_context():
+        with contar_consultas() as c:
+            antigos = _hsnets_antigo(pid, args.lote)
+        consultas_antigo = c["n"]
+        with contar_consultas() as c:
+            novos = alocar_hsnet(pid, "keypad", args.lote)
+        db.session.rollback()
+    print(f"lote de {args.lote} endereços: antes {consultas_antigo} consultas, agora {c['n']}; "
+          f"faixa keypad {FAIXAS_HSNET['keypad']}: {novos[0]}..{novos[-1]} (antes {antigos[0]}..{antigos[-1]})")
+
+    with app.app_context():
+        ambiente_id = db.session.execute(select(Ambiente.id).where(Ambiente.projeto_id == pid)).scalar()
+    falhas = []
+
+    def criador(n):
+        c = cliente_admin()
+        selecionar_projeto(c, pid)
+        for i in range(args.por_thread):
+            resp = c.post("/api/keypads", json={"nome": f"T{n}-{i}", "ambiente_id": ambiente_id})
+            if resp.status_code != 200:
+                falhas.append(resp.get_data(as_text=True))
+
+    threads = [threading.Thread(target=criador, args=(n,)) for n in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    repetidos = _hsnets_repetidos(pid)
+    print(f"concorrência: {args.threads} threads x {args.por_thread} keypads sem HSNET, "
+          f"falhas {len(falhas)}, HSNETs repetidos {repetidos}")
+    return 1 if repetidos or falhas else 0
+
+
+def _keypads_orm(projeto_id):
+    # Como /api/keypads serializava: objetos com joinedload + serialize_keypad
+    keypads = (
+        Keypad.query
+        .join(Ambiente, Keypad.ambiente_id == Ambiente.id)
+        .filter(Keypad.projeto_id == projeto_id)
+        .options(
+            joinedload(Keypad.ambiente).joinedload(Ambiente.area),
+            joinedload(Keypad.buttons).joinedload(KeypadButton.circuito),
+        )
+        .order_by(Ambiente.nome.asc(), Keypad.nome.asc(), Keypad.id.asc())
+        .all()
+    )
+    return [serialize_keypad(k) for k in keypads]
+
+
+def _cenas_orm(projeto_id):
+    # Como /api/cenas serializava: objetos com joinedload + serialize_cena
+    cenas = (
+        Cena.query
+        .join(Ambiente, Cena.ambiente_id == Ambiente.id)
+        .join(Area, Ambiente.area_id == Area.id)
+        .filter(Cena.projeto_id == projeto_id)
+        .options(
+            joinedload(Cena.ambiente).joinedload(Ambiente.area),
+            joinedload(Cena.acoes).joinedload(Acao.custom_acoes),
+        )
+        .order_by(Area.nome, Ambiente.nome, Cena.nome)
+        .all()
+    )
+    return [serialize_cena(c) for c in cenas]
+
+
+def _medir_serializacao(rotulo, fn, repeticoes):
+    with app.app_context():
+        with contar_consultas() as c:
+            fn()
+        db.session.remove()
+        tracemalloc.start()
+        fn()
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        db.session.remove()
+
+        def rodar():
+            fn()
+            db.session.remove()  # sem identity map reaproveitado entre repetições
+        ms = medir(rodar, repeticoes)
+    print(f"  {rotulo:<28} {ms:8.1f} ms  {c['n']:3d} consultas  pico {pico / 2**20:6.2f} MiB")
+
+
+def cmd_serializacao(args):
+    """Keypads e cenas: objetos do ORM + serialize_* x consultas por coluna (serializadores.py)."""
+    pid = criar_projeto("Bench serialização", circuitos=args.circuitos, keypads=args.keypads, cenas=args.cenas)
+    print(f"{args.keypads} keypads x 4 botões:")
+    _medir_serializacao("ORM + serialize_keypad", lambda: _keypads_orm(pid), args.repeticoes)
+    _medir_serializacao("keypads_serializados", lambda: keypads_serializados(Keypad.projeto_id == pid),
+                        args.repeticoes)
+    print(f"{args.cenas} cenas x 2 ações:")
+    _medir_serializacao("ORM + serialize_cena", lambda: _cenas_orm(pid), args.repeticoes)
+    _medir_serializacao("cenas_serializadas", lambda: cenas_serializadas(
+        Cena.projeto_id == pid, ordem=(Area.nome, Ambiente.nome, Cena.nome), com_ambiente=True), args.repeticoes)
+
+    with app.app_context():
+        iguais = (_keypads_orm(pid) == keypads_serializados(Keypad.projeto_id == pid))
+        cenas_orm = _cenas_orm(pid)
+        for c in cenas_orm:
+            ambiente = db.session.get(Ambiente, c["ambiente_id"])
+            c["ambiente"] = {"id": ambiente.id, "nome": ambiente.nome,
+                             "area": {"id": ambiente.area.id, "nome": ambiente.area.nome}}
+        iguais = iguais and cenas_orm == cenas_serializadas(
+            Cena.projeto_id == pid, ordem=(Area.nome, Ambiente.nome, Cena.nome), com_ambiente=True)
+    print(f"payloads idênticos: {'sim' if iguais else 'NÃO'}")
+
+    client = cliente_admin()
+    selecionar_projeto(client, pid)
+    for url in ("/api/keypads", "/api/cenas", "/api/projeto_tree"):
+        ms = medir(lambda: client.get(url), args.repeticoes)
+        print(f"  GET {url:<20} {ms:8.1f} ms")
+    return 0 if iguais else 1
+
+
+@contextmanager
+def sem_orjson():
+    """Força o json_backend a usar a stdlib dentro do bloco."""
+    original = json_backend.orjson
+    json_backend.orjson = None
+    try:
+        yield
+    finally:
+        json_backend.orjson = original
+
+
+def _dados_rwp(projeto_id):
+    """project_data do conversor para o projeto, como o /roehn/import monta antes de exportar."""
+    with app.app_context():
+        projeto = db.session.get(Projeto, projeto_id)
+        admin = User.query.filter_by(username="admin").first()
+        conversor = RoehnProjectConverter(projeto, db.session, admin.id)
+        conversor.create_project({
+            "project_name": projeto.nome, "client_name": "", "client_email": "", "client_phone": "",
+            "timezone_id": "America/Bahia", "lat": "0.0", "lon": "0.0", "tech_area": "Área Técnica",
+            "tech_room": "Sala Técnica", "board_name": "Quadro Elétrico", "m4_ip": "192.168.0.245",
+            "m4_hsnet": "245", "m4_devid": "1", "software_version": "1.0.8.67",
+            "programmer_name": "admin", "programmer_email": "", "programmer_guid": str(uuid.uuid4()),
+            "m4_quadro_id": None,
+        })
+        conversor.process_db_project(projeto)
+        return conversor
+
+
+def cmd_json(args):
+    """Codificação JSON: stdlib x orjson (json_backend.py) na árvore do projeto e no .rwp."""
+    if json_backend.orjson is None:
+        print("orjson não instalado: json_backend usa a stdlib, nada a comparar")
+        return 0
+    pid = criar_projeto("Bench JSON", circuitos=args.circuitos, keypads=args.circuitos // 10,
+                        cenas=args.circuitos // 10)
+    client = cliente_admin()
+    selecionar_projeto(client, pid)
+
+    arvore = client.get("/api/projeto_tree").get_json()
+    stdlib = lambda: json.dumps(arvore, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    rapido = lambda: json_backend.dumps(arvore, sort_keys=True, exato=False)
+    print(f"/api/projeto_tree ({len(stdlib()) / 1024:.0f} KiB), só a codificação:")
+    print(f"  stdlib {medir(stdlib, args.repeticoes):8.2f} ms   orjson {medir(rapido, args.repeticoes):8.2f} ms   "
+          f"bytes iguais: {'sim' if stdlib() == rapido() else 'não (ordem/escape)'}")
+    with sem_orjson():
+        t_stdlib = medir(lambda: client.get("/api/projeto_tree"), args.repeticoes)
+    t_rapido = medir(lambda: client.get("/api/projeto_tree"), args.repeticoes)
+    print(f"  requisição inteira: stdlib {t_stdlib:8.1f} ms   orjson {t_rapido:8.1f} ms")
+
+    conversor = _dados_rwp(pid)
+    dados = conversor.project_data
+    stdlib = lambda: json.dumps(dados, indent=2, ensure_ascii=False).encode("utf-8")
+    rapido = lambda: json_backend.dumps(dados, indent=2)
+    iguais = stdlib() == rapido()
+    print(f".rwp ({len(stdlib()) / 2**20:.1f} MiB), só a codificação:")
+    print(f"  stdlib {medir(stdlib, args.repeticoes):8.1f} ms   orjson {medir(rapido, args.repeticoes):8.1f} ms   "
+          f"bytes iguais: {'sim' if iguais else 'NÃO'}")
+    exportar = lambda: client.post("/roehn/import", data={"project_name": "Bench JSON"})
+    with sem_orjson():
+        t_stdlib = medir(exportar, args.repeticoes)
+    t_rapido = medir(exportar, args.repeticoes)
+    print(f"  exportação inteira: stdlib {t_stdlib:8.1f} ms   orjson {t_rapido:8.1f} ms")
+    return 0 if iguais else 1
+
+
+def cmd_compressao(args):
+    """Tamanho e latência das respostas grandes com e sem gzip/brotli (compressao.py)."""
+    pid = criar_projeto("Bench compressão", circuitos=args.circuitos, keypads=args.circuitos // 10,
+                        cenas=args.circuitos // 10)
+    client = cliente_admin()
+    selecionar_projeto(client, pid)
+    codificacoes = ["identity", "gzip"] + (["br"] if compressao.brotli is not None else [])
+
+    def obter(url, codificacao):
+        if url == "/roehn/import":
+            return client.post(url, data={"project_name": "Bench"}, headers={"Accept-Encoding": codificacao})
+        return client.get(url, headers={"Accept-Encoding": codificacao})
+
+    for url in ("/api/projeto_tree", "/api/keypads", "/api/cenas", "/roehn/import"):
+        tamanhos = {}
+        for codificacao in codificacoes:
+            resp = obter(url, codificacao)
+            assert resp.status_code == 200, resp.status_code
+            ms = medir(lambda: obter(url, codificacao).get_data(), args.repeticoes)
+            tamanhos[codificacao] = (len(resp.get_data()), ms)
+        bruto = tamanhos["identity"][0]
+        print(f"{url:<18} " + "   ".join(
+            f"{c} {n / 1024:7.0f} KiB ({bruto / n:4.1f}x) {ms:6.0f} ms" for c, (n, ms) in tamanhos.items()))
+
+    resp = client.post("/roehn/import", data={"project_name": "Bench", "formato": "zip"})
+    print(f"{'.rwp em .zip':<18} {len(resp.get_data()) / 1024:7.0f} KiB")
+    return 0
+
+
+# Roda num interpretador novo: o import de app deste processo já aconteceu
+_SCRIPT_INICIALIZACAO = """
+import json, time
+inicio = time.perf_counter()
+import app
+importado = time.perf_counter()
+resp = app.app.test_client().get("/api/health")
+respondido = time.perf_counter()
+import rotas.exportacao, rotas.importacao, relatorio_pdf, roehn_converter
+pesados = time.perf_counter()
+print(json.dumps({"import_app": importado - inicio, "primeira_resposta": respondido - inicio,
+                  "status": resp.status_code, "modulos_pesados": pesados - respondido}))
+"""
+
+
+def _medir_inicializacao():
+    """Um processo novo com -X importtime: tempos gerais e o acumulado por módulo importado por app."""
+    env = dict(os.environ, INSTANCE_PATH=tempfile.mkdtemp(prefix="roehn-bench-"), PREWARM_DELAY_S="0")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _SCRIPT_INICIALIZACAO],
+                          cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                          capture_output=True, text=True, check=True)
+    tempos = json.loads(proc.stdout.strip().splitlines()[-1])
+    # "import time: self [us] | cumulative | imported package", filhos antes do pai, 2 espaços por nível
+    modulos, pendentes, pacotes = {}, {}, set()
+    for linha in proc.stderr.splitlines():
+        if not linha.startswith("import time:") or "imported package" in linha:
+            continue
+        _, cumulativo, nome = linha[len("import time:"):].split("|")
+        nivel = (len(nome) - len(nome.lstrip())) // 2
+        nome = nome.strip()
+        if nivel == 0:
+            if nome == "app":
+                modulos = dict(pendentes, app=int(cumulativo) / 1000)
+                tempos["pacotes"] = sorted(pacotes)
+            pendentes, pacotes = {}, set()
+            continue
+        pacotes.add(nome.split(".")[0])
+        if nivel == 1:
+            pendentes[nome] = int(cumulativo) / 1000
+    return tempos, modulos
+
+
+def cmd_inicializacao(args):
+    """Tempo até a primeira resposta após um restart e custo de import por módulo (ms)."""
+    execucoes = [_medir_inicializacao() for _ in range(args.repeticoes)]
+    for chave, rotulo in (("import_app", "import app"), ("primeira_resposta", "primeira resposta"),
+                          ("modulos_pesados", "exportação/importação (tardio)")):
+        ms = statistics.median(tempos[chave] for tempos, _ in execucoes) * 1000
+        print(f"{rotulo:<32} {ms:8.0f} ms")
+
+    nomes = set().union(*(modulos for _, modulos in execucoes))
+    medianas = {nome: statistics.median(m.get(nome, 0) for _, m in execucoes) for nome in nomes}
+    print(f"\nimports mais caros (acumulado, mediana de {args.repeticoes}):")
+    for nome, ms in sorted(medianas.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {nome:<30} {ms:8.1f} ms")
+    pacotes = set().union(*(tempos["pacotes"] for tempos, _ in execucoes))
+    carregados = [nome for nome in ("reportlab", "roehn_converter", "relatorio_pdf") if nome in pacotes]
+    print("\nmódulos pesados carregados no import do app: " + (", ".join(carregados) or "nenhum"))
+    return 1 if carregados else 0
+
+
+# Também num interpretador novo; RSS lido de /proc (Linux), senão o pico do getrusage
+_SCRIPT_MEMORIA = """
+import json, resource
+
+def rss_kib():
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+medidas = {"interpretador": rss_kib()}
+import app
+medidas["import_app"] = rss_kib()
+client = app.app.test_client()
+client.post("/api/login", json={"username": "admin", "password": "admin123"})
+for url in ("/api/session", "/api/projetos", "/api/keypads/meta"):
+    client.get(url)
+medidas["rotas_leves"] = rss_kib()
+import rotas.exportacao, rotas.importacao, relatorio_pdf, roehn_converter
+medidas["exportacao_importacao"] = rss_kib()
+print(json.dumps(medidas))
+"""
+
+
+def cmd_memoria(args):
+    """RSS de um worker: só rotas leves x com exportação/importação carregadas."""
+    env = dict(os.environ, INSTANCE_PATH=tempfile.mkdtemp(prefix="roehn-bench-"), PREWARM_DELAY_S="0")
+    execucoes = []
+    for _ in range(args.repeticoes):
+        proc = subprocess.run([sys.executable, "-c", _SCRIPT_MEMORIA],
+                              cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                              capture_output=True, text=True, check=True)
+        execucoes.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    medianas = {chave: statistics.median(m[chave] for m in execucoes) / 1024 for chave in execucoes[0]}
+    for chave, mib in medianas.items():
+        print(f"{chave:<24} {mib:8.1f} MiB")
+    leve, completo = medianas["rotas_leves"], medianas["exportacao_importacao"]
+    print(f"\n{args.workers} workers: {leve * args.workers:.0f} MiB só com rotas leves, "
+          f"{completo * args.workers:.0f} MiB com tudo carregado "
+          f"({completo - leve:.1f} MiB por worker ficam para quem serve exportação/importação)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do backend Roehn")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("consultas", help="contagem de consultas por endpoint (detecção de N+1)")
+    p.add_argument("--circuitos", type=int, default=1000)
+    p.add_argument("--max-consultas", type=int, default=5)
+    p.set_defaults(func=cmd_consultas)
+
+    p = sub.add_parser("modulos", help="latência de /api/modulos por número de módulos")
+    p.add_argument("--tamanhos", type=int, nargs="+", default=[10, 50, 100, 250])
+    p.add_argument("--repeticoes", type=int, default=5)
+    p.set_defaults(func=cmd_modulos)
+
+    p = sub.add_parser("indices", help="exclusão de projeto e projeto_tree com/sem índices de FK")
+    p.add_argument("--projetos", type=int, default=100)
+    p.add_argument("--circuitos", type=int, default=60)
+    p.add_argument("--keypads", type=int, default=10)
+    p.add_argument("--cenas", type=int, default=10)
+    p.add_argument("--exclusoes", type=int, default=5)
+    p.add_argument("--repeticoes", type=int, default=5)
+    p.set_defaults(func=cmd_indices)
+
+    p = sub.add_parser("concorrencia", help="leitores de projeto_tree durante uma importação "
+                                             "(compare com SQLITE_JOURNAL_MODE=delete)")
+    p.add_argument("--leitores", type=int, default=4)
+    p.add_argument("--segundos", type=float, default=5)
+    p.add_argument("--circuitos-import", type=int, default=1000)
+    p.set_defaults(func=cmd_concorrencia)
+
+    p = sub.add_parser("clonar", help="clonagem de projeto no servidor x exportar + importar")
+    p.add_argument("--tamanhos", type=int, nargs="+", default=[100, 500, 1000])
+    p.add_argument("--repeticoes", type=int, default=3)
+    p.set_defaults(func=cmd_clonar)
+
+    p = sub.add_parser("excluir", help="exclusão de projeto: cascade do ORM x DELETEs por tabela")
+    p.add_argument("--tamanhos", type=int, nargs="+", default=[100, 1000, 5000])
+    p.set_defaults(func=cmd_excluir)
+
+    p = sub.add_parser("admin_projetos", help="listagem paginada de projetos com contagens")
+    p.add_argument("--projetos", type=int, default=2000)
+    p.add_argument("--circuitos", type=int, default=20)
+    p.add_argument("--repeticoes", type=int, default=5)
+    p.set_defaults(func=cmd_admin_projetos)
+
+    p = sub.add_parser("lote", help="circuitos e vinculações: requisição por linha x /api/bulk")
+    p.add_argument("--tamanhos", type=int, nargs="+", default=[50, 200])
+    p.set_defaults(func=cmd_lote)
+
+    p = sub.add_parser("saks", help="alocação de SAK: lacunas e creates concorrentes")
+    p.add_argument("--circuitos", type=int, default=500)
+    p.add_argument("--threads", type=int, default=4)
+    p.add_argument("--por-thread", type=int, default=50)
+    p.set_defaults(func=cmd_saks)
+
+    p = sub.add_parser("hsnet", help="alocação de HSNET: próximo livre, lote e creates concorrentes")
+    p.add_argument("--circuitos", type=int, default=600)
+    p.add_argument("--keypads", type=int, default=100)
+    p.add_argument("--lote", type=int, default=50)
+    p.add_argument("--threads", type=int, default=4)
+    p.add_argument("--por-thread", type=int, default=20)
+    p.add_argument("--repeticoes", type=int, default=20)
+    p.set_defaults(func=cmd_hsnet)
+
+    p = sub.add_parser("serializacao", help="keypads e cenas: ORM + serialize_* x consultas por coluna")
+    p.add_argument("--keypads", type=int, default=300)
+    p.add_argument("--cenas", type=int, default=500)
+    p.add_argument("--circuitos", type=int, default=600)
+    p.add_argument("--repeticoes", type=int, default=5)
+    p.set_defaults(func=cmd_serializacao)
+
+    p = sub.add_parser("json", help="codificação JSON: stdlib x orjson na árvore do projeto e no .rwp")
+    p.add_argument("--circuitos", type=int, default=1000)
+    p.add_argument("--repeticoes", type=int, default=5)
+    p.set_defaults(func=cmd_json)
+
+    p = sub.add_parser("compressao", help="tamanho e latência das respostas com e sem gzip/brotli")
+    p.add_argument("--circuitos", type=int, default=500)
+    p.add_argument("--repeticoes", type=int, default=3)
+    p.set_defaults(func=cmd_compressao)
+
+    p = sub.add_parser("inicializacao", help="import do app e primeira resposta em processo novo, "
+                                              "com tempo de import por módulo")
+    p.add_argument("--repeticoes", type=int, default=5)
+    p.add_argument("--top", type=int, default=15)
+    p.set_defaults(func=cmd_inicializacao)
+
+    p = sub.add_parser("memoria", help="memória (RSS) por worker com e sem exportação/importação carregadas")
+    p.add_argument("--repeticoes", type=int, default=3)
+    p.add_argument("--workers", type=int, default=4)
+    p.set_defaults(func=cmd_memoria)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+# cache_usuarios.py
+"""
+Cache do user_loader do Flask-Login.
+
+Sem cache, toda requisição autenticada faz um SELECT em user. Aqui cada id
+guarda uma cópia destacada (detached) do User, com TTL e limite de entradas
+(a menos usada sai primeiro). No acerto a cópia entra na sessão da requisição
+com merge(load=False), sem consulta: current_user continua sendo um objeto da
+sessão, então alterações nele (ex.: change_password) são gravadas normalmente.
+
+Alterações e exclusões de User commitadas neste processo invalidam a entrada
+(eventos da sessão, o que cobre change_password e api_users_delete); em outros
+workers a entrada antiga vale no máximo `ttl_s` segundos.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from database import db, User
+
+
+class CacheUsuarios:
+    def __init__(self, ttl_s=0, max_itens=256):
+        self.ttl_s = ttl_s
+        self.max_itens = max_itens
+        self._itens = OrderedDict()  # id -> (expira_em, cópia destacada)
+        self._geracao = 0            # incrementada a cada invalidação
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.invalidacoes = 0
+
+    def instalar(self, session, ttl_s, max_itens):
+        """Liga o cache (ttl_s > 0) e a invalidação nos commits da sessão."""
+        self.ttl_s = ttl_s
+        self.max_itens = max(1, max_itens)
+        event.listen(session, "after_flush", _coletar)
+        event.listen(session, "after_commit", self._aplicar_invalidacoes)
+        event.listen(session, "after_rollback", _descartar)
+
+    @property
+    def ativo(self):
+        return self.ttl_s > 0
+
+    @staticmethod
+    def _copia(user):
+        copia = User(**{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+        make_transient_to_detached(copia)
+        return copia
+
+    def carregar(self, user_id):
+        """User de `user_id` na sessão atual (None se não existe); consulta o banco só na falta."""
+        if not self.ativo:
+            return db.session.get(User, user_id)
+
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(user_id)
+            if item is not None and item[0] > agora:
+                self._itens.move_to_end(user_id)
+                self.acertos += 1
+                return db.session.merge(item[1], load=False)
+            self.faltas += 1
+            geracao = self._geracao
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        copia = self._copia(user)
+        with self._lock:
+            # uma invalidação durante a consulta pode ter tornado a cópia velha
+            if geracao == self._geracao:
+                self._itens[user_id] = (agora + self.ttl_s, copia)
+                self._itens.move_to_end(user_id)
+                while len(self._itens) > self.max_itens:
+                    self._itens.popitem(last=False)
+        return user
+
+    def invalidar(self, *user_ids):
+        """Remove os ids informados; sem argumentos, esvazia o cache."""
+        with self._lock:
+            self._geracao += 1
+            if not user_ids:
+                self.invalidacoes += len(self._itens)
+                self._itens.clear()
+                return
+            for user_id in user_ids:
+                if self._itens.pop(user_id, None) is not None:
+                    self.invalidacoes += 1
+
+    def _aplicar_invalidacoes(self, session):
+        ids = session.info.pop("usuarios_alterados", None)
+        if ids:
+            self.invalidar(*ids)
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                "enabled": self.ativo,
+                "ttl_s": self.ttl_s,
+                "max_entries": self.max_itens,
+                "entries": len(self._itens),
+                "hits": self.acertos,
+                "misses": self.faltas,
+                "invalidations": self.invalidacoes,
+                "hit_rate": round(self.acertos / consultas, 4) if consultas else None,
+            }
+
+    def prometheus(self):
+        """Contadores no formato texto do Prometheus, para somar ao de perf.metricas."""
+        e = self.estatisticas()
+        linhas = []
+        for nome, tipo, ajuda, valor in (
+            ("roehn_user_cache_hits_total", "counter", "Acertos do cache do user_loader.", e["hits"]),
+            ("roehn_user_cache_misses_total", "counter", "Faltas do cache do user_loader.", e["misses"]),
+            ("roehn_user_cache_invalidations_total", "counter", "Entradas invalidadas.", e["invalidations"]),
+            ("roehn_user_cache_entries", "gauge", "Entradas no cache.", e["entries"]),
+        ):
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}", f"{nome} {valor}"]
+        return "\n".join(linhas) + "\n"
+
+
+def _coletar(session, flush_context):
+    # ainda com o estado de antes do flush: dirty/deleted listam o que foi gravado
+    ids = {obj.id for obj in list(session.dirty) + list(session.deleted)
+           if isinstance(obj, User) and obj.id is not None}
+    if ids:
+        session.info.setdefault("usuarios_alterados", set()).update(ids)
+
+
+def _descartar(session):
+    session.info.pop("usuarios_alterados", None)
+
+
+cache_usuarios = CacheUsuarios()
@@ -0,0 +1,51 @@
+# carregamento_tardio.py
+"""
+Pré-carregamento dos subsistemas pesados fora do caminho de inicialização.
+
+As rotas de exportação e importação (rotas/exportacao.py, rotas/importacao.py),
+o ReportLab (relatorio_pdf.py) e o conversor RWP (roehn_converter.py) são
+importados na primeira exportação/importação. Para que essa primeira requisição
+também não pague o import, `preaquecer` os carrega numa thread daemon alguns
+segundos depois do import do app, quando o servidor já está escutando e o
+watchdog já foi atendido. Com `prewarm_delay_s` = 0 nas opções do add-on nada é
+pré-carregado e os módulos entram só no primeiro uso, o que também mantém
+enxuto cada worker de um servidor multi-worker que nunca serve essas rotas.
+"""
+import importlib
+import logging
+import threading
+import time
+
+MODULOS_PESADOS = ("rotas.exportacao", "rotas.importacao", "relatorio_pdf", "roehn_converter")
+
+logger = logging.getLogger(__name__)
+
+_iniciado = False
+_lock = threading.Lock()
+
+
+def _carregar(atraso_s, modulos):
+    time.sleep(atraso_s)
+    for nome in modulos:
+        inicio = time.perf_counter()
+        try:
+            importlib.import_module(nome)
+        except Exception:  # o import é refeito (e o erro aparece) no primeiro uso
+            logger.exception("Falha ao pré-carregar %s", nome)
+            continue
+        logger.debug("%s pré-carregado em %.0f ms", nome, (time.perf_counter() - inicio) * 1000)
+
+
+def preaquecer(atraso_s, modulos=MODULOS_PESADOS):
+    """Importa `modulos` numa thread daemon após `atraso_s` segundos; uma vez por processo."""
+    global _iniciado
+    if atraso_s <= 0:
+        return None
+    with _lock:
+        if _iniciado:
+            return None
+        _iniciado = True
+    thread = threading.Thread(target=_carregar, args=(atraso_s, modulos),
+                              name="preaquecer-modulos", daemon=True)
+    thread.start()
+    return thread
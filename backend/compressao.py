@@ -0,0 +1,160 @@
+# compressao.py
+"""
+Compressão negociada das respostas (gzip, ou brotli quando instalado).
+
+Middleware WSGI, como o de health.py: vê o corpo depois do Flask, então vale
+para jsonify, send_file e respostas em stream. O corpo é comprimido pedaço a
+pedaço conforme o servidor itera, sem montar a resposta inteira em memória.
+Respostas com Content-Length abaixo de `minimo_bytes` saem como estão; as
+sem Content-Length (stream) são sempre comprimidas. Só tipos textuais são
+comprimidos: .zip, imagens e PDFs já são compactos.
+"""
+import zlib
+
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+TIPOS_COMPRIMIVEIS = (
+    "application/json", "application/javascript", "application/xml", "image/svg+xml", "text/",
+)
+
+
+def codificacoes_aceitas(accept_encoding):
+    """{codificação: q} do header Accept-Encoding; `*` vale para as não listadas."""
+    aceitas = {}
+    for item in (accept_encoding or "").split(","):
+        nome, _, params = item.strip().partition(";")
+        nome = nome.strip().lower()
+        if not nome:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            chave, _, valor = param.strip().partition("=")
+            if chave.strip().lower() == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        aceitas[nome] = q
+    return aceitas
+
+
+def escolher_codificacao(accept_encoding):
+    """'br', 'gzip' ou None, pela maior qualidade aceita pelo cliente (br no empate)."""
+    aceitas = codificacoes_aceitas(accept_encoding)
+    curinga = aceitas.get("*", 0.0)
+    candidatas = ["br", "gzip"] if brotli is not None else ["gzip"]
+    melhor, melhor_q = None, 0.0
+    for nome in candidatas:
+        q = aceitas.get(nome, curinga)
+        if q > melhor_q:
+            melhor, melhor_q = nome, q
+    return melhor
+
+
+class _Gzip:
+    def __init__(self, nivel):
+        self._c = zlib.compressobj(nivel, zlib.DEFLATED, 31)  # wbits 31 = cabeçalho gzip
+
+    def comprimir(self, dados):
+        return self._c.compress(dados)
+
+    def finalizar(self):
+        return self._c.flush()
+
+
+class _Brotli:
+    def __init__(self, qualidade):
+        self._c = brotli.Compressor(quality=qualidade)
+
+    def comprimir(self, dados):
+        return self._c.process(dados)
+
+    def finalizar(self):
+        return self._c.finish()
+
+
+class CompressaoMiddleware:
+    """Envolve app.wsgi_app; comprime respostas acima de `minimo_bytes` conforme o Accept-Encoding."""
+
+    def __init__(self, wsgi_app, minimo_bytes=1024, nivel_gzip=6, qualidade_brotli=4):
+        self.wsgi_app = wsgi_app
+        self.minimo_bytes = minimo_bytes
+        self.nivel_gzip = nivel_gzip
+        self.qualidade_brotli = qualidade_brotli
+
+    def _comprimivel(self, status, headers):
+        codigo = int(status.split(" ", 1)[0])
+        if codigo < 200 or codigo in (204, 206, 304):
+            return False
+        h = {nome.lower(): valor for nome, valor in headers}
+        if "content-encoding" in h or "no-transform" in h.get("cache-control", ""):
+            return False
+        tipo = h.get("content-type", "").split(";")[0].strip().lower()
+        if not tipo.startswith(TIPOS_COMPRIMIVEIS):
+            return False
+        tamanho = h.get("content-length")
+        return tamanho is None or int(tamanho) >= self.minimo_bytes
+
+    def __call__(self, environ, start_response):
+        codificacao = None
+        if environ.get("REQUEST_METHOD") != "HEAD":
+            codificacao = escolher_codificacao(environ.get("HTTP_ACCEPT_ENCODING"))
+        if codificacao is None:
+            return self.wsgi_app(environ, start_response)
+
+        estado = {"chamado": False, "comprimir": False}
+
+        def _start_response(status, headers, exc_info=None):
+            estado["chamado"] = True
+            estado["comprimir"] = self._comprimivel(status, headers)
+            if estado["comprimir"]:
+                headers = self._headers_comprimidos(headers, codificacao)
+            return start_response(status, headers, exc_info)
+
+        resposta = self.wsgi_app(environ, _start_response)
+        if estado["chamado"] and not estado["comprimir"]:
+            return resposta  # mantém o wsgi.file_wrapper do send_file
+        fechar = [resposta.close] if hasattr(resposta, "close") else []
+        return ClosingIterator(self._corpo(resposta, estado, codificacao), fechar)
+
+    @staticmethod
+    def _headers_comprimidos(headers, codificacao):
+        novos, vary = [], []
+        for nome, valor in headers:
+            baixo = nome.lower()
+            if baixo == "content-length":
+                continue
+            if baixo == "vary":
+                vary.append(valor)
+                continue
+            if baixo == "etag" and not valor.startswith("W/"):
+                valor = "W/" + valor  # outra representação do mesmo recurso
+            novos.append((nome, valor))
+        novos.append(("Vary", ", ".join(vary + ["Accept-Encoding"])))
+        novos.append(("Content-Encoding", codificacao))
+        return novos
+
+    def _compressor(self, codificacao):
+        return _Brotli(self.qualidade_brotli) if codificacao == "br" else _Gzip(self.nivel_gzip)
+
+    def _corpo(self, resposta, estado, codificacao):
+        # start_response pode ser chamado só na primeira iteração (apps geradoras)
+        compressor = None
+        for pedaco in resposta:
+            if compressor is None and estado["comprimir"]:
+                compressor = self._compressor(codificacao)
+            if compressor is None:
+                yield pedaco
+            elif pedaco:
+                saida = compressor.comprimir(pedaco)
+                if saida:
+                    yield saida
+        if compressor is None and estado["comprimir"]:
+            compressor = self._compressor(codificacao)  # corpo vazio
+        if compressor is not None:
+            yield compressor.finalizar()
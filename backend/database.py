@@ -1,9 +1,10 @@
 
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
 
+import senhas
+
 db = SQLAlchemy()
 
 
@@ -15,17 +16,21 @@ class User(UserMixin, db.Model):
     role = db.Column(db.String(20), default='user')  # admin, user
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = senhas.gerar_hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return senhas.conferir(self.password_hash, password)
+
+    def precisa_rehash(self):
+        """Hash gravado com algoritmo/custo diferentes das opções atuais (senhas.py)."""
+        return senhas.precisa_rehash(self.password_hash)
 
 
 # database.py
 class Projeto(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False, unique=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     status = db.Column(db.String(20), nullable=False, default='ATIVO')  # <--- NOVO
 
     # Novas colunas de data
@@ -43,7 +48,7 @@ class Projeto(db.Model):
 class Area(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
-    projeto_id = db.Column(db.Integer, db.ForeignKey('projeto.id'), nullable=False)
+    projeto_id = db.Column(db.Integer, db.ForeignKey('projeto.id'), nullable=False, index=True)
     ambientes = db.relationship('Ambiente', backref='area', lazy=True, cascade='all, delete-orphan')
 
     __table_args__ = (db.UniqueConstraint('nome', 'projeto_id', name='unique_area_por_projeto'),)
@@ -52,7 +57,9 @@ class Area(db.Model):
 class Ambiente(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
-    area_id = db.Column(db.Integer, db.ForeignKey('area.id'), nullable=False)
+    area_id = db.Column(db.Integer, db.ForeignKey('area.id'), nullable=False, index=True)
+    # Cópia de Area.projeto_id mantida por escopo.py (filtros e checagens sem joins)
+    projeto_id = db.Column(db.Integer, db.ForeignKey('projeto.id'), nullable=True, index=True)
     circuitos = db.relationship('Circuito', backref='ambiente', lazy=True, cascade='all, delete-orphan')
     keypads = db.relationship('Keypad', backref='ambiente', lazy=True, cascade='all, delete-orphan')
     quadros_eletricos = db.relationship('QuadroEletrico', backref='ambiente', lazy=True, cascade='all, delete-orphan')
@@ -64,8 +71,8 @@ class QuadroEletrico(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
     notes = db.Column(db.Text, nullable=True)
-    ambiente_id = db.Column(db.Integer, db.ForeignKey('ambiente.id'), nullable=False)
-    projeto_id = db.Column(db.Integer, db.ForeignKey('projeto.id'), nullable=False)
+    ambiente_id = db.Column(db.Integer, db.ForeignKey('ambiente.id'), nullable=False, index=True)
+    projeto_id = db.Column(db.Integer, db.ForeignKey('projeto.id'), nullable=False, index=True)
     
     # Relacionamentos
     modulos = db.relationship('Modulo', backref='quadro_eletrico', lazy=True, cascade='all, delete-orphan')
@@ -81,13 +88,20 @@ class Circuito(db.Model):
     tipo = db.Column(db.String(50), nullable=False)
     dimerizavel = db.Column(db.Boolean, nullable=False, default=False)
     potencia = db.Column(db.Float, nullable=False, default=0.0)  # NOVO CAMPO
-    ambiente_id = db.Column(db.Integer, db.ForeignKey('ambiente.id'), nullable=False)
+    ambiente_id = db.Column(db.Integer, db.ForeignKey('ambiente.id'), nullable=False, index=True)
     sak = db.Column(db.Integer, nullable=True)
+    # Cópia de Area.projeto_id mantida por escopo.py (filtros e checagens sem joins);
+    # indexada pelo ix_circuito_projeto_sak
+    projeto_id = db.Column(db.Integer, db.ForeignKey('projeto.id'), nullable=True)
     quantidade_saks = db.Column(db.Integer, default=1)
     vinculacao = db.relationship('Vinculacao', backref='circuito', uselist=False, cascade='all, delete-orphan')
     keypad_buttons = db.relationship('KeypadButton', backref='circuito', lazy=True)
 
-    __table_args__ = (db.UniqueConstraint('identificador', 'ambiente_id', name='unique_circuito_por_ambiente'),)
+    __table_args__ = (
+        db.UniqueConstraint('identificador', 'ambiente_id', name='unique_circuito_por_ambiente'),
+        # Faixas livres de SAK por projeto (alocadores.py)
+        db.Index('ix_circuito_projeto_sak', 'projeto_id', 'sak'),
+    )
     
 class Modulo(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -100,15 +114,18 @@ class Modulo(db.Model):
     is_controller = db.Column(db.Boolean, default=False, nullable=False)
     is_logic_server = db.Column(db.Boolean, default=False, nullable=False)
     ip_address = db.Column(db.String(50), nullable=True)
-    quadro_eletrico_id = db.Column(db.Integer, db.ForeignKey('quadro_eletrico.id'), nullable=True)
+    quadro_eletrico_id = db.Column(db.Integer, db.ForeignKey('quadro_eletrico.id'), nullable=True, index=True)
 
     # Auto-relacionamento para vincular módulos a um controlador
-    parent_controller_id = db.Column(db.Integer, db.ForeignKey('modulo.id'), nullable=True)
+    parent_controller_id = db.Column(db.Integer, db.ForeignKey('modulo.id'), nullable=True, index=True)
     child_modules = db.relationship('Modulo', backref=db.backref('parent_controller', remote_side=[id]), lazy=True)
 
     vinculacoes = db.relationship('Vinculacao', backref='modulo', lazy=True, cascade='all, delete-orphan')
 
-    __table_args__ = (db.UniqueConstraint('nome', 'projeto_id', name='unique_modulo_por_projeto'),)
+    __table_args__ = (
+        db.UniqueConstraint('nome', 'projeto_id', name='unique_modulo_por_projeto'),
+        db.Index('ix_modulo_projeto_hsnet', 'projeto_id', 'hsnet'),
+    )
 
 class Vinculacao(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -116,6 +133,7 @@ class Vinculacao(db.Model):
     modulo_id = db.Column(db.Integer, db.ForeignKey('modulo.id'), nullable=False)
     canal = db.Column(db.Integer, nullable=False)
 
+    # O índice da constraint (modulo_id, canal) já atende buscas por modulo_id
     __table_args__ = (db.UniqueConstraint('modulo_id', 'canal', name='unique_canal_por_modulo'),)
 
 
@@ -137,8 +155,11 @@ class Keypad(db.Model):
     buttons = db.relationship('KeypadButton', backref='keypad', lazy=True, cascade='all, delete-orphan')
 
     __table_args__ = (
+        # Também serve de índice para ambiente_id (primeira coluna)
         db.UniqueConstraint('ambiente_id', 'nome', name='unique_keypad_nome_por_ambiente'),
         db.UniqueConstraint('hsnet', 'projeto_id', name='unique_keypad_hsnet_por_projeto'),
+        # Lista os HSNETs do projeto sem ler a tabela (alocadores.hsnets_em_uso)
+        db.Index('ix_keypad_projeto_hsnet', 'projeto_id', 'hsnet'),
     )
 
 
@@ -150,8 +171,10 @@ class KeypadButton(db.Model):
     icon = db.Column(db.String(50), nullable=True)
     rocker_style = db.Column(db.String(50), nullable=True, default='up-down')
     guid = db.Column(db.String(36), nullable=False, default=lambda: str(uuid.uuid4()))
-    circuito_id = db.Column(db.Integer, db.ForeignKey('circuito.id', ondelete='SET NULL'), nullable=True)
-    cena_id = db.Column(db.Integer, db.ForeignKey('cena.id', ondelete='SET NULL'), nullable=True)
+    circuito_id = db.Column(db.Integer, db.ForeignKey('circuito.id', ondelete='SET NULL'), nullable=True, index=True)
+    cena_id = db.Column(db.Integer, db.ForeignKey('cena.id', ondelete='SET NULL'), nullable=True, index=True)
+    # Cópia de Keypad.projeto_id mantida por escopo.py (filtros e checagens sem joins)
+    projeto_id = db.Column(db.Integer, db.ForeignKey('projeto.id'), nullable=True, index=True)
     modo = db.Column(db.Integer, nullable=False, default=3)
     command_on = db.Column(db.Integer, nullable=False, default=0)
     command_off = db.Column(db.Integer, nullable=False, default=0)
@@ -176,7 +199,9 @@ class Cena(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     guid = db.Column(db.String(36), unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
     nome = db.Column(db.String(100), nullable=False)
-    ambiente_id = db.Column(db.Integer, db.ForeignKey('ambiente.id'), nullable=False)
+    ambiente_id = db.Column(db.Integer, db.ForeignKey('ambiente.id'), nullable=False, index=True)
+    # Cópia de Area.projeto_id mantida por escopo.py (filtros e checagens sem joins)
+    projeto_id = db.Column(db.Integer, db.ForeignKey('projeto.id'), nullable=True, index=True)
     scene_movers = db.Column(db.Boolean, nullable=False, default=False)
     acoes = db.relationship('Acao', backref='cena', lazy=True, cascade='all, delete-orphan')
 
@@ -185,7 +210,7 @@ class Cena(db.Model):
 
 class Acao(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    cena_id = db.Column(db.Integer, db.ForeignKey('cena.id'), nullable=False)
+    cena_id = db.Column(db.Integer, db.ForeignKey('cena.id'), nullable=False, index=True)
     level = db.Column(db.Integer, nullable=False, default=100)
     action_type = db.Column(db.Integer, nullable=False, default=0)  # 0: Circuit, 7: Group
     target_guid = db.Column(db.String(36), nullable=False)
@@ -200,3 +225,19 @@ class CustomAcao(db.Model):
     level = db.Column(db.Integer, nullable=False, default=100)
 
     __table_args__ = (db.UniqueConstraint('acao_id', 'target_guid', name='unique_custom_acao'),)
+
+
+class ProjetoAlteracao(db.Model):
+    """Log de alterações por projeto; o id funciona como número de revisão (sincronização incremental)."""
+    id = db.Column(db.Integer, primary_key=True)
+    projeto_id = db.Column(db.Integer, nullable=False)
+    entidade = db.Column(db.String(30), nullable=False)  # areas, ambientes, circuitos, ...
+    entidade_id = db.Column(db.Integer, nullable=False)
+    operacao = db.Column(db.String(10), nullable=False)  # insert, update, delete
+    criado_em = db.Column(db.DateTime, nullable=False, default=db.func.now())
+
+    __table_args__ = (
+        db.Index('ix_projeto_alteracao_projeto_rev', 'projeto_id', 'id'),
+        # AUTOINCREMENT garante que revisões nunca sejam reaproveitadas
+        {'sqlite_autoincrement': True},
+    )
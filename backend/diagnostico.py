@@ -0,0 +1,93 @@
+# diagnostico.py
+"""
+Trace da conversão para o formato Roehn.
+
+Substitui os print() por entidade do conversor: mensagens abaixo do log_level
+do add-on são descartadas antes de qualquer formatação (use o estilo
+`diag.debug("Circuito %s", nome)`, nunca f-strings), e as demais ficam em buffer
+e são escritas de uma vez no stdout. Avisos e erros são sempre guardados para o
+relatório estruturado, independentemente do nível.
+"""
+import sys
+import traceback
+
+# Níveis aceitos pela opção log_level do config.yaml
+NIVEIS = {
+    "trace": 5,
+    "debug": 10,
+    "info": 20,
+    "notice": 25,
+    "warning": 30,
+    "error": 40,
+    "fatal": 50,
+}
+
+
+class DiagnosticoConversao:
+    def __init__(self, log_level="info", saida=None, tamanho_buffer=500):
+        self.limiar = NIVEIS.get(str(log_level).lower(), NIVEIS["info"])
+        self.saida = saida
+        self.tamanho_buffer = tamanho_buffer
+        self._buffer = []
+        self.ocorrencias = []          # avisos e erros, para o relatório
+
+    def habilitado(self, nivel):
+        return NIVEIS[nivel] >= self.limiar
+
+    def _registrar(self, nivel, msg, args, exc_info=False):
+        valor = NIVEIS[nivel]
+        emitir = valor >= self.limiar
+        if not emitir and valor < NIVEIS["warning"]:
+            return
+
+        texto = msg % args if args else msg
+        if exc_info:
+            texto = f"{texto}\n{traceback.format_exc().rstrip()}"
+
+        if valor >= NIVEIS["warning"]:
+            self.ocorrencias.append({"level": nivel, "message": texto})
+
+        if emitir:
+            self._buffer.append(f"[{nivel.upper()}] {texto}")
+            if len(self._buffer) >= self.tamanho_buffer:
+                self.flush()
+
+    def trace(self, msg, *args):
+        self._registrar("trace", msg, args)
+
+    def debug(self, msg, *args):
+        self._registrar("debug", msg, args)
+
+    def info(self, msg, *args):
+        self._registrar("info", msg, args)
+
+    def notice(self, msg, *args):
+        self._registrar("notice", msg, args)
+
+    def warning(self, msg, *args):
+        self._registrar("warning", msg, args)
+
+    def error(self, msg, *args, exc_info=False):
+        self._registrar("error", msg, args, exc_info)
+
+    def fatal(self, msg, *args, exc_info=False):
+        self._registrar("fatal", msg, args, exc_info)
+
+    def flush(self):
+        """Escreve as mensagens acumuladas numa única escrita no stdout."""
+        if not self._buffer:
+            return
+        saida = self.saida or sys.stdout
+        saida.write("\n".join(self._buffer) + "\n")
+        saida.flush()
+        self._buffer.clear()
+
+    def relatorio(self):
+        """Avisos e erros coletados durante a conversão."""
+        erros = [o for o in self.ocorrencias if NIVEIS[o["level"]] >= NIVEIS["error"]]
+        avisos = [o for o in self.ocorrencias if NIVEIS[o["level"]] < NIVEIS["error"]]
+        return {
+            "warnings": [o["message"] for o in avisos],
+            "errors": [o["message"] for o in erros],
+            "counts": {"warning": len(avisos), "error": len(erros)},
+        }
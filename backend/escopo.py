@@ -0,0 +1,74 @@
+# escopo.py
+"""
+Mantém o projeto_id desnormalizado de Ambiente, Circuito, Cena e KeypadButton.
+
+Essas tabelas só pertencem a um projeto indiretamente (Ambiente -> Area,
+Circuito/Cena -> Ambiente, KeypadButton -> Keypad). A cópia do projeto_id
+permite filtrar e checar permissão numa única tabela; este listener de
+before_flush a recalcula sempre que um objeto é criado ou muda de pai, e
+propaga a mudança para os filhos já gravados quando um Ambiente troca de área.
+
+Inserções em massa (Core, INSERT ... SELECT) não passam por aqui e precisam
+preencher projeto_id por conta própria.
+"""
+from sqlalchemy import event, update
+
+from database import Area, Ambiente, Circuito, Cena, Keypad, KeypadButton
+
+
+def pai(session, obj, rel_name, fk_name, model):
+    """Resolve o objeto pai pela relação (se carregada) ou pela FK."""
+    objeto_pai = getattr(obj, rel_name, None)
+    if objeto_pai is not None:
+        return objeto_pai
+    fk = getattr(obj, fk_name, None)
+    if fk is None:
+        return None
+    return session.get(model, fk)
+
+
+def _projeto_do_pai(session, obj):
+    if isinstance(obj, Ambiente):
+        area = pai(session, obj, "area", "area_id", Area)
+        return area.projeto_id if area is not None else None
+    if isinstance(obj, (Circuito, Cena)):
+        ambiente = pai(session, obj, "ambiente", "ambiente_id", Ambiente)
+        return ambiente.projeto_id if ambiente is not None else None
+    if isinstance(obj, KeypadButton):
+        keypad = pai(session, obj, "keypad", "keypad_id", Keypad)
+        return keypad.projeto_id if keypad is not None else None
+    return None
+
+
+# Pais antes dos filhos: o projeto_id de um Ambiente novo já está resolvido
+# quando os circuitos/cenas dele são processados no mesmo flush
+_ORDEM = (Ambiente, Circuito, Cena, KeypadButton)
+
+
+def _sincronizar(session, flush_context, instances):
+    pendentes = [obj for obj in list(session.new) + list(session.dirty) if isinstance(obj, _ORDEM)]
+    if not pendentes:
+        return
+    pendentes.sort(key=lambda obj: next(i for i, cls in enumerate(_ORDEM) if isinstance(obj, cls)))
+
+    with session.no_autoflush:
+        for obj in pendentes:
+            projeto_id = _projeto_do_pai(session, obj)
+            if projeto_id is None or obj.projeto_id == projeto_id:
+                continue
+            obj.projeto_id = projeto_id
+
+            # Ambiente já gravado mudou de projeto: leva junto circuitos e cenas
+            if isinstance(obj, Ambiente) and obj.id is not None:
+                for filho in (Circuito, Cena):
+                    session.execute(
+                        update(filho)
+                        .where(filho.ambiente_id == obj.id)
+                        .values(projeto_id=projeto_id)
+                        .execution_options(synchronize_session="fetch")
+                    )
+
+
+def registrar_eventos(session):
+    """Liga o listener de before_flush (registrar antes do log de alterações)."""
+    event.listen(session, "before_flush", _sincronizar)
@@ -0,0 +1,159 @@
+# estaticos.py
+"""
+Entrega dos arquivos do build do frontend (backend/static).
+
+Na imagem, `python estaticos.py static` roda logo depois do COPY do build e
+grava ao lado de cada arquivo textual uma versão .gz (e .br, se o módulo
+brotli estiver instalado). Na requisição a variante é escolhida pelo
+Accept-Encoding e sai com Content-Encoding, então o CompressaoMiddleware não
+comprime de novo.
+
+Cache HTTP: o Vite gera assets/<nome>-<hash>.<ext>, que nunca mudam de
+conteúdo e podem ficar um ano no navegador (immutable); o index.html aponta
+para eles e é sempre revalidado (no-cache + ETag, que responde 304 sem
+corpo). Arquivos pequenos ficam em memória, validados pelo mtime/tamanho.
+"""
+import gzip
+import mimetypes
+import os
+import re
+import sys
+import threading
+
+from flask import Response, request, send_file, abort
+from werkzeug.security import safe_join
+
+from compressao import TIPOS_COMPRIMIVEIS, codificacoes_aceitas, brotli
+
+# assets/index-BkX9a_2c.js, assets/logo-3f2a91c0.svg
+_COM_HASH = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+CACHE_REVALIDAR = "no-cache"
+CACHE_PADRAO = "public, max-age=3600"
+
+EXTENSOES = {"br": ".br", "gzip": ".gz"}
+
+LIMITE_ARQUIVO = 256 * 1024        # maior arquivo guardado em memória
+LIMITE_MEMORIA = 32 * 1024 * 1024  # total em memória por processo
+
+
+def _comprimivel(nome):
+    tipo = mimetypes.guess_type(nome)[0] or ""
+    return tipo.startswith(TIPOS_COMPRIMIVEIS) or nome.endswith((".js", ".mjs", ".map", ".webmanifest"))
+
+
+def precomprimir(pasta, minimo_bytes=1024):
+    """Grava .gz/.br ao lado dos arquivos textuais de `pasta`; devolve quantos foram gravados."""
+    gravados = 0
+    for raiz, _, arquivos in os.walk(pasta):
+        for nome in arquivos:
+            if nome.endswith((".gz", ".br")) or not _comprimivel(nome):
+                continue
+            caminho = os.path.join(raiz, nome)
+            with open(caminho, "rb") as f:
+                dados = f.read()
+            if len(dados) < minimo_bytes:
+                continue
+            variantes = [(".gz", gzip.compress(dados, 9, mtime=0))]
+            if brotli is not None:
+                variantes.append((".br", brotli.compress(dados, quality=11)))
+            for extensao, comprimido in variantes:
+                if len(comprimido) >= len(dados):
+                    continue  # não compensa; a original é servida
+                with open(caminho + extensao, "wb") as f:
+                    f.write(comprimido)
+                gravados += 1
+    return gravados
+
+
+class Estaticos:
+    """Serve arquivos de `pasta` com variantes pré-comprimidas, cache HTTP e cache em memória."""
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self._memoria = {}  # caminho -> (mtime_ns, tamanho, dados)
+        self._em_memoria = 0
+        self._lock = threading.Lock()
+
+    def _arquivo(self, nome):
+        caminho = safe_join(self.pasta, nome)
+        if caminho is None or not os.path.isfile(caminho):
+            return None
+        return caminho
+
+    def _variante(self, caminho, nome):
+        """(caminho servido, Content-Encoding) conforme o Accept-Encoding e as variantes em disco."""
+        if not _comprimivel(nome):
+            return caminho, None
+        aceitas = codificacoes_aceitas(request.headers.get("Accept-Encoding"))
+        curinga = aceitas.get("*", 0.0)
+        # O .br em disco vale mesmo sem o módulo brotli instalado neste processo
+        for codificacao in ("br", "gzip"):
+            if aceitas.get(codificacao, curinga) <= 0:
+                continue
+            variante = caminho + EXTENSOES[codificacao]
+            if os.path.isfile(variante):
+                return variante, codificacao
+        return caminho, None
+
+    def _ler(self, caminho, st):
+        chave = (st.st_mtime_ns, st.st_size)
+        entrada = self._memoria.get(caminho)
+        if entrada is not None and entrada[:2] == chave:
+            return entrada[2]
+        with open(caminho, "rb") as f:
+            dados = f.read()
+        with self._lock:
+            anterior = self._memoria.pop(caminho, None)
+            if anterior is not None:
+                self._em_memoria -= len(anterior[2])
+            if self._em_memoria + len(dados) <= LIMITE_MEMORIA:
+                self._memoria[caminho] = chave + (dados,)
+                self._em_memoria += len(dados)
+        return dados
+
+    @staticmethod
+    def cache_control(nome):
+        if _COM_HASH.match(nome):
+            return CACHE_IMUTAVEL
+        if nome == "index.html":
+            return CACHE_REVALIDAR
+        return CACHE_PADRAO
+
+    def responder(self, filename):
+        """Resposta para static/<filename> (mesmo argumento da view do Flask); 404 se não existe."""
+        nome = filename.replace("\\", "/").lstrip("/")
+        caminho = self._arquivo(nome)
+        if caminho is None:
+            abort(404)
+        servido, codificacao = self._variante(caminho, nome)
+        st = os.stat(servido)
+        mimetype = mimetypes.guess_type(nome)[0] or "application/octet-stream"
+
+        if st.st_size > LIMITE_ARQUIVO:
+            resposta = send_file(servido, mimetype=mimetype, conditional=True, etag=True, max_age=None)
+        else:
+            resposta = Response(self._ler(servido, st), mimetype=mimetype)
+            resposta.set_etag("%x-%x" % (st.st_mtime_ns, st.st_size))
+            resposta.last_modified = int(st.st_mtime)
+            resposta.make_conditional(request)
+
+        resposta.headers["Cache-Control"] = self.cache_control(nome)
+        if _comprimivel(nome):
+            resposta.vary.add("Accept-Encoding")
+        if codificacao:
+            resposta.headers["Content-Encoding"] = codificacao
+        return resposta
+
+    def responder_spa(self, nome=""):
+        """O arquivo, se existir; senão o index.html (rotas do React Router)."""
+        nome = nome.replace("\\", "/").lstrip("/")
+        if nome and self._arquivo(nome) is not None:
+            return self.responder(nome)
+        return self.responder("index.html")
+
+
+if __name__ == "__main__":
+    pasta = sys.argv[1] if len(sys.argv) > 1 else "static"
+    print(f"{precomprimir(pasta)} variantes pré-comprimidas em {pasta}")
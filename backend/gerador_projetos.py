@@ -0,0 +1,299 @@
+# gerador_projetos.py
+"""
+Projetos sintéticos para benchmark, reproduzíveis a partir de uma semente.
+
+`gerar_projeto` monta áreas, ambientes, circuitos (mistura de tipos e potências
+realistas), quadros com módulos suficientes para todos os circuitos, vinculações
+de uma fração deles, keypads com botões apontando para circuitos e cenas, e cenas
+com ações de circuito e de grupo. Cada tabela é gravada com um único INSERT em
+lote (executemany com RETURNING dos ids), sem passar pelo unit of work: escopo.py
+e o log de alterações não rodam, então projeto_id é preenchido aqui e o projeto
+começa na revisão 0, como um projeto clonado.
+
+Com a mesma semente e os mesmos parâmetros o conteúdo é idêntico; os GUIDs
+também derivam da semente (e do id do projeto, para não colidirem quando a
+mesma semente é gravada duas vezes no mesmo banco).
+"""
+import math
+import random
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from database import (
+    db, Projeto, Area, Ambiente, QuadroEletrico, Circuito, Modulo, Vinculacao,
+    Keypad, KeypadButton, Cena, Acao, CustomAcao,
+)
+from alocadores import EnderecosHsnet, FaixasLivres, largura_sak
+from ajustes_banco import iniciar_escrita
+from operacoes_projeto import nome_livre
+
+NOMES_AREAS = ["Térreo", "1º Andar", "2º Andar", "Subsolo", "Área Externa", "Cobertura", "Anexo"]
+NOMES_AMBIENTES = [
+    "Sala de Estar", "Sala de Jantar", "Cozinha", "Quarto Master", "Quarto 2", "Quarto 3",
+    "Home Theater", "Escritório", "Varanda", "Lavabo", "Banheiro", "Hall", "Corredor", "Gourmet",
+]
+NOMES_CIRCUITOS = {
+    "luz": ["Luz Principal", "Spots", "Sanca", "Pendente", "Arandela", "Fita LED", "Balizador", "Luz Leitura"],
+    "persiana": ["Persiana", "Cortina", "Blackout"],
+    "hvac": ["Ar Condicionado"],
+}
+NOMES_CENAS = ["Todos Ligados", "Todos Desligados", "Cinema", "Jantar", "Leitura", "Relax", "Festa", "Noite"]
+CORES_KEYPAD = ["WHITE", "BLACK", "BRUSHED BLACK", "NICKEL", "TITANIUM"]
+
+# Módulo que atende cada categoria de circuito e quantos canais ele tem
+MODULO_POR_CATEGORIA = {"dimer": ("DIM8", 8), "luz": ("RL12", 12), "persiana": ("LX4", 4), "hvac": ("SA1", 1)}
+
+PADROES = {
+    "areas": 3,
+    "ambientes_por_area": 4,
+    "circuitos_por_ambiente": (4, 10),        # (mínimo, máximo)
+    "tipos": {"luz": 0.7, "persiana": 0.2, "hvac": 0.1},
+    "dimerizaveis": 0.4,                      # fração das luzes
+    "quadros": 1,
+    "modulos_por_quadro": 16,                 # mais módulos que isso abrem quadros novos
+    "vinculados": 1.0,                        # fração dos circuitos já vinculada
+    "keypads_por_ambiente": 1,
+    "botoes": {4: 0.6, 2: 0.3, 1: 0.1},       # teclas por keypad
+    "cenas_por_ambiente": 2,
+    "acoes_por_cena": (2, 6),
+    "grupos": 0.1,                            # fração das ações que é de grupo (ambiente inteiro)
+}
+
+
+def _potencia(rng, tipo):
+    if tipo == "hvac":
+        return float(rng.choice([900, 1200, 1800, 2500, 3500]))
+    if tipo == "persiana":
+        return float(rng.choice([60, 90, 120, 150]))
+    return float(round(min(300, max(5, rng.lognormvariate(math.log(40), 0.6)))))
+
+
+def _sortear(rng, pesos):
+    return rng.choices(list(pesos), weights=list(pesos.values()))[0]
+
+
+def _nome_unico(base, usados):
+    nome, n = base, 2
+    while nome in usados:
+        nome = f"{base} {n}"
+        n += 1
+    usados.add(nome)
+    return nome
+
+
+def _inserir(model, linhas):
+    """INSERT em lote; devolve os ids na ordem de `linhas`."""
+    if not linhas:
+        return []
+    return db.session.execute(
+        insert(model).returning(model.id, sort_by_parameter_order=True), linhas
+    ).scalars().all()
+
+
+def gerar_projeto(nome, user_id, semente=0, **parametros):
+    """
+    Grava um projeto sintético e devolve {"projeto_id", "nome", <tabela>: linhas gravadas}.
+
+    Parâmetros não informados usam PADROES. Não faz commit.
+    """
+    p = {**PADROES, **parametros}
+    rng = random.Random(f"{semente}:{nome}")
+    iniciar_escrita(db.session)
+
+    agora = datetime.utcnow()
+    projeto = Projeto(nome=nome_livre(nome), user_id=user_id, status="ATIVO", data_criacao=agora, data_ativo=agora)
+    db.session.add(projeto)
+    db.session.flush()
+    pid = projeto.id
+    rng_guid = random.Random(f"{semente}:{nome}:{pid}:guid")
+
+    def guid():
+        return str(uuid.UUID(int=rng_guid.getrandbits(128), version=4))
+
+    # Áreas e ambientes
+    nomes_areas = set()
+    area_ids = _inserir(Area, [
+        {"nome": _nome_unico(NOMES_AREAS[i % len(NOMES_AREAS)], nomes_areas), "projeto_id": pid}
+        for i in range(p["areas"])
+    ])
+    linhas_ambientes = []
+    for area_id in area_ids:
+        usados = set()
+        for i in range(p["ambientes_por_area"]):
+            nome_ambiente = _nome_unico(NOMES_AMBIENTES[rng.randrange(len(NOMES_AMBIENTES))], usados)
+            linhas_ambientes.append({"nome": nome_ambiente, "area_id": area_id, "projeto_id": pid})
+    ambiente_ids = _inserir(Ambiente, linhas_ambientes)
+    area_do_ambiente = {a: linha["area_id"] for a, linha in zip(ambiente_ids, linhas_ambientes)}
+
+    # Circuitos: tipo, potência e SAK contíguo pela largura do tipo
+    saks = FaixasLivres([])
+    linhas_circuitos = []
+    for ambiente_id in ambiente_ids:
+        usados = set()
+        for _ in range(rng.randint(*p["circuitos_por_ambiente"])):
+            tipo = _sortear(rng, p["tipos"])
+            largura = largura_sak(tipo)
+            linhas_circuitos.append({
+                "identificador": f"C{len(linhas_circuitos) + 1:03d}",
+                "nome": _nome_unico(rng.choice(NOMES_CIRCUITOS[tipo]), usados),
+                "tipo": tipo,
+                "dimerizavel": tipo == "luz" and rng.random() < p["dimerizaveis"],
+                "potencia": _potencia(rng, tipo),
+                "ambiente_id": ambiente_id,
+                "projeto_id": pid,
+                "sak": saks.alocar(largura) if largura else None,
+                "quantidade_saks": largura,
+            })
+    circuito_ids = _inserir(Circuito, linhas_circuitos)
+    circuitos = [dict(linha, id=cid) for cid, linha in zip(circuito_ids, linhas_circuitos)]
+
+    # Módulos para todos os circuitos (por categoria), distribuídos pelos quadros
+    por_categoria = {}
+    for c in circuitos:
+        categoria = "dimer" if c["dimerizavel"] else c["tipo"]
+        por_categoria.setdefault(categoria, []).append(c)
+    planos = []  # (tipo do módulo, canais, circuitos atendidos)
+    for categoria, lista in por_categoria.items():
+        tipo, canais = MODULO_POR_CATEGORIA[categoria]
+        planos += [(tipo, canais, lista[i:i + canais]) for i in range(0, len(lista), canais)]
+
+    n_quadros = max(p["quadros"], -(-len(planos) // p["modulos_por_quadro"]), 1)
+    quadro_ids = _inserir(QuadroEletrico, [
+        {"nome": f"Quadro {i + 1}", "ambiente_id": ambiente_ids[i * len(ambiente_ids) // n_quadros],
+         "projeto_id": pid, "notes": None}
+        for i in range(n_quadros)
+    ])
+
+    hsnets = EnderecosHsnet(set())
+    [hsnet_controlador] = hsnets.alocar("controlador")
+    [controlador_id] = _inserir(Modulo, [{
+        "nome": "AQL-GV-M4", "tipo": "AQL-GV-M4", "quantidade_canais": 0, "projeto_id": pid,
+        "hsnet": hsnet_controlador, "dev_id": hsnet_controlador, "is_controller": True,
+        "is_logic_server": True, "ip_address": "192.168.0.245", "quadro_eletrico_id": quadro_ids[0],
+        "parent_controller_id": None,
+    }])
+    enderecos = hsnets.alocar("modulo", len(planos))
+    contagem = {}
+    linhas_modulos = []
+    for i, ((tipo, canais, _), hsnet) in enumerate(zip(planos, enderecos)):
+        contagem[tipo] = contagem.get(tipo, 0) + 1
+        linhas_modulos.append({
+            "nome": f"{tipo} {contagem[tipo]}", "tipo": tipo, "quantidade_canais": canais, "projeto_id": pid,
+            "hsnet": hsnet, "dev_id": hsnet, "is_controller": False, "is_logic_server": False,
+            "ip_address": None, "quadro_eletrico_id": quadro_ids[i * n_quadros // len(planos)],
+            "parent_controller_id": controlador_id,
+        })
+    modulo_ids = _inserir(Modulo, linhas_modulos)
+
+    # Vinculações: uma fração sorteada dos circuitos, cada um no seu canal do plano
+    _inserir(Vinculacao, [
+        {"circuito_id": c["id"], "modulo_id": modulo_id, "canal": canal}
+        for modulo_id, (_, _, atendidos) in zip(modulo_ids, planos)
+        for canal, c in enumerate(atendidos, start=1)
+        if rng.random() < p["vinculados"]
+    ])
+
+    # Cenas: ações de circuito (luz/persiana do ambiente) e de grupo (ambiente da mesma área)
+    controlaveis = {}
+    for c in circuitos:
+        if c["tipo"] != "hvac":
+            controlaveis.setdefault(c["ambiente_id"], []).append(c)
+    ambientes_da_area = {}
+    for ambiente_id, area_id in area_do_ambiente.items():
+        ambientes_da_area.setdefault(area_id, []).append(ambiente_id)
+
+    linhas_cenas, acoes_por_cena = [], []
+    for ambiente_id in ambiente_ids:
+        alvos = controlaveis.get(ambiente_id, [])
+        if not alvos:
+            continue
+        usados = set()
+        for _ in range(p["cenas_por_ambiente"]):
+            linhas_cenas.append({
+                "guid": guid(), "nome": _nome_unico(rng.choice(NOMES_CENAS), usados),
+                "ambiente_id": ambiente_id, "projeto_id": pid, "scene_movers": False,
+            })
+            quantidade = min(rng.randint(*p["acoes_por_cena"]), len(alvos))
+            acoes = []
+            for c in rng.sample(alvos, quantidade):
+                if rng.random() < p["grupos"]:
+                    grupo = rng.choice([a for a in ambientes_da_area[area_do_ambiente[ambiente_id]]
+                                        if a in controlaveis])
+                    acoes.append((7, str(grupo), [str(g["id"]) for g in controlaveis.get(grupo, [])]))
+                else:
+                    acoes.append((0, str(c["id"]), []))
+            acoes_por_cena.append(acoes)
+    cena_ids = _inserir(Cena, linhas_cenas)
+
+    linhas_acoes, membros = [], []
+    for cena_id, acoes in zip(cena_ids, acoes_por_cena):
+        grupos_na_cena = set()
+        for action_type, alvo, grupo in acoes:
+            if action_type == 7 and alvo in grupos_na_cena:
+                continue
+            grupos_na_cena.add(alvo)
+            linhas_acoes.append({"cena_id": cena_id, "level": rng.choice([0, 25, 50, 75, 100]),
+                                 "action_type": action_type, "target_guid": alvo})
+            membros.append(grupo)
+    acao_ids = _inserir(Acao, linhas_acoes)
+    _inserir(CustomAcao, [
+        {"acao_id": acao_id, "target_guid": alvo, "enable": rng.random() < 0.9,
+         "level": rng.choice([25, 50, 75, 100])}
+        for acao_id, grupo in zip(acao_ids, membros)
+        for alvo in grupo
+    ])
+
+    # Keypads e teclas: circuito do ambiente (modo 2), cena do ambiente (modo 1) ou livre (modo 3)
+    cenas_do_ambiente = {}
+    for cena_id, linha in zip(cena_ids, linhas_cenas):
+        cenas_do_ambiente.setdefault(linha["ambiente_id"], []).append(cena_id)
+
+    linhas_keypads = []
+    for ambiente_id in ambiente_ids:
+        for k in range(p["keypads_por_ambiente"]):
+            linhas_keypads.append({
+                "nome": f"Keypad {k + 1}", "modelo": "RQR-K", "color": rng.choice(CORES_KEYPAD),
+                "button_color": rng.choice(["WHITE", "BLACK"]), "button_count": _sortear(rng, p["botoes"]),
+                "hsnet": None, "dev_id": None, "ambiente_id": ambiente_id, "projeto_id": pid, "notes": None,
+            })
+    for linha, hsnet in zip(linhas_keypads, hsnets.alocar("keypad", len(linhas_keypads))):
+        linha["hsnet"] = linha["dev_id"] = hsnet
+    keypad_ids = _inserir(Keypad, linhas_keypads)
+
+    zero_guid = "00000000-0000-0000-0000-000000000000"
+    linhas_botoes = []
+    for keypad_id, linha in zip(keypad_ids, linhas_keypads):
+        alvos = controlaveis.get(linha["ambiente_id"], [])
+        cenas = cenas_do_ambiente.get(linha["ambiente_id"], [])
+        for ordem in range(1, linha["button_count"] + 1):
+            botao = {
+                "keypad_id": keypad_id, "ordem": ordem, "guid": guid(), "projeto_id": pid,
+                "circuito_id": None, "cena_id": None, "modo": 3, "command_on": 0, "command_off": 0,
+                "can_hold": False, "target_object_guid": zero_guid,
+            }
+            sorteio = rng.random()
+            if cenas and sorteio < 0.25:
+                botao.update(cena_id=rng.choice(cenas), modo=1, command_on=1)
+            elif alvos and sorteio < 0.9:
+                c = rng.choice(alvos)
+                persiana = c["tipo"] == "persiana"
+                botao.update(circuito_id=c["id"], modo=2, command_on=3 if persiana else 1,
+                             command_off=4 if persiana else 0, can_hold=c["dimerizavel"])
+            linhas_botoes.append(botao)
+    _inserir(KeypadButton, linhas_botoes)
+
+    return {
+        "projeto_id": pid,
+        "nome": projeto.nome,
+        "areas": len(area_ids),
+        "ambientes": len(ambiente_ids),
+        "circuitos": len(circuito_ids),
+        "quadros": len(quadro_ids),
+        "modulos": len(modulo_ids) + 1,
+        "keypads": len(keypad_ids),
+        "botoes": len(linhas_botoes),
+        "cenas": len(cena_ids),
+        "acoes": len(acao_ids),
+    }
@@ -0,0 +1,125 @@
+# health.py
+"""
+Health check servido fora do Flask.
+
+O middleware responde /api/health direto no WSGI, antes de sessão, Flask-Login
+e do gate de projeto, então o watchdog do Supervisor continua sendo atendido
+mesmo com exportações/importações pesadas em andamento. Ele também conta as
+requisições em andamento e os jobs pesados (marcados com `rastrear_job`).
+"""
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from werkzeug.wsgi import ClosingIterator
+
+HEALTH_PATH = "/api/health"
+
+_lock = threading.Lock()
+_em_andamento = {}     # id da requisição -> instante de início
+_jobs = {}             # id do job -> (tipo, instante de início)
+_contador = 0
+
+
+@contextmanager
+def rastrear_job(tipo):
+    """Marca um job pesado (export/import) enquanto o bloco ou a view executa."""
+    global _contador
+    with _lock:
+        _contador += 1
+        job_id = _contador
+        _jobs[job_id] = (tipo, time.monotonic())
+    try:
+        yield
+    finally:
+        with _lock:
+            _jobs.pop(job_id, None)
+
+
+class HealthMiddleware:
+    """Envolve app.wsgi_app; `db_path` é o arquivo SQLite verificado no probe."""
+
+    def __init__(self, wsgi_app, db_path, cache_segundos=5.0, timeout_db=0.5):
+        self.wsgi_app = wsgi_app
+        self.db_path = db_path
+        self.cache_segundos = cache_segundos
+        self.timeout_db = timeout_db
+        self._db_status = None
+        self._db_verificado_em = 0.0
+
+    def __call__(self, environ, start_response):
+        if environ.get("PATH_INFO") == HEALTH_PATH and environ.get("REQUEST_METHOD") in ("GET", "HEAD"):
+            return self._responder(environ, start_response)
+
+        global _contador
+        with _lock:
+            _contador += 1
+            req_id = _contador
+            _em_andamento[req_id] = time.monotonic()
+
+        def _finalizar():
+            with _lock:
+                _em_andamento.pop(req_id, None)
+
+        try:
+            resposta = self.wsgi_app(environ, start_response)
+        except Exception:
+            _finalizar()
+            raise
+        # O corpo pode ser um stream (send_file): só libera quando o servidor fecha o iterável
+        return ClosingIterator(resposta, [_finalizar])
+
+    def _verificar_db(self):
+        agora = time.monotonic()
+        if self._db_status is not None and agora - self._db_verificado_em < self.cache_segundos:
+            return self._db_status
+
+        inicio = time.perf_counter()
+        try:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=self.timeout_db)
+            try:
+                conn.execute("SELECT 1").fetchone()
+            finally:
+                conn.close()
+            status = {"ok": True, "latency_ms": round((time.perf_counter() - inicio) * 1000, 2)}
+        except sqlite3.Error as e:
+            status = {"ok": False, "error": str(e)}
+
+        self._db_status, self._db_verificado_em = status, agora
+        return status
+
+    def _responder(self, environ, start_response):
+        agora = time.monotonic()
+        with _lock:
+            inicios = list(_em_andamento.values())
+            jobs = list(_jobs.values())
+
+        jobs_por_tipo = {}
+        for tipo, _ in jobs:
+            jobs_por_tipo[tipo] = jobs_por_tipo.get(tipo, 0) + 1
+
+        db_status = self._verificar_db()
+        payload = {
+            "ok": db_status["ok"],
+            "db": db_status,
+            "jobs": {
+                "running": len(jobs),
+                "by_type": jobs_por_tipo,
+                "oldest_seconds": round(agora - min(i for _, i in jobs), 1) if jobs else 0,
+            },
+            "workers": {
+                "in_flight": len(inicios),
+                "oldest_request_seconds": round(agora - min(inicios), 1) if inicios else 0,
+            },
+        }
+
+        corpo = json.dumps(payload).encode("utf-8")
+        status = "200 OK" if db_status["ok"] else "503 Service Unavailable"
+        start_response(status, [
+            ("Content-Type", "application/json"),
+            ("Content-Length", str(len(corpo))),
+            ("Cache-Control", "no-store"),
+        ])
+        return [] if environ.get("REQUEST_METHOD") == "HEAD" else [corpo]
@@ -0,0 +1,120 @@
+# json_backend.py
+"""
+Codificação JSON com orjson quando ele está instalado, stdlib caso contrário.
+
+O orjson é opcional (não está no requirements.txt: no Alpine de algumas
+arquiteturas ele precisaria de Rust para compilar). dumps() gera os mesmos
+bytes que json.dumps com os mesmos parâmetros: indentação de 2, separadores
+padrão e ensure_ascii, que o orjson não tem e é feito aqui escapando os
+trechos não-ASCII. O .rwp depende disso. Quando o orjson formataria algo de
+outro jeito o valor vai para a stdlib: floats em notação científica
+(|x| < 1e-4 ou >= 1e16), NaN/Infinity, chaves não-string e inteiros acima
+de 64 bits.
+"""
+import json
+import re
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+BACKEND = "orjson" if orjson else "json"
+
+_NAO_ASCII = re.compile(rb"[\x80-\xff]+")
+
+
+def _escapar(trecho):
+    # Mesmo formato de json.dumps(ensure_ascii=True): \uXXXX minúsculo, pares substitutos acima de U+FFFF
+    saida = []
+    for ch in trecho.group().decode("utf-8"):
+        n = ord(ch)
+        if n > 0xFFFF:
+            n -= 0x10000
+            saida.append("\\u%04x\\u%04x" % (0xD800 | (n >> 10), 0xDC00 | (n & 0x3FF)))
+        else:
+            saida.append("\\u%04x" % n)
+    return "".join(saida).encode("ascii")
+
+
+def _floats_compativeis(obj):
+    """Se todo float em `obj` sai igual no orjson e na stdlib (sem notação científica, finito)."""
+    pilha = [obj]
+    while pilha:
+        o = pilha.pop()
+        tipo = type(o)
+        if tipo is dict:
+            pilha.extend(o.values())
+        elif tipo is list or tipo is tuple:
+            pilha.extend(o)
+        elif tipo is float and o and not 1e-4 <= abs(o) < 1e16:
+            return False
+    return True
+
+
+def _dumps_stdlib(obj, indent, sort_keys, ensure_ascii, default):
+    separadores = None if indent else (",", ":")
+    return json.dumps(obj, indent=indent, separators=separadores, sort_keys=sort_keys,
+                      ensure_ascii=ensure_ascii, default=default).encode("utf-8")
+
+
+def dumps(obj, indent=None, sort_keys=False, ensure_ascii=False, default=None, exato=True):
+    """
+    JSON em bytes UTF-8: indentado com `indent`=2, compacto (",", ":") sem ele.
+
+    `exato=False` dispensa a verificação dos floats (uma passada pelo objeto);
+    a saída continua JSON equivalente, só com floats extremos escritos de
+    outro jeito. Serve para respostas da API, não para arquivos.
+    """
+    if orjson is not None and indent in (None, 2) and (not exato or _floats_compativeis(obj)):
+        opcoes = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if indent:
+            opcoes |= orjson.OPT_INDENT_2
+        if sort_keys:
+            opcoes |= orjson.OPT_SORT_KEYS
+        try:
+            saida = orjson.dumps(obj, default=default, option=opcoes)
+        except TypeError:
+            # chave não-string, inteiro grande, tipo que o default não trata: stdlib decide
+            pass
+        else:
+            return _NAO_ASCII.sub(_escapar, saida) if ensure_ascii else saida
+    return _dumps_stdlib(obj, indent, sort_keys, ensure_ascii, default)
+
+
+def loads(dados):
+    """json.loads pelo orjson; o que ele recusa (BOM, UTF-16, NaN) é tentado na stdlib."""
+    if orjson is not None:
+        try:
+            return orjson.loads(dados)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(dados)
+
+
+class ProvedorJSON(DefaultJSONProvider):
+    """JSON provider do Flask sobre dumps(), com chaves ordenadas como no padrão."""
+
+    # UTF-8 direto: mesmo JSON para o cliente, sem o custo de escapar acentos a cada resposta
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        # Só as duas formas que response() usa; qualquer outra combinação fica com a stdlib
+        if orjson is None or kwargs not in ({"indent": 2}, {"separators": (",", ":")}):
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, indent=kwargs.get("indent"), sort_keys=self.sort_keys,
+                     ensure_ascii=self.ensure_ascii, default=self.default, exato=False).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if (self.compact is None and self._app.debug) or self.compact is False else None
+        corpo = dumps(obj, indent=indent, sort_keys=self.sort_keys, ensure_ascii=self.ensure_ascii,
+                      default=self.default, exato=False)
+        return self._app.response_class(corpo + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,80 @@
+# limite_login.py
+"""
+Limite de tentativas de login por token bucket.
+
+Cada usuário e cada IP têm um balde com capacidade igual ao limite por minuto,
+reabastecido continuamente. /api/login consome uma ficha de cada balde antes de
+verificar a senha; sem ficha a resposta é 429 com Retry-After, sem gastar CPU
+com o hash. Assim uma rajada de logins (ou força bruta) não monopoliza o worker.
+"""
+import threading
+import time
+
+MAX_CHAVES = 10_000  # acima disso os baldes cheios (ociosos) são descartados
+
+
+class BaldeDeFichas:
+    """Baldes por chave com `por_minuto` fichas de capacidade e reposição."""
+
+    def __init__(self, por_minuto):
+        self.capacidade = float(por_minuto)
+        self.taxa = por_minuto / 60.0  # fichas por segundo
+        self._baldes = {}  # chave -> (fichas, instante)
+        self._lock = threading.Lock()
+
+    @property
+    def ativo(self):
+        return self.capacidade > 0
+
+    def _nivel(self, chave, agora):
+        fichas, instante = self._baldes.get(chave, (self.capacidade, agora))
+        return min(self.capacidade, fichas + (agora - instante) * self.taxa)
+
+    def consumir(self, chave):
+        """Consome uma ficha; devolve 0 se havia, senão os segundos até a próxima."""
+        if not self.ativo:
+            return 0
+        agora = time.monotonic()
+        with self._lock:
+            fichas = self._nivel(chave, agora)
+            if fichas < 1:
+                self._baldes[chave] = (fichas, agora)
+                return (1 - fichas) / self.taxa
+            self._baldes[chave] = (fichas - 1, agora)
+            if len(self._baldes) > MAX_CHAVES:
+                self._podar(agora)
+            return 0
+
+    def _podar(self, agora):
+        cheios = [c for c in self._baldes if self._nivel(c, agora) >= self.capacidade]
+        for chave in cheios:
+            del self._baldes[chave]
+
+    def limpar(self):
+        with self._lock:
+            self._baldes.clear()
+
+
+class LimiteLogin:
+    """Um balde por usuário e outro por IP; o login passa se os dois tiverem ficha."""
+
+    def __init__(self, por_usuario=0, por_ip=0):
+        self.configurar(por_usuario, por_ip)
+
+    def configurar(self, por_usuario, por_ip):
+        self.usuarios = BaldeDeFichas(por_usuario)
+        self.ips = BaldeDeFichas(por_ip)
+
+    def tentar(self, username, ip):
+        """Segundos a aguardar (0 = pode tentar agora)."""
+        espera_ip = self.ips.consumir(ip or "-")
+        if espera_ip:
+            return espera_ip
+        return self.usuarios.consumir((username or "").lower())
+
+    def limpar(self):
+        self.usuarios.limpar()
+        self.ips.limpar()
+
+
+limite_login = LimiteLogin()
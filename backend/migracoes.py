@@ -0,0 +1,89 @@
+# migracoes.py
+"""
+Migrações leves aplicadas na inicialização.
+
+db.create_all() só cria tabelas que ainda não existem; bancos antigos em /data
+precisam receber aqui as mudanças de schema feitas depois da criação deles.
+Cada passo é idempotente e pode rodar a cada start.
+"""
+from sqlalchemy import inspect
+
+from database import db
+
+# projeto_id desnormalizado (escopo.py): tabela -> UPDATE que preenche a partir do pai.
+# A ordem importa: circuito e cena copiam de ambiente, que é preenchido antes.
+COLUNAS_PROJETO = (
+    ("ambiente", "UPDATE ambiente SET projeto_id = "
+                 "(SELECT area.projeto_id FROM area WHERE area.id = ambiente.area_id) "
+                 "WHERE projeto_id IS NULL"),
+    ("circuito", "UPDATE circuito SET projeto_id = "
+                 "(SELECT ambiente.projeto_id FROM ambiente WHERE ambiente.id = circuito.ambiente_id) "
+                 "WHERE projeto_id IS NULL"),
+    ("cena", "UPDATE cena SET projeto_id = "
+             "(SELECT ambiente.projeto_id FROM ambiente WHERE ambiente.id = cena.ambiente_id) "
+             "WHERE projeto_id IS NULL"),
+    ("keypad_button", "UPDATE keypad_button SET projeto_id = "
+                      "(SELECT keypad.projeto_id FROM keypad WHERE keypad.id = keypad_button.keypad_id) "
+                      "WHERE projeto_id IS NULL"),
+)
+
+# Índices de uma coluna cobertos por um índice composto que começa pela mesma
+# coluna: só custavam escrita a cada INSERT/UPDATE
+INDICES_REDUNDANTES = (
+    "ix_circuito_projeto_id",   # ix_circuito_projeto_sak
+    "ix_modulo_projeto_id",     # ix_modulo_projeto_hsnet
+    "ix_keypad_projeto_id",     # ix_keypad_projeto_hsnet
+)
+
+
+def _adicionar_projeto_id(conn):
+    """Adiciona e preenche a coluna projeto_id onde ela ainda não existe."""
+    inspetor = inspect(conn)
+    feitos = []
+    for tabela, backfill in COLUNAS_PROJETO:
+        colunas = {c["name"] for c in inspetor.get_columns(tabela)}
+        if "projeto_id" not in colunas:
+            conn.exec_driver_sql(f"ALTER TABLE {tabela} ADD COLUMN projeto_id INTEGER REFERENCES projeto (id)")
+            feitos.append(f"coluna {tabela}.projeto_id")
+        resultado = conn.exec_driver_sql(backfill)
+        if resultado.rowcount:
+            feitos.append(f"{tabela}.projeto_id preenchido em {resultado.rowcount} linha(s)")
+    return feitos
+
+
+def _criar_indices_faltantes(conn):
+    """Cria os índices declarados nos models que ainda não existem no banco."""
+    inspetor = inspect(conn)
+    criados = []
+    for tabela in db.metadata.sorted_tables:
+        if not inspetor.has_table(tabela.name):
+            continue
+        existentes = {ix["name"] for ix in inspetor.get_indexes(tabela.name)}
+        for indice in tabela.indexes:
+            if indice.name not in existentes:
+                indice.create(bind=conn)
+                criados.append(indice.name)
+    return criados
+
+
+def _remover_indices_redundantes(conn):
+    """Remove os índices de INDICES_REDUNDANTES que ainda existem no banco."""
+    inspetor = inspect(conn)
+    removidos = []
+    for tabela in inspetor.get_table_names():
+        for indice in inspetor.get_indexes(tabela):
+            if indice["name"] in INDICES_REDUNDANTES:
+                conn.exec_driver_sql(f"DROP INDEX {indice['name']}")
+                removidos.append(indice["name"])
+    return removidos
+
+
+def aplicar_migracoes(engine):
+    """Executa todas as migrações numa transação; retorna a lista do que foi feito."""
+    feitos = []
+    with engine.begin() as conn:
+        feitos += _adicionar_projeto_id(conn)
+        # Depois das colunas novas, que também têm índice
+        feitos += [f"índice {nome}" for nome in _criar_indices_faltantes(conn)]
+        feitos += [f"índice {nome} removido" for nome in _remover_indices_redundantes(conn)]
+    return feitos
@@ -0,0 +1,206 @@
+# operacoes_projeto.py
+"""
+Operações em massa sobre um projeto inteiro, em SQL por conjunto.
+
+excluir_projeto apaga tabela por tabela, dos filhos para os pais, com um
+DELETE ... WHERE ... IN (subconsulta) cada; nenhuma linha é carregada em
+memória, ao contrário do cascade do ORM, que carrega cada filho e emite um
+DELETE por linha.
+
+clonar_projeto copia cada tabela com um único INSERT ... SELECT. Os ids novos
+são os de origem deslocados para depois do maior id da tabela (id + delta),
+então toda FK para uma tabela copiada é remapeada somando o delta dela, sem
+mapa de ids em Python. Nada passa pelo ORM: escopo.py e o log de alterações
+não rodam, por isso projeto_id é preenchido explicitamente e o projeto novo
+começa sem histórico (revisão 0).
+"""
+from datetime import datetime
+
+from sqlalchemy import select, insert, delete, or_, func, case, cast, literal, Integer, String
+
+from database import (
+    db, Projeto, Area, Ambiente, QuadroEletrico, Circuito, Modulo, Vinculacao,
+    Keypad, KeypadButton, Cena, Acao, CustomAcao, ProjetoAlteracao,
+)
+
+
+def _novo_guid():
+    """Expressão SQLite que gera um UUID v4 por linha."""
+    def hexa(n, inicio=1):
+        return func.substr(func.lower(func.hex(func.randomblob(n))), inicio, type_=String)
+    variante = func.substr("89ab", 1 + func.random().bitwise_and(3), 1, type_=String)
+    return (
+        hexa(4) + "-" + hexa(2) + "-4" + hexa(2, 2) + "-"
+        + variante + hexa(2, 2) + "-" + hexa(6)
+    )
+
+
+def _delta(conn, tabela, filtro):
+    """Deslocamento que leva os ids selecionados para depois do maior id da tabela."""
+    menor = conn.execute(select(func.min(tabela.c.id)).where(filtro)).scalar()
+    if menor is None:
+        return 0
+    maior = conn.execute(select(func.max(tabela.c.id))).scalar()
+    return maior + 1 - menor
+
+
+def _remapear_fk(coluna, ids_origem, delta):
+    # FK opcional: só remapeia se apontar para uma linha copiada; senão fica NULL
+    return case((coluna.in_(ids_origem), coluna + delta), else_=None)
+
+
+def _remapear_texto(coluna, ids_origem, delta):
+    # Mesmo critério de remap_numeric_guid da importação: ids do projeto viram os novos,
+    # qualquer outro valor (GUID, id de fora) é mantido
+    ids = ids_origem.subquery()
+    return case(
+        (coluna.in_(select(cast(ids.c.id, String))),
+         cast(cast(coluna, Integer) + delta, String)),
+        else_=coluna,
+    )
+
+
+def _copiar(conn, model, filtro, **valores):
+    """INSERT ... SELECT das linhas de `model` em `filtro`, substituindo as colunas em `valores`."""
+    tabela = model.__table__
+    nomes = [c.name for c in tabela.c if c.name != "id" or "id" in valores]
+    origem = select(*[valores.get(nome, tabela.c[nome]) for nome in nomes]).where(filtro)
+    return conn.execute(insert(tabela).from_select(nomes, origem)).rowcount
+
+
+def nome_livre(nome):
+    """Primeiro nome disponível no padrão usado pela importação: "X (cópia N)"."""
+    candidato, n = nome, 1
+    while db.session.execute(select(Projeto.id).where(Projeto.nome == candidato)).first():
+        candidato = f"{nome} (cópia {n})"
+        n += 1
+    return candidato
+
+
+def clonar_projeto(origem_id, nome, user_id):
+    """
+    Copia o projeto `origem_id` com todas as entidades para um projeto novo.
+
+    Roda na transação da sessão atual (o chamador faz commit) e retorna
+    (projeto novo, {tabela: linhas copiadas}).
+    """
+    agora = datetime.utcnow()
+    novo = Projeto(nome=nome, user_id=user_id, status="ATIVO", data_criacao=agora, data_ativo=agora)
+    db.session.add(novo)
+    db.session.flush()
+    conn = db.session.connection()
+    novo_id = literal(novo.id)
+
+    # Ids de origem, usados como filtro e para validar FKs opcionais
+    areas = select(Area.id).where(Area.projeto_id == origem_id)
+    ambientes = select(Ambiente.id).where(Ambiente.projeto_id == origem_id)
+    quadros = select(QuadroEletrico.id).where(QuadroEletrico.projeto_id == origem_id)
+    modulos = select(Modulo.id).where(Modulo.projeto_id == origem_id)
+    circuitos = select(Circuito.id).where(Circuito.projeto_id == origem_id)
+    keypads = select(Keypad.id).where(Keypad.projeto_id == origem_id)
+    cenas = select(Cena.id).where(Cena.projeto_id == origem_id)
+    acoes = select(Acao.id).where(Acao.cena_id.in_(cenas))
+
+    d = {
+        "areas": _delta(conn, Area.__table__, Area.id.in_(areas)),
+        "ambientes": _delta(conn, Ambiente.__table__, Ambiente.id.in_(ambientes)),
+        "quadros": _delta(conn, QuadroEletrico.__table__, QuadroEletrico.id.in_(quadros)),
+        "modulos": _delta(conn, Modulo.__table__, Modulo.id.in_(modulos)),
+        "circuitos": _delta(conn, Circuito.__table__, Circuito.id.in_(circuitos)),
+        "keypads": _delta(conn, Keypad.__table__, Keypad.id.in_(keypads)),
+        "cenas": _delta(conn, Cena.__table__, Cena.id.in_(cenas)),
+        "acoes": _delta(conn, Acao.__table__, Acao.id.in_(acoes)),
+    }
+
+    copiados = {}
+    # Pais antes dos filhos (FKs checadas ao fim de cada statement)
+    copiados["areas"] = _copiar(
+        conn, Area, Area.projeto_id == origem_id,
+        id=Area.id + d["areas"], projeto_id=novo_id)
+    copiados["ambientes"] = _copiar(
+        conn, Ambiente, Ambiente.projeto_id == origem_id,
+        id=Ambiente.id + d["ambientes"], area_id=Ambiente.area_id + d["areas"], projeto_id=novo_id)
+    copiados["quadros_eletricos"] = _copiar(
+        conn, QuadroEletrico, QuadroEletrico.projeto_id == origem_id,
+        id=QuadroEletrico.id + d["quadros"], ambiente_id=QuadroEletrico.ambiente_id + d["ambientes"],
+        projeto_id=novo_id)
+    copiados["modulos"] = _copiar(
+        conn, Modulo, Modulo.projeto_id == origem_id,
+        id=Modulo.id + d["modulos"], projeto_id=novo_id,
+        quadro_eletrico_id=_remapear_fk(Modulo.quadro_eletrico_id, quadros, d["quadros"]),
+        parent_controller_id=_remapear_fk(Modulo.parent_controller_id, modulos, d["modulos"]))
+    copiados["circuitos"] = _copiar(
+        conn, Circuito, Circuito.projeto_id == origem_id,
+        id=Circuito.id + d["circuitos"], ambiente_id=Circuito.ambiente_id + d["ambientes"],
+        projeto_id=novo_id)
+    copiados["vinculacoes"] = _copiar(
+        conn, Vinculacao, Vinculacao.circuito_id.in_(circuitos) & Vinculacao.modulo_id.in_(modulos),
+        circuito_id=Vinculacao.circuito_id + d["circuitos"], modulo_id=Vinculacao.modulo_id + d["modulos"])
+    copiados["keypads"] = _copiar(
+        conn, Keypad, Keypad.projeto_id == origem_id,
+        id=Keypad.id + d["keypads"], ambiente_id=Keypad.ambiente_id + d["ambientes"], projeto_id=novo_id)
+    copiados["cenas"] = _copiar(
+        conn, Cena, Cena.projeto_id == origem_id,
+        id=Cena.id + d["cenas"], guid=_novo_guid(), ambiente_id=Cena.ambiente_id + d["ambientes"],
+        projeto_id=novo_id)
+    copiados["keypad_buttons"] = _copiar(
+        conn, KeypadButton, KeypadButton.keypad_id.in_(keypads),
+        keypad_id=KeypadButton.keypad_id + d["keypads"], guid=_novo_guid(), projeto_id=novo_id,
+        circuito_id=_remapear_fk(KeypadButton.circuito_id, circuitos, d["circuitos"]),
+        cena_id=_remapear_fk(KeypadButton.cena_id, cenas, d["cenas"]),
+        target_object_guid=_remapear_texto(KeypadButton.target_object_guid, circuitos, d["circuitos"]))
+    copiados["acoes"] = _copiar(
+        conn, Acao, Acao.cena_id.in_(cenas),
+        id=Acao.id + d["acoes"], cena_id=Acao.cena_id + d["cenas"],
+        # 0 = circuito, 7 = grupo (ambiente)
+        target_guid=case(
+            (Acao.action_type == 0, _remapear_texto(Acao.target_guid, circuitos, d["circuitos"])),
+            (Acao.action_type == 7, _remapear_texto(Acao.target_guid, ambientes, d["ambientes"])),
+            else_=Acao.target_guid,
+        ))
+    copiados["custom_acoes"] = _copiar(
+        conn, CustomAcao, CustomAcao.acao_id.in_(acoes),
+        acao_id=CustomAcao.acao_id + d["acoes"],
+        target_guid=_remapear_texto(CustomAcao.target_guid, circuitos, d["circuitos"]))
+
+    return novo, copiados
+
+
+def excluir_projeto(projeto_id):
+    """
+    Apaga o projeto e tudo que pertence a ele, na transação da sessão atual.
+
+    Retorna {tabela: linhas apagadas}. Os filhos são achados pelas FKs
+    estruturais (área -> ambiente -> ...), não pelo projeto_id copiado, para
+    que nada que impeça o DELETE do pai fique para trás. Botões de keypad de
+    outros projetos que apontam para circuitos/cenas daqui ficam com NULL
+    pelo ON DELETE SET NULL das FKs.
+    """
+    conn = db.session.connection()
+
+    areas = select(Area.id).where(Area.projeto_id == projeto_id)
+    ambientes = select(Ambiente.id).where(Ambiente.area_id.in_(areas))
+    circuitos = select(Circuito.id).where(Circuito.ambiente_id.in_(ambientes))
+    cenas = select(Cena.id).where(Cena.ambiente_id.in_(ambientes))
+    acoes = select(Acao.id).where(Acao.cena_id.in_(cenas))
+    keypads = select(Keypad.id).where(or_(Keypad.projeto_id == projeto_id, Keypad.ambiente_id.in_(ambientes)))
+    modulos = select(Modulo.id).where(Modulo.projeto_id == projeto_id)
+
+    # Filhos antes dos pais: cada DELETE só depende de tabelas ainda intactas
+    passos = (
+        ("custom_acoes", CustomAcao, CustomAcao.acao_id.in_(acoes)),
+        ("acoes", Acao, Acao.cena_id.in_(cenas)),
+        ("keypad_buttons", KeypadButton, KeypadButton.keypad_id.in_(keypads)),
+        ("cenas", Cena, Cena.ambiente_id.in_(ambientes)),
+        ("keypads", Keypad, Keypad.id.in_(keypads)),
+        ("vinculacoes", Vinculacao, or_(Vinculacao.circuito_id.in_(circuitos), Vinculacao.modulo_id.in_(modulos))),
+        ("circuitos", Circuito, Circuito.ambiente_id.in_(ambientes)),
+        ("modulos", Modulo, Modulo.projeto_id == projeto_id),
+        ("quadros_eletricos", QuadroEletrico,
+         or_(QuadroEletrico.projeto_id == projeto_id, QuadroEletrico.ambiente_id.in_(ambientes))),
+        ("ambientes", Ambiente, Ambiente.area_id.in_(areas)),
+        ("areas", Area, Area.projeto_id == projeto_id),
+        ("alteracoes", ProjetoAlteracao, ProjetoAlteracao.projeto_id == projeto_id),
+        ("projeto", Projeto, Projeto.id == projeto_id),
+    )
+    return {nome: conn.execute(delete(model.__table__).where(filtro)).rowcount for nome, model, filtro in passos}
@@ -0,0 +1,376 @@
+# perf.py
+"""
+Instrumentação de desempenho por requisição.
+
+Para cada requisição do Flask registra tempo total, quantidade e tempo de
+statements SQL (eventos do engine), linhas lidas do SQLite (via row_factory
+da conexão) e bytes enviados. Os bytes são contados por MedidorBytes, na camada
+WSGI por fora da compressão: valem o corpo já comprimido e também as respostas
+em stream, que não têm Content-Length no after_request. Os valores são agregados por endpoint em
+histogramas cumulativos e numa janela deslizante dos últimos minutos, expostos
+em /api/admin/metrics (JSON ou formato texto do Prometheus).
+
+Opcionalmente (opção slow_query_ms do add-on) guarda as consultas acima do
+limite, com parâmetros e EXPLAIN QUERY PLAN, em /api/admin/slow-queries.
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import request, has_request_context
+from sqlalchemy import event
+from werkzeug.wsgi import ClosingIterator
+
+# Limites dos buckets do histograma de latência, em milissegundos
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+JANELA_SEGUNDOS = 300
+JANELA_MAX_AMOSTRAS = 1000
+
+# Amostra da requisição em andamento nesta thread (None fora de requisições)
+_local = threading.local()
+
+# Chave no environ: presente quando MedidorBytes mede o corpo; recebe a amostra sem os bytes
+_CHAVE_ENVIRON = "roehn.perf.amostra"
+
+
+class _Amostra:
+    __slots__ = ("inicio", "sql_count", "sql_ms", "linhas", "_sql_inicio")
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.linhas = 0
+        self._sql_inicio = None
+
+
+class _Endpoint:
+    def __init__(self):
+        self.requests = 0
+        self.erros = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)  # último = +Inf
+        self.wall_ms = 0.0
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.linhas = 0
+        self.bytes = 0
+        self.janela = deque(maxlen=JANELA_MAX_AMOSTRAS)  # (instante, wall_ms, sql_count, linhas, bytes)
+
+
+def _percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return 0.0
+    idx = min(len(valores_ordenados) - 1, int(round(p / 100 * (len(valores_ordenados) - 1))))
+    return valores_ordenados[idx]
+
+
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def registrar(self, endpoint, metodo, status, wall_ms, sql_count, sql_ms, linhas, tamanho):
+        with self._lock:
+            ep = self._endpoints.get((endpoint, metodo))
+            if ep is None:
+                ep = self._endpoints[(endpoint, metodo)] = _Endpoint()
+            ep.requests += 1
+            ep.erros += 1 if status >= 500 else 0
+            i = 0
+            while i < len(BUCKETS_MS) and wall_ms > BUCKETS_MS[i]:
+                i += 1
+            ep.buckets[i] += 1
+            ep.wall_ms += wall_ms
+            ep.sql_count += sql_count
+            ep.sql_ms += sql_ms
+            ep.linhas += linhas
+            ep.bytes += tamanho
+            ep.janela.append((time.monotonic(), wall_ms, sql_count, linhas, tamanho))
+
+    def limpar(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def snapshot(self):
+        """Totais por endpoint e estatísticas da janela deslizante."""
+        corte = time.monotonic() - JANELA_SEGUNDOS
+        out = []
+        with self._lock:
+            itens = [(k, ep, [a for a in ep.janela if a[0] >= corte]) for k, ep in self._endpoints.items()]
+            for (endpoint, metodo), ep, janela in itens:
+                wall = sorted(a[1] for a in janela)
+                sql = [a[2] for a in janela]
+                out.append({
+                    "endpoint": endpoint,
+                    "method": metodo,
+                    "requests": ep.requests,
+                    "errors": ep.erros,
+                    "wall_ms_avg": round(ep.wall_ms / ep.requests, 2),
+                    "sql_count_avg": round(ep.sql_count / ep.requests, 2),
+                    "sql_ms_avg": round(ep.sql_ms / ep.requests, 2),
+                    "rows_avg": round(ep.linhas / ep.requests, 1),
+                    "bytes_avg": round(ep.bytes / ep.requests),
+                    "histogram_ms": dict(zip([str(b) for b in BUCKETS_MS] + ["+Inf"], ep.buckets)),
+                    "window": {
+                        "seconds": JANELA_SEGUNDOS,
+                        "requests": len(janela),
+                        "wall_ms_p50": round(_percentil(wall, 50), 2),
+                        "wall_ms_p95": round(_percentil(wall, 95), 2),
+                        "wall_ms_p99": round(_percentil(wall, 99), 2),
+                        "sql_count_max": max(sql) if sql else 0,
+                    },
+                })
+        out.sort(key=lambda e: e["wall_ms_avg"] * e["requests"], reverse=True)
+        return out
+
+    def prometheus(self):
+        """Exposição no formato texto do Prometheus (0.0.4)."""
+        linhas = []
+
+        def cabecalho(nome, tipo, ajuda):
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+
+        with self._lock:
+            itens = sorted(self._endpoints.items())
+            rotulos = {k: f'endpoint="{k[0]}",method="{k[1]}"' for k, _ in itens}
+
+            cabecalho("roehn_request_duration_seconds", "histogram", "Tempo total da requisição.")
+            for k, ep in itens:
+                acumulado = 0
+                for limite, n in zip(BUCKETS_MS, ep.buckets):
+                    acumulado += n
+                    linhas.append(f'roehn_request_duration_seconds_bucket{{{rotulos[k]},le="{limite / 1000:g}"}} {acumulado}')
+                linhas.append(f'roehn_request_duration_seconds_bucket{{{rotulos[k]},le="+Inf"}} {ep.requests}')
+                linhas.append(f"roehn_request_duration_seconds_sum{{{rotulos[k]}}} {ep.wall_ms / 1000:.6f}")
+                linhas.append(f"roehn_request_duration_seconds_count{{{rotulos[k]}}} {ep.requests}")
+
+            contadores = (
+                ("roehn_request_errors_total", "Respostas com status 5xx.", lambda ep: ep.erros),
+                ("roehn_sql_statements_total", "Statements SQL executados.", lambda ep: ep.sql_count),
+                ("roehn_sql_seconds_total", "Tempo gasto em statements SQL.", lambda ep: f"{ep.sql_ms / 1000:.6f}"),
+                ("roehn_sql_rows_fetched_total", "Linhas lidas do banco.", lambda ep: ep.linhas),
+                ("roehn_response_bytes_total", "Bytes enviados nas respostas (após a compressão).", lambda ep: ep.bytes),
+            )
+            for nome, ajuda, valor in contadores:
+                cabecalho(nome, "counter", ajuda)
+                for k, ep in itens:
+                    linhas.append(f"{nome}{{{rotulos[k]}}} {valor(ep)}")
+
+        return "\n".join(linhas) + "\n"
+
+
+metricas = Metricas()
+
+
+class ConsultasLentas:
+    """Buffer circular das consultas acima de `limiar_ms`, com o plano do SQLite."""
+
+    # Statements que aceitam EXPLAIN QUERY PLAN
+    _EXPLICAVEIS = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+    def __init__(self, tamanho=200):
+        self.limiar_ms = None
+        self.registros = deque(maxlen=tamanho)
+        self._planos = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ativo(self):
+        return self.limiar_ms is not None
+
+    def instalar(self, engine, limiar_ms):
+        self.limiar_ms = float(limiar_ms)
+        event.listen(engine, "before_cursor_execute", self._antes)
+        event.listen(engine, "after_cursor_execute", self._depois)
+        event.listen(engine, "handle_error", self._erro)
+
+    def _antes(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_consulta_inicio", []).append(time.perf_counter())
+
+    def _erro(self, contexto):
+        pilha = contexto.connection.info.get("_consulta_inicio") if contexto.connection is not None else None
+        if pilha:
+            pilha.pop()
+
+    def _depois(self, conn, cursor, statement, parameters, context, executemany):
+        duracao_ms = (time.perf_counter() - conn.info["_consulta_inicio"].pop()) * 1000
+        if duracao_ms < self.limiar_ms:
+            return
+
+        if executemany and parameters:
+            parametros = parameters[0]
+        else:
+            parametros = parameters
+
+        registro = {
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "duration_ms": round(duracao_ms, 2),
+            "statement": statement,
+            "parameters": [repr(p)[:200] for p in (parametros.values() if isinstance(parametros, dict) else parametros or ())],
+            "executemany": bool(executemany),
+            "endpoint": request.endpoint if has_request_context() else None,
+            "plan": self._plano(cursor.connection, statement, parametros),
+        }
+        with self._lock:
+            self.registros.append(registro)
+
+    def _plano(self, dbapi_connection, statement, parametros):
+        """EXPLAIN QUERY PLAN indentado pela árvore do SQLite (cacheado por statement)."""
+        if not statement.lstrip().upper().startswith(self._EXPLICAVEIS):
+            return []
+        with self._lock:
+            if statement in self._planos:
+                return self._planos[statement]
+
+        try:
+            cur = dbapi_connection.cursor()
+            cur.row_factory = None  # não conta as linhas do EXPLAIN nas métricas
+            try:
+                linhas = cur.execute("EXPLAIN QUERY PLAN " + statement, parametros or ()).fetchall()
+            finally:
+                cur.close()
+        except Exception as e:
+            return [f"(EXPLAIN falhou: {e})"]
+
+        profundidade = {0: -1}
+        plano = []
+        for node_id, pai, _, detalhe in linhas:
+            profundidade[node_id] = profundidade.get(pai, -1) + 1
+            plano.append("  " * profundidade[node_id] + detalhe)
+
+        with self._lock:
+            if len(self._planos) >= 500:
+                self._planos.clear()
+            self._planos[statement] = plano
+        return plano
+
+    def listar(self):
+        with self._lock:
+            return list(reversed(self.registros))
+
+    def limpar(self):
+        with self._lock:
+            self.registros.clear()
+
+
+consultas_lentas = ConsultasLentas()
+
+
+# ---------------------------------------------------------------- hooks
+
+def _antes_sql(conn, cursor, statement, parameters, context, executemany):
+    amostra = getattr(_local, "amostra", None)
+    if amostra is not None:
+        amostra._sql_inicio = time.perf_counter()
+
+
+def _depois_sql(conn, cursor, statement, parameters, context, executemany):
+    amostra = getattr(_local, "amostra", None)
+    if amostra is not None and amostra._sql_inicio is not None:
+        amostra.sql_count += 1
+        amostra.sql_ms += (time.perf_counter() - amostra._sql_inicio) * 1000
+        amostra._sql_inicio = None
+
+
+def _contar_linha(cursor, row):
+    amostra = getattr(_local, "amostra", None)
+    if amostra is not None:
+        amostra.linhas += 1
+    return row
+
+
+def _ao_conectar(dbapi_connection, connection_record):
+    # row_factory devolve a própria tupla: só conta as linhas lidas
+    dbapi_connection.row_factory = _contar_linha
+
+
+def _inicio_requisicao():
+    _local.amostra = _Amostra()
+
+
+def _fim_requisicao(response):
+    amostra = getattr(_local, "amostra", None)
+    if amostra is None:
+        return response
+    _local.amostra = None
+
+    dados = (
+        request.endpoint or "<sem rota>",
+        request.method,
+        response.status_code,
+        (time.perf_counter() - amostra.inicio) * 1000,
+        amostra.sql_count,
+        amostra.sql_ms,
+        amostra.linhas,
+    )
+    if _CHAVE_ENVIRON in request.environ:
+        request.environ[_CHAVE_ENVIRON] = dados  # registrada por MedidorBytes
+    else:
+        metricas.registrar(*dados, response.content_length or 0)
+    return response
+
+
+def _descartar(exc=None):
+    _local.amostra = None
+
+
+class MedidorBytes:
+    """
+    Envolve app.wsgi_app por fora da compressão e registra a amostra da requisição
+    com os bytes realmente enviados.
+
+    Com Content-Length nos headers finais a amostra é registrada na hora e a
+    resposta segue intacta (mantém o wsgi.file_wrapper do send_file); sem ele
+    (stream, corpo comprimido em pedaços) o corpo é contado e a amostra é
+    registrada no close.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        environ[_CHAVE_ENVIRON] = None
+        headers_finais = {}
+
+        def _start_response(status, headers, exc_info=None):
+            headers_finais.update((nome.lower(), valor) for nome, valor in headers)
+            return start_response(status, headers, exc_info)
+
+        resposta = self.wsgi_app(environ, _start_response)
+        dados = environ.pop(_CHAVE_ENVIRON, None)
+        if dados is None:
+            return resposta  # sem amostra (ex.: /api/health, atendido antes do Flask)
+
+        if environ.get("REQUEST_METHOD") == "HEAD":
+            metricas.registrar(*dados, 0)
+            return resposta
+        if "content-length" in headers_finais:
+            metricas.registrar(*dados, int(headers_finais["content-length"]))
+            return resposta
+
+        enviados = [0]
+
+        def _contar():
+            for pedaco in resposta:
+                enviados[0] += len(pedaco)
+                yield pedaco
+
+        fechar = [resposta.close] if hasattr(resposta, "close") else []
+        return ClosingIterator(_contar(), fechar + [lambda: metricas.registrar(*dados, enviados[0])])
+
+
+def instalar(app, engine):
+    """
+    Liga a instrumentação ao app e ao engine (chamar antes da primeira conexão).
+
+    Os bytes só refletem o que foi enviado com MedidorBytes instalado por fora da
+    compressão; sem ele vale o Content-Length visto no after_request.
+    """
+    event.listen(engine, "connect", _ao_conectar)
+    event.listen(engine, "before_cursor_execute", _antes_sql)
+    event.listen(engine, "after_cursor_execute", _depois_sql)
+    app.before_request(_inicio_requisicao)
+    app.after_request(_fim_requisicao)
+    app.teardown_request(_descartar)
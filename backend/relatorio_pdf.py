@@ -0,0 +1,71 @@
+# relatorio_pdf.py
+"""
+Peças do relatório PDF de projeto (/exportar-pdf) que dependem do ReportLab.
+
+O ReportLab leva uma fração grande do tempo de import do app em hosts armhf/armv7,
+então este módulo só é importado pela view na primeira exportação (ou pelo
+pré-carregamento em segundo plano, ver carregamento_tardio.py). Os nomes do
+ReportLab usados pela view são reexportados daqui.
+"""
+from datetime import datetime, timedelta
+
+from flask_login import current_user
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch, mm
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Image
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib import colors
+
+
+class NumberedCanvas(canvas.Canvas):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._saved_page_states = []
+
+    def showPage(self):
+        self._saved_page_states.append(dict(self.__dict__))
+        self._startPage()
+
+    def save(self):
+        total_pages = len(self._saved_page_states)
+        for state in self._saved_page_states:
+            self.__dict__.update(state)
+            self.draw_page_number(total_pages)
+            super().showPage()
+        super().save()
+
+    def draw_page_number(self, page_count):
+        self.setFont("Helvetica", 8)
+        # Centralizado no rodapé: "Página X de Y"
+        self.drawCentredString(A4[0] / 2, 12 * mm, f"Página {self._pageNumber} de {page_count}")
+
+
+def footer(canvas, doc):
+    canvas.saveState()
+    width, height = A4
+    margin = 30
+
+    y_line = 18 * mm
+    canvas.setLineWidth(0.5)
+    canvas.line(margin, y_line, width - margin, y_line)
+
+    timestamp_str = getattr(doc, 'client_timestamp', None)
+    tz_offset_str = getattr(doc, 'tz_offset', None)
+
+    if timestamp_str and tz_offset_str is not None:
+        try:
+            utc_time = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+            offset_minutes = int(tz_offset_str)
+            local_time = utc_time - timedelta(minutes=offset_minutes)
+            formatted_time = local_time.strftime('%d/%m/%Y %H:%M')
+        except (ValueError, TypeError):
+            formatted_time = datetime.now().strftime('%d/%m/%Y %H:%M')
+    else:
+        formatted_time = datetime.now().strftime('%d/%m/%Y %H:%M')
+
+    canvas.setFont("Helvetica", 8)
+    canvas.drawRightString(width - margin, 12 * mm, f"Zafiro - Luxury Technology • {current_user.username} • {formatted_time}")
+
+    canvas.restoreState()
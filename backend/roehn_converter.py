@@ -1,10 +1,13 @@
 # roehn_converter.py
-import json
 import csv
 import uuid
 import io
 from datetime import datetime
 from database import db, User, Projeto, Area, Ambiente, Circuito, Modulo, Vinculacao, Keypad, KeypadButton, Cena, Acao, CustomAcao
+from addon_options import opcao
+from alocadores import EnderecosHsnet, hsnets_em_uso
+from diagnostico import DiagnosticoConversao
+import json_backend
 
 class RoehnProjectConverter:
     # --- AQUI ESTÁ A CORREÇÃO ---
@@ -13,6 +16,8 @@ class RoehnProjectConverter:
         self.project_data = projeto_data
         self.db_session = db_session
         self.user_id = user_id # Armazena o ID do usuário
+        # Trace da conversão no nível configurado no add-on (log_level)
+        self.diag = DiagnosticoConversao(opcao("log_level"))
         self.modules_info = {
             'ADP-RL12': {'driver_guid': '80000000-0000-0000-0000-000000000006', 'slots': {'Load ON/OFF': 12}},
             'RL4': {'driver_guid': '80000000-0000-0000-0000-000000000010', 'slots': {'Load ON/OFF': 4}},
@@ -22,6 +27,7 @@ class RoehnProjectConverter:
         }
         self.zero_guid = "00000000-0000-0000-0000-000000000000"
         self.m4_target_quadro_id = None
+        self._hsnets = None  # (HSNETs no JSON, alocador), ver _enderecos_hsnet
         self.keypad_driver_guid = "90000000-0000-0000-0000-000000000004"
         self.keypad_profile_guid = "40000000-0000-0000-0000-000000000001"
         self.rocker_icon_guid_up_down = "11000000-0000-0000-0000-000000000001"
@@ -266,7 +272,7 @@ class RoehnProjectConverter:
                 pass # ou adicione sua lógica aqui
 
             self.db_session.commit()
-            print("Importação concluída com sucesso!")
+            self.diag.info("Importação concluída com sucesso!")
 
         except Exception as e:
             self.db_session.rollback()
@@ -296,31 +302,31 @@ class RoehnProjectConverter:
                     break
             
             if not target_module:
-                print(f"Módulo {module_name} não encontrado para mover para o quadro específico")
+                self.diag.warning("Módulo %s não encontrado para mover para o quadro específico", module_name)
                 return False
             
             # Encontrar o quadro de destino
             target_board = self._find_automation_board_by_guid(automation_board_guid)
             if not target_board:
-                print(f"Quadro {automation_board_guid} não encontrado")
+                self.diag.warning("Quadro %s não encontrado", automation_board_guid)
                 return False
             
             # Se o módulo já está no quadro de destino, não faz nada
             if current_board == target_board:
-                print(f"Módulo {module_name} já está no quadro de destino")
+                self.diag.debug("Módulo %s já está no quadro de destino", module_name)
                 return True
             
             # Remover o módulo do quadro atual (se não estiver no quadro de destino)
             if current_board:
                 current_board["ModulesList"] = [m for m in current_board.get("ModulesList", []) if m.get("Name") != module_name]
-                print(f"Módulo {module_name} removido do quadro {current_board.get('Name')}")
+                self.diag.debug("Módulo %s removido do quadro %s", module_name, current_board.get('Name'))
             
             # Adicionar ao quadro de destino (garantindo estrutura)
             module_guid = target_module.get("Guid")
             target_board.setdefault("ModulesList", [])
             if not any(m.get("Guid") == module_guid for m in target_board["ModulesList"]):
                 target_board["ModulesList"].append(target_module)
-                print(f"Módulo {module_name} movido para o quadro {target_board.get('Name')}")
+                self.diag.debug("Módulo %s movido para o quadro %s", module_name, target_board.get('Name'))
             
             # Garantir que o módulo esteja registrado no ACNET do M4
             self._ensure_module_guid_registered_in_acnet(module_guid)
@@ -328,15 +334,13 @@ class RoehnProjectConverter:
             return True
             
         except Exception as e:
-            print(f"Erro ao mover módulo para quadro específico: {e}")
-            import traceback
-            traceback.print_exc()
+            self.diag.error("Erro ao mover módulo para quadro específico: %s", e, exc_info=True)
             return False
 
     def process_db_project(self, projeto):
         """Processa os dados do projeto do banco de dados para o formato Roehn"""
-        print(f"Processando projeto: {projeto.nome}")
-        print(f"Numero de areas: {len(projeto.areas)}")
+        self.diag.info("Processando projeto: %s", projeto.nome)
+        self.diag.debug("Numero de areas: %s", len(projeto.areas))
 
         self._circuit_guid_map = {}
         self._quadro_guid_map = {}
@@ -361,7 +365,7 @@ class RoehnProjectConverter:
         ).first()
 
         if logic_server_module_db:
-            print(f"Logic Server encontrado: {logic_server_module_db.nome} ({logic_server_module_db.tipo})")
+            self.diag.info("Logic Server encontrado: %s (%s)", logic_server_module_db.nome, logic_server_module_db.tipo)
             main_controller_id = logic_server_module_db.id
             controller_info = {
                 'm4_ip': logic_server_module_db.ip_address,
@@ -382,18 +386,18 @@ class RoehnProjectConverter:
                 target_board_guid = self._quadro_guid_map[target_board_db.id]
                 target_board_json = self._find_automation_board_by_guid(target_board_guid)
                 if target_board_json:
-                    print(f"Logic Server alocado no quadro: {target_board_db.nome}")
+                    self.diag.debug("Logic Server alocado no quadro: %s", target_board_db.nome)
                     target_board_json.setdefault("ModulesList", []).insert(0, controller_module_json)
                 else:
-                    print(f"AVISO: Quadro com GUID {target_board_guid} não encontrado. Alocando no quadro padrão.")
+                    self.diag.warning("Quadro com GUID %s não encontrado. Alocando no quadro padrão.", target_board_guid)
                     self.project_data["Areas"][0]["SubItems"][0]["AutomationBoards"][0]["ModulesList"].insert(0, controller_module_json)
             else:
-                print("Logic Server não associado a um quadro. Alocando no quadro padrão.")
+                self.diag.notice("Logic Server não associado a um quadro. Alocando no quadro padrão.")
                 self.project_data["Areas"][0]["SubItems"][0]["AutomationBoards"][0]["ModulesList"].insert(0, controller_module_json)
         else:
             # Se nenhum logic server for encontrado, o que não deveria acontecer, loga um erro.
             # A controladora padrão M4 do template inicial será usada.
-            print("ERRO CRÍTICO: Nenhum Logic Server encontrado no projeto. O arquivo RWP pode estar incompleto.")
+            self.diag.error("Nenhum Logic Server encontrado no projeto. O arquivo RWP pode estar incompleto.")
 
         # Etapa 2: Processar todos os outros módulos (controladores ou não)
         all_modules_db = self.db_session.query(Modulo).filter(Modulo.id != main_controller_id).all()
@@ -406,7 +410,7 @@ class RoehnProjectConverter:
         for area in projeto.areas:
             for ambiente in area.ambientes:
                 for circuito in ambiente.circuitos:
-                    print(f"Processando circuito: {circuito.identificador} ({circuito.tipo})")
+                    self.diag.trace("Processando circuito: %s (%s)", circuito.identificador, circuito.tipo)
                     guid = None
                     try:
                         # Criar o objeto Roehn para CADA circuito e mapear seu GUID
@@ -425,7 +429,7 @@ class RoehnProjectConverter:
                         elif circuito.tipo == 'hvac':
                             guid = self._add_hvac(area.nome, ambiente.nome, circuito.nome or circuito.identificador)
                         else:
-                            print(f"Tipo de circuito nao suportado: {circuito.tipo}")
+                            self.diag.warning("Tipo de circuito nao suportado: %s", circuito.tipo)
 
                         if guid:
                             self._circuit_guid_map[circuito.id] = guid
@@ -446,12 +450,10 @@ class RoehnProjectConverter:
                                 elif circuito.tipo == 'hvac':
                                     self._link_hvac_to_module(guid, modulo_nome, canal)
                             elif not modulo_nome:
-                                print(f"Circuito {circuito.identificador} com vinculação, mas sem módulo associado.")
+                                self.diag.warning("Circuito %s com vinculação, mas sem módulo associado.", circuito.identificador)
                         
                     except Exception as exc:
-                        print(f"Erro ao processar circuito {circuito.id}: {exc}")
-                        import traceback
-                        traceback.print_exc()
+                        self.diag.error("Erro ao processar circuito %s: %s", circuito.id, exc, exc_info=True)
                         continue
         
         # Etapa 2: Processar Keypads e Cenas, agora com o mapa de GUIDs completo
@@ -461,23 +463,27 @@ class RoehnProjectConverter:
                 self._add_scenes_for_room(area.nome, ambiente)
 
         # ⭐⭐⭐ NOVO: Verificação final do ACNET
-        print("Realizando verificação final do ACNET...")
+        self.diag.debug("Realizando verificação final do ACNET...")
         self._verify_and_fix_acnet()
         
         # ⭐⭐⭐ NOVO: Log do estado final do ACNET
         self._log_acnet_status()
         
-        print("✅ Processamento do projeto concluído!")
+        self.diag.info("Processamento do projeto concluído!")
+        self.diag.flush()
 
     def _log_acnet_status(self):
         """Log do estado atual do ACNET para debugging"""
+        # A busca abaixo percorre todos os módulos: só vale a pena se for exibida
+        if not self.diag.habilitado("debug"):
+            return
         try:
             _, _, acnet_slot = self._get_m4_module_components()
             if not acnet_slot:
                 return
             
             acnet_guids = [guid for guid in acnet_slot.get("SubItemsGuid", []) if guid != self.zero_guid]
-            print(f"📊 Status do ACNET: {len(acnet_guids)} módulos registrados")
+            self.diag.debug("Status do ACNET: %s módulos registrados", len(acnet_guids))
             
             # Mapear GUIDs para nomes de módulos
             for i, guid in enumerate(acnet_slot.get("SubItemsGuid", [])):
@@ -490,9 +496,9 @@ class RoehnProjectConverter:
                                     if module.get("Guid") == guid:
                                         module_name = module.get("Name", "Sem nome")
                                         break
-                    print(f"  {i+1}. {guid} -> {module_name}")
+                    self.diag.debug("  %s. %s -> %s", i + 1, guid, module_name)
         except Exception as e:
-            print(f"Erro ao logar status do ACNET: {e}")
+            self.diag.error("Erro ao logar status do ACNET: %s", e)
 
     def _ensure_automation_board_exists(self, area_name, room_name, board_name):
         """Garante que um AutomationBoard existe em um ambiente"""
@@ -537,12 +543,12 @@ class RoehnProjectConverter:
 
             for controller_json in controllers_json:
                 controller_name = controller_json.get("Name")
-                print(f"🔧 Verificando ACNET para o controlador: {controller_name}")
+                self.diag.debug("Verificando ACNET para o controlador: %s", controller_name)
                 
                 # Encontrar o controlador no DB para pegar os filhos
                 controller_db = self.db_session.query(Modulo).filter_by(nome=controller_name, projeto_id=self.projeto_id_db).first()
                 if not controller_db:
-                    print(f"  AVISO: Controlador '{controller_name}' não encontrado no DB.")
+                    self.diag.warning("Controlador '%s' não encontrado no DB.", controller_name)
                     continue
 
                 # Coletar GUIDs dos módulos filhos
@@ -554,19 +560,17 @@ class RoehnProjectConverter:
 
                 acnet_slot = next((s for s in controller_json.get("Slots", []) if s.get("Name") == "ACNET/RNET"), None)
                 if not acnet_slot:
-                    print(f"  ERRO: Slot ACNET/RNET não encontrado para {controller_name}.")
+                    self.diag.error("Slot ACNET/RNET não encontrado para %s.", controller_name)
                     continue
 
                 # Limpar e preencher o ACNET
                 acnet_slot["SubItemsGuid"] = list(child_module_guids)
                 acnet_slot["SubItemsGuid"].append(self.zero_guid)
                 
-                print(f"  ✅ ACNET para '{controller_name}' atualizado com {len(child_module_guids)} módulos.")
+                self.diag.debug("ACNET para '%s' atualizado com %s módulos.", controller_name, len(child_module_guids))
 
         except Exception as e:
-            print(f"❌ Erro ao verificar/corrigir ACNET: {e}")
-            import traceback
-            traceback.print_exc()
+            self.diag.error("Erro ao verificar/corrigir ACNET: %s", e, exc_info=True)
 
     def create_project(self, project_info):
         """Cria um projeto base compatível com o ROEHN Wizard"""
@@ -608,6 +612,7 @@ class RoehnProjectConverter:
         }
 
         # Montagem do projeto
+        self._hsnets = None
         self.project_data = {
             "$type": "Project",
             "Areas": [
@@ -826,7 +831,7 @@ class RoehnProjectConverter:
             # Encontrar o AutomationBoard específico
             target_board = self._find_automation_board_by_guid(automation_board_guid)
             if not target_board:
-                print(f"Quadro elétrico {automation_board_guid} não encontrado, usando quadro padrão")
+                self.diag.warning("Quadro elétrico %s não encontrado, usando quadro padrão", automation_board_guid)
                 automation_board_guid = None
         
         if not automation_board_guid:
@@ -870,16 +875,18 @@ class RoehnProjectConverter:
             existing_board["ModulesList"] = [m for m in existing_board.get("ModulesList", []) if m.get("Name") != module_name]
             # Adicionar ao novo quadro
             modules_list.append(existing_module)
-            print(f"Módulo {module_name} movido de {existing_board.get('Name')} para {target_board.get('Name')}")
+            self.diag.debug("Módulo %s movido de %s para %s", module_name, existing_board.get('Name'), target_board.get('Name'))
             return module_name
 
         # Encontrar HSNET disponível
-        if desired_hsnet is not None and not self._is_hsnet_duplicate(desired_hsnet):
+        no_json, enderecos = self._enderecos_hsnet()
+        if desired_hsnet is not None and desired_hsnet not in no_json:
             hsnet = desired_hsnet
+            enderecos.reservar(hsnet)
         else:
-            hsnet = self._find_max_hsnet() + 1
-            while self._is_hsnet_duplicate(hsnet):
-                hsnet += 1
+            classe = "controlador" if model_key in ("AQL-GV-M4", "ADP-M8", "ADP-M16") else "modulo"
+            hsnet = enderecos.alocar(classe)[0]
+        no_json.add(hsnet)
 
         if desired_dev_id is not None:
             dev_id = desired_dev_id
@@ -905,7 +912,7 @@ class RoehnProjectConverter:
         elif "ADP-M16" in key:
             self._create_controller_as_module("ADP-M16", module_name, hsnet, dev_id, target_board, ip_address=modulo_obj.ip_address if modulo_obj else '0.0.0.0')
         else:
-            print(f"Tipo de módulo desconhecido '{key}', criando como ADP-RL12 por padrão.")
+            self.diag.warning("Tipo de módulo desconhecido '%s', criando como ADP-RL12 por padrão.", key)
             self._create_rl12_module(module_name, hsnet, dev_id, target_board)
 
         return module_name
@@ -1267,15 +1274,15 @@ class RoehnProjectConverter:
             return
         board_guid = self._quadro_guid_map.get(target_id)
         if not board_guid:
-            print(f"⚠️  Quadro selecionado para o M4 (ID {target_id}) não encontrado no mapa de GUIDs.")
+            self.diag.warning("Quadro selecionado para o M4 (ID %s) não encontrado no mapa de GUIDs.", target_id)
             return
         target_board = self._find_automation_board_by_guid(board_guid)
         if not target_board:
-            print(f"⚠️  Quadro GUID {board_guid} não encontrado na estrutura do projeto.")
+            self.diag.warning("Quadro GUID %s não encontrado na estrutura do projeto.", board_guid)
             return
         m4_module, current_board, _ = self._get_m4_module_components()
         if not m4_module:
-            print("⚠️  Módulo M4 não encontrado no projeto Roehn.")
+            self.diag.warning("Módulo M4 não encontrado no projeto Roehn.")
             return
         if current_board == target_board:
             return
@@ -1291,7 +1298,7 @@ class RoehnProjectConverter:
         target_board.setdefault("ModulesList", [])
         if not any(m.get("Guid") == m4_module.get("Guid") for m in target_board["ModulesList"]):
             target_board["ModulesList"].insert(0, m4_module)
-            print(f"✅ Módulo M4 movido para o quadro {target_board.get('Name')}")
+            self.diag.debug("Módulo M4 movido para o quadro %s", target_board.get('Name'))
 
     def _add_module_to_project(self, new_module, new_module_guid, target_board=None):
         """Adiciona um módulo ao AutomationBoard especificado e ao ACNET do M4"""
@@ -1311,7 +1318,7 @@ class RoehnProjectConverter:
         if not keypads:
             return
         
-        print(f"Processing keypads for room: {ambiente.nome} (ID: {ambiente.id})")
+        self.diag.debug("Processing keypads for room: %s (ID: %s)", ambiente.nome, ambiente.id)
 
         try:
             area_idx = next(i for i, area in enumerate(self.project_data["Areas"]) if area.get("Name") == area_name)
@@ -1327,7 +1334,7 @@ class RoehnProjectConverter:
         room = subitems[room_idx]
         user_interfaces = room.setdefault("UserInterfaces", [])
         for keypad in keypads:
-            print(f"  - Building payload for keypad: {keypad.nome} (ID: {keypad.id})")
+            self.diag.trace("  - Building payload for keypad: %s (ID: %s)", keypad.nome, keypad.id)
             payload = self._build_keypad_payload(area_idx, room_idx, keypad)
             user_interfaces.append(payload)
             self._register_user_interface_guid(payload["Guid"])
@@ -1336,7 +1343,7 @@ class RoehnProjectConverter:
         zero_guid = self.zero_guid
         keypad_guid = str(uuid.uuid4())
         
-        print(f"    - Building keypad payload for: {keypad.nome}")
+        self.diag.trace("    - Building keypad payload for: %s", keypad.nome)
 
         base_unit_id = self._find_max_unit_id() + 1
 
@@ -1439,15 +1446,15 @@ class RoehnProjectConverter:
 
             if cena:
                 target_guid = cena.guid
-                print(f"      - Button {button.ordem}: Linked to scene '{cena.nome}' (ID: {cena.id}) -> GUID: {target_guid}")
+                self.diag.trace("      - Button %s: Linked to scene '%s' (ID: %s) -> GUID: %s", button.ordem, cena.nome, cena.id, target_guid)
             elif circuito and circuito.id in self._circuit_guid_map:
                 target_guid = self._circuit_guid_map[circuito.id]
-                print(f"      - Button {button.ordem}: Linked to circuit '{circuito.nome}' (ID: {circuito.id}) -> GUID: {target_guid}")
+                self.diag.trace("      - Button %s: Linked to circuit '%s' (ID: %s) -> GUID: %s", button.ordem, circuito.nome, circuito.id, target_guid)
             else:
                 if circuito:
-                    print(f"      - Button {button.ordem}: WARNING - Circuit '{circuito.nome}' (ID: {circuito.id}) found but its GUID is not in the map.")
+                    self.diag.warning("Keypad '%s' button %s: circuit '%s' (ID: %s) found but its GUID is not in the map.", keypad.nome, button.ordem, circuito.nome, circuito.id)
                 else:
-                    print(f"      - Button {button.ordem}: Not linked.")
+                    self.diag.trace("      - Button %s: Not linked.", button.ordem)
 
             style_properties = None
             button_style_guid = zero_guid
@@ -1566,44 +1573,28 @@ class RoehnProjectConverter:
             
         return max_id
 
-    def _find_max_hsnet(self):
-        """Encontra o maior HSNET em TODO o projeto"""
-        max_addr = 100
-        
-        for area in self.project_data["Areas"]:
-            for room in area.get("SubItems", []):
-                # Verificar módulos nos quadros elétricos
-                for board in room.get("AutomationBoards", []):
-                    for module in board.get("ModulesList", []):
-                        addr = module.get("HsnetAddress", 0)
-                        if addr > max_addr:
-                            max_addr = addr
-                
-                # Verificar keypads no ambiente
-                for ui in room.get("UserInterfaces", []):
-                    addr = ui.get("HsnetAddress", 0)
-                    if addr > max_addr:
-                        max_addr = addr
-        
-        return max_addr
+    def _enderecos_hsnet(self):
+        """
+        (HSNETs já no JSON, alocador), montados uma vez por conversão.
 
-    def _is_hsnet_duplicate(self, hsnet_address):
-        """Verifica se um endereço HSNET já está em uso em TODO o projeto"""
-        # Verificar em todos os quadros elétricos
-        for area in self.project_data["Areas"]:
-            for room in area.get("SubItems", []):
-                # Verificar módulos nos quadros elétricos
-                for board in room.get("AutomationBoards", []):
-                    for module in board.get("ModulesList", []):
-                        if module.get("HsnetAddress") == hsnet_address:
-                            return True
-                
-                # Verificar keypads no ambiente
-                for ui in room.get("UserInterfaces", []):
-                    if ui.get("HsnetAddress") == hsnet_address:
-                        return True
-        
-        return False
+        O alocador também conhece os HSNETs gravados no banco, para que um
+        módulo sem endereço não receba o de um keypad adicionado depois.
+        """
+        if self._hsnets is None:
+            no_json = set()
+            for area in self.project_data["Areas"]:
+                for room in area.get("SubItems", []):
+                    for board in room.get("AutomationBoards", []):
+                        for module in board.get("ModulesList", []):
+                            if module.get("HsnetAddress") is not None:
+                                no_json.add(module["HsnetAddress"])
+                    for ui in room.get("UserInterfaces", []):
+                        if ui.get("HsnetAddress") is not None:
+                            no_json.add(ui["HsnetAddress"])
+            projeto_id = getattr(self, "projeto_id_db", None)
+            no_banco = hsnets_em_uso(projeto_id) if projeto_id else set()
+            self._hsnets = (no_json, EnderecosHsnet(no_json | no_banco))
+        return self._hsnets
 
     def _add_shade(self, area, ambiente, name, description="Persiana"):
         """Adiciona uma persiana ao projeto"""
@@ -1676,7 +1667,7 @@ class RoehnProjectConverter:
         """Vincula uma persiana a um módulo (em qualquer quadro)"""
         module, board = self._find_module_in_any_board(module_name)
         if not module:
-            print(f"Módulo {module_name} não encontrado para vinculação de persiana")
+            self.diag.warning("Módulo %s não encontrado para vinculação de persiana", module_name)
             return False
 
         try:
@@ -1692,27 +1683,27 @@ class RoehnProjectConverter:
                         
                         # Verificar se o canal é válido
                         if canal < 1 or canal > len(slot['SubItemsGuid']):
-                            print(f"Canal {canal} inválido para slot {wanted_slot} (capacidade: {len(slot['SubItemsGuid'])})")
+                            self.diag.warning("Canal %s inválido para slot %s (capacidade: %s)", canal, wanted_slot, len(slot['SubItemsGuid']))
                             continue
                         
                         # Vincular a persiana ao canal
                         slot['SubItemsGuid'][canal-1] = shade_guid
-                        print(f"Persiana vinculada ao módulo {module_name}, slot: {wanted_slot}, canal: {canal}")
+                        self.diag.trace("Persiana vinculada ao módulo %s, slot: %s, canal: %s", module_name, wanted_slot, canal)
                         return True
             
             # Se não encontrou slot compatível, tentar fallback genérico
-            print(f"Nenhum slot compatível encontrado para persiana no módulo {module_name}")
+            self.diag.warning("Nenhum slot compatível encontrado para persiana no módulo %s", module_name)
             return False
             
         except Exception as e:
-            print(f"Erro ao linkar persiana: {e}")
+            self.diag.error("Erro ao linkar persiana: %s", e)
             return False
 
     def _link_hvac_to_module(self, hvac_guid, module_name, canal):
         """Vincula um HVAC a um módulo (em qualquer quadro)"""
         module, board = self._find_module_in_any_board(module_name)
         if not module:
-            print(f"Módulo {module_name} não encontrado para vinculação de HVAC")
+            self.diag.warning("Módulo %s não encontrado para vinculação de HVAC", module_name)
             return False
 
         try:
@@ -1728,20 +1719,20 @@ class RoehnProjectConverter:
                         
                         # Verificar se o canal é válido
                         if canal < 1 or canal > len(slot['SubItemsGuid']):
-                            print(f"Canal {canal} inválido para slot {wanted_slot} (capacidade: {len(slot['SubItemsGuid'])})")
+                            self.diag.warning("Canal %s inválido para slot %s (capacidade: %s)", canal, wanted_slot, len(slot['SubItemsGuid']))
                             continue
                         
                         # Vincular o HVAC ao canal
                         slot['SubItemsGuid'][canal-1] = hvac_guid
-                        print(f"HVAC vinculado ao módulo {module_name}, slot: {wanted_slot}, canal: {canal}")
+                        self.diag.trace("HVAC vinculado ao módulo %s, slot: %s, canal: %s", module_name, wanted_slot, canal)
                         return True
             
             # Se não encontrou slot compatível, tentar fallback genérico
-            print(f"Nenhum slot compatível encontrado para HVAC no módulo {module_name}")
+            self.diag.warning("Nenhum slot compatível encontrado para HVAC no módulo %s", module_name)
             return False
             
         except Exception as e:
-            print(f"Erro ao linkar HVAC: {e}")
+            self.diag.error("Erro ao linkar HVAC: %s", e)
             return False
 
 
@@ -1815,7 +1806,7 @@ class RoehnProjectConverter:
         """Vincula um circuito de iluminação a um módulo (em qualquer quadro)"""
         module, board = self._find_module_in_any_board(module_name)
         if not module:
-            print(f"Módulo {module_name} não encontrado para vinculação")
+            self.diag.warning("Módulo %s não encontrado para vinculação", module_name)
             return False
 
         try:
@@ -1831,10 +1822,10 @@ class RoehnProjectConverter:
                         while len(slot['SubItemsGuid']) < slot.get('SlotCapacity', 0):
                             slot['SubItemsGuid'].append("00000000-0000-0000-0000-000000000000")
                         slot['SubItemsGuid'][canal-1] = load_guid
-                        print(f"Circuito vinculado ao módulo {module_name}, slot: {wanted_slot}, canal: {canal}")
+                        self.diag.trace("Circuito vinculado ao módulo %s, slot: %s, canal: %s", module_name, wanted_slot, canal)
                         return True
         except Exception as e:
-            print(f"Erro ao linkar load: {e}")
+            self.diag.error("Erro ao linkar load: %s", e)
         return False
 
     def _add_scenes_for_room(self, area_name, ambiente):
@@ -1846,7 +1837,7 @@ class RoehnProjectConverter:
             area_json = next(a for a in self.project_data["Areas"] if a.get("Name") == area_name)
             room_json = next(r for r in area_json["SubItems"] if r.get("Name") == ambiente.nome)
         except StopIteration:
-            print(f"⚠️  Aviso: Não foi possível encontrar a área '{area_name}' ou o ambiente '{ambiente.nome}' no JSON para adicionar cenas.")
+            self.diag.warning("Não foi possível encontrar a área '%s' ou o ambiente '%s' no JSON para adicionar cenas.", area_name, ambiente.nome)
             return
 
         scenes_list = room_json.setdefault("Scenes", [])
@@ -1893,22 +1884,22 @@ class RoehnProjectConverter:
                         circuito_id = int(acao_db.target_guid)
                         target_guid_resolved = self._circuit_guid_map.get(circuito_id)
                         if not target_guid_resolved:
-                            print(f"⚠️ Aviso: GUID para o circuito ID {circuito_id} não encontrado no mapa.")
+                            self.diag.warning("GUID para o circuito ID %s não encontrado no mapa.", circuito_id)
                             continue
                         action_payload["TargetGuid"] = target_guid_resolved
                     except (ValueError, TypeError):
-                        print(f"⚠️ Aviso: target_guid de circuito inválido para Acao ID {acao_db.id}: {acao_db.target_guid}")
+                        self.diag.warning("target_guid de circuito inválido para Acao ID %s: %s", acao_db.id, acao_db.target_guid)
                         continue
                 elif acao_db.action_type == 7: # Group (Room)
                     try:
                         ambiente_id = int(acao_db.target_guid)
                         target_guid_resolved = self._room_guid_map.get(ambiente_id)
                         if not target_guid_resolved:
-                             print(f"⚠️ Aviso: GUID para o ambiente ID {ambiente_id} não encontrado no mapa.")
+                             self.diag.warning("GUID para o ambiente ID %s não encontrado no mapa.", ambiente_id)
                              continue
                         action_payload["TargetGuid"] = target_guid_resolved
                     except (ValueError, TypeError):
-                        print(f"⚠️ Aviso: target_guid de ambiente inválido para Acao ID {acao_db.id}: {acao_db.target_guid}")
+                        self.diag.warning("target_guid de ambiente inválido para Acao ID %s: %s", acao_db.id, acao_db.target_guid)
                         continue
                 else: # Other types, assume GUID is direct
                     action_payload["TargetGuid"] = acao_db.target_guid
@@ -1969,11 +1960,12 @@ class RoehnProjectConverter:
                 scene_payload["Actions"].append(action_payload)
 
             scenes_list.append(scene_payload)
-        print(f"✅ Cenas adicionadas para o ambiente: {ambiente.nome}")
+        self.diag.debug("Cenas adicionadas para o ambiente: %s", ambiente.nome)
 
     def export_project(self):
         """Exporta o projeto como JSON (formato Roehn Wizard)"""
         if not self.project_data:
             raise ValueError("Nenhum projeto para exportar")
             
-        return json.dumps(self.project_data, indent=2, ensure_ascii=False)
+        # Mesmos bytes de json.dumps(indent=2, ensure_ascii=False), pelo orjson quando disponível
+        return json_backend.dumps(self.project_data, indent=2).decode('utf-8')
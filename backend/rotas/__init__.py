@@ -0,0 +1,56 @@
+# rotas/__init__.py
+"""
+Blueprints do app, um por domínio.
+
+`registrar` importa e registra os blueprints leves. Exportação e importação são
+os subsistemas pesados: as URLs deles ficam em ROTAS_TARDIAS e apontam para uma
+ViewTardia, que só importa rotas/<blueprint>.py na primeira requisição atendida.
+Um worker que nunca serve essas rotas não carrega o código (nem o ReportLab e o
+conversor que ele puxa).
+"""
+import importlib
+
+from flask import Blueprint
+
+# blueprint -> [(regra, função em rotas/<blueprint>.py, métodos)]
+ROTAS_TARDIAS = {
+    "exportacao": [
+        ("/roehn/import", "roehn_import", ["POST"]),
+        ("/api/roehn/relatorio", "roehn_relatorio", ["GET"]),
+        ("/exportar-csv", "exportar_csv", ["GET"]),
+        ("/exportar-projeto/<int:projeto_id>", "exportar_projeto", ["GET"]),
+        ("/exportar-pdf/<int:projeto_id>", "exportar_pdf", ["GET"]),
+    ],
+    "importacao": [
+        ("/api/importar-planner", "importar_planner", ["POST"]),
+        ("/api/importar-projeto", "importar_projeto", ["POST"]),
+    ],
+}
+
+
+class ViewTardia:
+    """View que importa `modulo` e resolve `nome` na primeira chamada."""
+
+    def __init__(self, modulo, nome):
+        self.modulo = modulo
+        self.__name__ = nome
+        self._view = None
+
+    def __call__(self, **kwargs):
+        if self._view is None:
+            # o lock de import do Python serializa workers em threads concorrentes
+            self._view = getattr(importlib.import_module(self.modulo), self.__name__)
+        return self._view(**kwargs)
+
+
+def registrar(app):
+    from rotas import admin, areas, auth, cenas, circuitos, keypads, lote, modulos, projetos, quadros, spa, vinculacao
+
+    for modulo in (auth, admin, projetos, areas, circuitos, quadros, modulos, vinculacao, keypads, cenas, lote, spa):
+        app.register_blueprint(modulo.bp)
+
+    for nome, rotas in ROTAS_TARDIAS.items():
+        bp = Blueprint(nome, __name__)
+        for regra, funcao, metodos in rotas:
+            bp.add_url_rule(regra, funcao, ViewTardia(f"{__name__}.{nome}", funcao), methods=metodos)
+        app.register_blueprint(bp)
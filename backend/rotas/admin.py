@@ -0,0 +1,167 @@
+# rotas/admin.py
+"""
+Rotas administrativas: métricas por endpoint, log de consultas lentas e a
+listagem paginada de projetos com contagens.
+"""
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, request, jsonify
+from flask_login import login_required
+from sqlalchemy import select, func
+
+from database import db, User, Projeto, Area, Circuito, Modulo, Keypad, Cena
+from perf import metricas, consultas_lentas
+from cache_usuarios import cache_usuarios
+from rotas.comum import admin_required
+
+bp = Blueprint("admin", __name__)
+
+
+@bp.get("/api/admin/metrics")
+@login_required
+@admin_required
+def api_admin_metrics():
+    # Prometheus pede text/plain; navegador e SPA recebem JSON
+    formato = request.args.get("format")
+    prometheus_mime = "text/plain; version=0.0.4"
+    if formato is None and request.accept_mimetypes.best_match(["application/json", prometheus_mime]) == prometheus_mime:
+        formato = "prometheus"
+    if formato == "prometheus":
+        return metricas.prometheus() + cache_usuarios.prometheus(), 200, {"Content-Type": f"{prometheus_mime}; charset=utf-8"}
+    return jsonify({"ok": True, "endpoints": metricas.snapshot(), "user_cache": cache_usuarios.estatisticas()})
+
+
+@bp.get("/api/admin/slow-queries")
+@login_required
+@admin_required
+def api_admin_slow_queries():
+    return jsonify({
+        "ok": True,
+        "enabled": consultas_lentas.ativo,
+        "threshold_ms": consultas_lentas.limiar_ms,
+        "queries": consultas_lentas.listar(),
+    })
+
+
+@bp.delete("/api/admin/slow-queries")
+@login_required
+@admin_required
+def api_admin_slow_queries_clear():
+    consultas_lentas.limpar()
+    return jsonify({"ok": True})
+
+def _so_data(valor):
+    """Se `valor` é uma data ISO sem hora (ex.: 2026-10-19)."""
+    try:
+        date.fromisoformat(valor)
+    except ValueError:
+        return False
+    return True
+
+
+def _contagem_por_projeto(model):
+    """Subconsulta correlacionada: linhas de `model` do projeto da linha externa (índice em projeto_id)."""
+    return (select(func.count()).select_from(model)
+            .where(model.projeto_id == Projeto.id)
+            .correlate(Projeto).scalar_subquery())
+
+
+@bp.get("/api/admin/projetos")
+@login_required
+@admin_required
+def api_admin_projetos():
+    """
+    Lista paginada de projetos com contagens por projeto, numa única consulta.
+
+    Filtros: status (lista separada por vírgula), user_id, owner (username),
+    q (parte do nome), criado_de/criado_ate (ISO; criado_ate sem hora inclui o
+    dia inteiro). Ordenação: sort + order.
+    """
+    contagens = {
+        "areas": _contagem_por_projeto(Area),
+        "circuitos": _contagem_por_projeto(Circuito),
+        "modulos": _contagem_por_projeto(Modulo),
+        "keypads": _contagem_por_projeto(Keypad),
+        "cenas": _contagem_por_projeto(Cena),
+    }
+    ordenaveis = {
+        "id": Projeto.id, "nome": Projeto.nome, "status": Projeto.status,
+        "data_criacao": Projeto.data_criacao, "owner": User.username, **contagens,
+    }
+
+    args = request.args
+    try:
+        page = max(1, int(args.get("page", 1)))
+        per_page = min(200, max(1, int(args.get("per_page", 50))))
+        criado_de = datetime.fromisoformat(args["criado_de"]) if args.get("criado_de") else None
+        criado_ate = datetime.fromisoformat(args["criado_ate"]) if args.get("criado_ate") else None
+        user_id = int(args["user_id"]) if args.get("user_id") else None
+    except ValueError as e:
+        return jsonify({"ok": False, "error": f"Parâmetro inválido: {e}"}), 400
+
+    sort = args.get("sort", "id")
+    if sort not in ordenaveis:
+        return jsonify({"ok": False, "error": f"sort deve ser um de: {', '.join(ordenaveis)}."}), 400
+    coluna = ordenaveis[sort]
+    ordem = coluna.desc() if args.get("order", "asc").lower() == "desc" else coluna.asc()
+
+    filtros = []
+    if args.get("status"):
+        filtros.append(Projeto.status.in_([st.strip().upper() for st in args["status"].split(",") if st.strip()]))
+    if user_id is not None:
+        filtros.append(Projeto.user_id == user_id)
+    if args.get("owner"):
+        filtros.append(User.username == args["owner"])
+    if args.get("q"):
+        filtros.append(Projeto.nome.ilike(f"%{args['q']}%"))
+    if criado_de:
+        filtros.append(Projeto.data_criacao >= criado_de)
+    if criado_ate and _so_data(args["criado_ate"]):
+        filtros.append(Projeto.data_criacao < criado_ate + timedelta(days=1))
+    elif criado_ate:
+        filtros.append(Projeto.data_criacao <= criado_ate)
+
+    # total via janela: página e total saem da mesma consulta
+    rows = db.session.execute(
+        select(
+            Projeto.id, Projeto.nome, Projeto.status, Projeto.user_id, User.username,
+            Projeto.data_criacao, Projeto.data_ativo, Projeto.data_inativo, Projeto.data_concluido,
+            *[sub.label(nome) for nome, sub in contagens.items()],
+            func.count().over().label("total"),
+        )
+        .join(User, Projeto.user_id == User.id)
+        .where(*filtros)
+        .order_by(ordem, Projeto.id.asc())
+        .limit(per_page).offset((page - 1) * per_page)
+    ).all()
+
+    total = rows[0].total if rows else 0
+    if not rows and page > 1:
+        # página além do fim: o total ainda é útil para a paginação do cliente
+        total = db.session.execute(
+            select(func.count()).select_from(Projeto).join(User, Projeto.user_id == User.id).where(*filtros)
+        ).scalar()
+
+    def iso(d):
+        return d.isoformat() if d else None
+
+    projetos = [{
+        "id": r.id,
+        "nome": r.nome,
+        "status": r.status or "ATIVO",
+        "user_id": r.user_id,
+        "owner": r.username,
+        "data_criacao": iso(r.data_criacao),
+        "data_ativo": iso(r.data_ativo),
+        "data_inativo": iso(r.data_inativo),
+        "data_concluido": iso(r.data_concluido),
+        "contagens": {nome: getattr(r, nome) for nome in contagens},
+    } for r in rows]
+    return jsonify({
+        "ok": True,
+        "projetos": projetos,
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": (total + per_page - 1) // per_page,
+    })
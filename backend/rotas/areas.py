@@ -0,0 +1,137 @@
+# rotas/areas.py
+"""
+Áreas e ambientes do projeto atual.
+"""
+from flask import Blueprint, request, jsonify, session
+from flask_login import login_required
+
+from database import db, Area, Ambiente
+
+bp = Blueprint("areas", __name__)
+
+
+# Adicione esta nova rota API para listar áreas
+# LISTAR ÁREAS DO PROJETO ATUAL
+@bp.get("/api/areas")
+@login_required
+def api_areas_list():
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": True, "areas": []})
+    areas = Area.query.filter_by(projeto_id=projeto_id).order_by(Area.id.asc()).all()
+    return jsonify({"ok": True, "areas": [{"id": a.id, "nome": a.nome} for a in areas]})
+
+@bp.post("/api/areas")
+@login_required
+def api_areas_create():
+    data = request.get_json(silent=True) or {}
+    nome = (data.get("nome") or "").strip()
+    if not nome:
+        return jsonify({"ok": False, "error": "Nome é obrigatório."}), 400
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": False, "error": "Projeto não selecionado."}), 400
+    a = Area(nome=nome, projeto_id=projeto_id)
+    db.session.add(a); db.session.commit()
+    return jsonify({"ok": True, "id": a.id})
+
+@bp.put("/api/areas/<int:area_id>")
+@login_required
+def api_areas_update(area_id):
+    data = request.get_json(silent=True) or {}
+    nome = (data.get("nome") or "").strip()
+    if not nome:
+        return jsonify({"ok": False, "error": "Nome é obrigatório."}), 400
+    a = db.get_or_404(Area, area_id)
+    a.nome = nome; db.session.commit()
+    return jsonify({"ok": True})
+
+@bp.delete("/api/areas/<int:area_id>")
+@login_required
+def api_areas_delete(area_id):
+    a = db.get_or_404(Area, area_id)
+    db.session.delete(a); db.session.commit()
+    return jsonify({"ok": True})
+
+
+# LISTAR AMBIENTES DO PROJETO ATUAL
+@bp.get("/api/ambientes")
+@login_required
+def api_ambientes_list():
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": True, "success": True, "ambientes": []})
+
+    ambientes = (Ambiente.query
+                 .filter(Ambiente.projeto_id == projeto_id)
+                 .all())
+
+    out = []
+    for a in ambientes:
+        out.append({
+            "id": a.id,
+            "nome": a.nome,
+            "area": {"id": a.area.id, "nome": a.area.nome} if getattr(a, "area", None) else None,
+        })
+    return jsonify({"ok": True, "success": True, "ambientes": out})
+
+# CRIAR AMBIENTE
+@bp.post("/api/ambientes")
+@login_required
+def api_ambientes_create():
+    data = request.get_json(silent=True) or request.form or {}
+    nome = (data.get("nome") or "").strip()
+    area_id = data.get("area_id")
+
+    if not nome or not area_id:
+        return jsonify({"ok": False, "error": "Nome e área são obrigatórios."}), 400
+
+    area = db.get_or_404(Area, int(area_id))
+
+    # (opcional) validar que a área pertence ao projeto selecionado
+    if session.get("projeto_atual_id") != getattr(area, "projeto_id", None):
+        return jsonify({"ok": False, "error": "Área não pertence ao projeto atual."}), 400
+
+    amb = Ambiente(nome=nome, area_id=area.id)
+    db.session.add(amb)
+    db.session.commit()
+
+    return jsonify({"ok": True, "success": True, "id": amb.id})
+
+# ATUALIZAR AMBIENTE
+@bp.put("/api/ambientes/<int:ambiente_id>")
+@login_required
+def api_ambientes_update(ambiente_id):
+    data = request.get_json(silent=True) or request.form or {}
+    nome = (data.get("nome") or "").strip()
+    area_id = data.get("area_id")
+
+    if not nome or not area_id:
+        return jsonify({"ok": False, "error": "Nome e área são obrigatórios."}), 400
+
+    amb = db.get_or_404(Ambiente, ambiente_id)
+    area = db.get_or_404(Area, int(area_id))
+
+    # Validar que a área pertence ao projeto selecionado
+    if session.get("projeto_atual_id") != getattr(area, "projeto_id", None):
+        return jsonify({"ok": False, "error": "Área não pertence ao projeto atual."}), 400
+
+    amb.nome = nome
+    amb.area_id = area.id
+    db.session.commit()
+
+    return jsonify({"ok": True, "success": True})
+
+# EXCLUIR AMBIENTE
+@bp.delete("/api/ambientes/<int:ambiente_id>")
+@login_required
+def api_ambientes_delete(ambiente_id):
+    amb = db.get_or_404(Ambiente, ambiente_id)
+
+    # (opcional) autorização extra: só dono/admin
+    # if amb.area.projeto.user_id != current_user.id and current_user.role != "admin":
+    #     return jsonify({"ok": False, "error": "Acesso não autorizado."}), 403
+
+    db.session.delete(amb)
+    db.session.commit()
+    return jsonify({"ok": True, "success": True})
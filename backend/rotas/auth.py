@@ -0,0 +1,174 @@
+# rotas/auth.py
+"""
+Sessão, login/logout, usuários e troca de senha; configuração do Flask-Login.
+"""
+import math
+
+from flask import Blueprint, request, jsonify, redirect, url_for, flash
+from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+
+from database import db, User, Projeto
+from cache_usuarios import cache_usuarios
+from limite_login import limite_login
+from senhas import gerar_hash
+from rotas.comum import admin_required
+
+bp = Blueprint("auth", __name__)
+
+# Configuração do Flask-Login (init_app em app.py)
+login_manager = LoginManager()
+login_manager.login_view = 'login'
+login_manager.login_message = 'Por favor, faça login para acessar esta página.'
+login_manager.login_message_category = 'info'
+
+
+# --- serialize_user helper (ADD) ---
+def serialize_user(user):
+    return {
+        "id": user.id,
+        "username": getattr(user, "username", ""),
+        "role": getattr(user, "role", "user"),
+    }
+
+
+# --- sessão atual (SPA pode checar estado sem carregar template) ---
+@bp.get("/api/session")
+def api_session():
+    if current_user.is_authenticated:
+        return jsonify({"authenticated": True, "user": serialize_user(current_user)})
+    return jsonify({"authenticated": False})
+
+# --- login em JSON (POST /api/login) ---
+@bp.post("/api/login")
+def api_login():
+    data = request.get_json(silent=True) or request.form or {}
+    username = (data.get("username") or "").strip()
+    password = data.get("password") or ""
+
+    # antes do hash: rajadas por usuário ou IP não chegam a gastar CPU
+    espera = limite_login.tentar(username, request.remote_addr)
+    if espera:
+        segundos = math.ceil(espera)
+        resposta = jsonify({"ok": False, "error": f"Muitas tentativas de login. Tente novamente em {segundos} s."})
+        return resposta, 429, {"Retry-After": str(segundos)}
+
+    user = User.query.filter_by(username=username).first()
+    if user and user.check_password(password):
+        if user.precisa_rehash():
+            # parâmetros de hash mudaram nas opções: regrava com a senha recém-conferida
+            user.set_password(password)
+            db.session.commit()
+        login_user(user)
+        return jsonify({"ok": True, "user": serialize_user(user)})
+
+    return jsonify({"ok": False, "error": "Usuário ou senha inválidos."}), 401
+
+# --- logout em JSON (POST /api/logout) ---
+@bp.post("/api/logout")
+@login_required
+def api_logout():
+    logout_user()
+    return jsonify({"ok": True})
+
+
+# Carregador de usuário para o Flask-Login
+@login_manager.user_loader
+def load_user(user_id):
+    # cache com TTL; sem SELECT em user nas requisições seguintes (cache_usuarios.py)
+    return cache_usuarios.carregar(int(user_id))
+    
+    
+@login_manager.unauthorized_handler
+def unauthorized():
+    if request.accept_mimetypes.best == "application/json" or request.is_json:
+        return jsonify({"ok": False, "error": "Não autenticado"}), 401
+    return redirect("/login")
+
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('Você foi desconectado com sucesso', 'info')
+    return redirect(url_for('login'))
+
+@bp.get("/api/users")
+@login_required
+@admin_required
+def api_users_list():
+    users = User.query.order_by(User.id.asc()).all()
+    out = []
+    for u in users:
+        out.append({
+            "id": u.id,
+            "username": u.username,
+            "email": u.email,
+            "role": u.role,
+            "is_current": (u.id == current_user.id),
+        })
+    return jsonify({"ok": True, "users": out})
+
+
+@bp.delete("/api/users/<int:user_id>")
+@login_required
+@admin_required
+def api_users_delete(user_id):
+    u = db.get_or_404(User, user_id)
+
+    if u.id == current_user.id:
+        return jsonify({"ok": False, "error": "Você não pode excluir o usuário atualmente logado."}), 400
+
+    # opcional: impedir apagar o único admin do sistema
+    admins = User.query.filter_by(role="admin").all()
+    if u.role == "admin" and len(admins) == 1:
+        return jsonify({"ok": False, "error": "Não é possível excluir o único administrador."}), 400
+
+    # 1) Reatribuir projetos do usuário-alvo para o admin atual (ou outro dono)
+    projetos_do_usuario = Projeto.query.filter_by(user_id=u.id).all()
+    for p in projetos_do_usuario:
+        p.user_id = current_user.id   # ou um ID de "admin" padrão
+
+    db.session.delete(u)
+    db.session.commit()
+    return jsonify({"ok": True})
+
+@bp.post("/api/users")
+@login_required
+@admin_required
+def api_users_create():
+    data = request.get_json(silent=True) or request.form or {}
+    username = (data.get("username") or "").strip()
+    email = (data.get("email") or "").strip()
+    password = data.get("password") or ""
+    role = (data.get("role") or "user").strip()
+
+    if not username or not email or not password:
+        return jsonify({"ok": False, "error": "username, email e password são obrigatórios."}), 400
+    if role not in ("user", "admin"):
+        return jsonify({"ok": False, "error": "role inválida."}), 400
+
+    # unicidade básica
+    if User.query.filter_by(username=username).first():
+        return jsonify({"ok": False, "error": "Nome de usuário já existe."}), 409
+    if User.query.filter_by(email=email).first():
+        return jsonify({"ok": False, "error": "Email já cadastrado."}), 409
+
+    u = User(username=username, email=email, role=role, password_hash=gerar_hash(password))
+    db.session.add(u)
+    db.session.commit()
+    return jsonify({"ok": True, "id": u.id})
+
+
+@bp.route('/user/change-password', methods=['POST'])
+@login_required
+def change_password():
+    current_password = request.form.get('current_password')
+    new_password = request.form.get('new_password')
+    
+    if not current_user.check_password(current_password):
+        return jsonify({'success': False, 'message': 'Senha atual incorreta'})
+    
+    current_user.set_password(new_password)
+    db.session.commit()
+    
+    return jsonify({'success': True, 'message': 'Senha alterada com sucesso'})
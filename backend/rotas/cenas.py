@@ -0,0 +1,318 @@
+# rotas/cenas.py
+"""
+Cenas (scenes) e suas ações.
+"""
+from flask import Blueprint, request, jsonify, session
+from flask_login import login_required
+from sqlalchemy.exc import IntegrityError
+
+from database import db, Area, Ambiente, Circuito, Cena, Acao, CustomAcao
+from serializadores import cenas_serializadas
+
+bp = Blueprint("cenas", __name__)
+
+
+# -------------------- Cenas (Scenes) --------------------
+
+def serialize_custom_acao(custom_acao):
+    """Serializes a CustomAcao object."""
+    return {
+        "id": custom_acao.id,
+        "target_guid": custom_acao.target_guid,
+        "enable": custom_acao.enable,
+        "level": custom_acao.level,
+    }
+
+def serialize_acao(acao):
+    """Serializes an Acao object."""
+    return {
+        "id": acao.id,
+        "level": acao.level,
+        "action_type": acao.action_type,
+        "target_guid": acao.target_guid,
+        "custom_acoes": [serialize_custom_acao(ca) for ca in sorted(acao.custom_acoes, key=lambda x: x.id)],
+    }
+
+def serialize_cena(cena):
+    """Serializes a Cena object."""
+    return {
+        "id": cena.id,
+        "guid": cena.guid,
+        "nome": cena.nome,
+        "ambiente_id": cena.ambiente_id,
+        "scene_movers": cena.scene_movers,
+        "acoes": [serialize_acao(a) for a in sorted(cena.acoes, key=lambda x: x.id)],
+    }
+
+
+@bp.get("/api/cenas")
+@login_required
+def get_all_cenas():
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": True, "cenas": []})
+
+    cenas = cenas_serializadas(
+        Cena.projeto_id == projeto_id,
+        ordem=(Area.nome, Ambiente.nome, Cena.nome),
+        com_ambiente=True,
+    )
+    return jsonify({"ok": True, "cenas": cenas})
+
+
+@bp.get("/api/ambientes/<int:ambiente_id>/cenas")
+@login_required
+def get_cenas_por_ambiente(ambiente_id):
+    projeto_id = session.get("projeto_atual_id")
+    ambiente = db.get_or_404(Ambiente, ambiente_id)
+    if not projeto_id or ambiente.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Ambiente não pertence ao projeto atual."}), 404
+
+    cenas = cenas_serializadas(Cena.ambiente_id == ambiente_id, ordem=(Cena.nome,))
+    return jsonify({"ok": True, "cenas": cenas})
+
+@bp.get("/api/cenas/<int:cena_id>")
+@login_required
+def get_cena(cena_id):
+    projeto_id = session.get("projeto_atual_id")
+    cena = db.get_or_404(Cena, cena_id)
+    if not projeto_id or cena.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Cena não encontrada no projeto atual."}), 404
+
+    return jsonify({"ok": True, "cena": serialize_cena(cena)})
+
+@bp.post("/api/cenas")
+@login_required
+def create_cena():
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": False, "error": "Projeto não selecionado."}), 400
+
+    data = request.get_json()
+    if not data:
+        return jsonify({"ok": False, "error": "Requisição sem dados."}), 400
+
+    nome = (data.get("nome") or "").strip()
+    ambiente_id = data.get("ambiente_id")
+    acoes_data = data.get("acoes", [])
+    scene_movers = data.get("scene_movers", False)
+
+    if not nome or not ambiente_id:
+        return jsonify({"ok": False, "error": "Nome e ambiente_id são obrigatórios."}), 400
+
+    ambiente = db.get_or_404(Ambiente, int(ambiente_id))
+    if ambiente.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Ambiente não pertence ao projeto atual."}), 403
+
+    # Validação para scene_movers
+    if scene_movers:
+        all_circuit_ids = set()
+        all_group_ambiente_ids = set()
+        if not acoes_data:
+            return jsonify({"ok": False, "error": "Movimentadores de cena não podem ser habilitados para uma cena vazia."}), 400
+
+        for acao_data in acoes_data:
+            if acao_data.get("action_type") == 0:
+                try:
+                    all_circuit_ids.add(int(acao_data.get("target_guid")))
+                except (ValueError, TypeError):
+                    pass
+            elif acao_data.get("action_type") == 7:
+                try:
+                    all_group_ambiente_ids.add(int(acao_data.get("target_guid")))
+                except (ValueError, TypeError):
+                    pass
+
+        if all_circuit_ids:
+            circuits = Circuito.query.filter(Circuito.id.in_(list(all_circuit_ids))).all()
+            if any(c.tipo != 'persiana' for c in circuits):
+                return jsonify({"ok": False, "error": "Movimentadores de cena só podem ser habilitados se todos os itens da cena forem persianas."}), 400
+
+        if all_group_ambiente_ids:
+            group_circuits = Circuito.query.filter(Circuito.ambiente_id.in_(list(all_group_ambiente_ids))).all()
+            for c in group_circuits:
+                if c.tipo in ['luz', 'persiana'] and c.tipo != 'persiana':
+                    return jsonify({"ok": False, "error": "Movimentadores de cena só podem ser habilitados se todos os itens da cena forem persianas (encontrado em grupo)."}), 400
+
+    # Validação para não permitir circuitos HVAC
+    for acao_data in acoes_data:
+        if acao_data.get("action_type") == 0: # Ação de Circuito
+            try:
+                circuito_id = int(acao_data.get("target_guid"))
+                circuito = db.session.get(Circuito, circuito_id)
+                if circuito and circuito.tipo == 'hvac':
+                    return jsonify({"ok": False, "error": "Não é permitido adicionar circuitos do tipo HVAC em cenas de iluminação."}), 400
+            except (ValueError, TypeError):
+                # Ignora GUIDs inválidos, a validação do form deve pegar
+                pass
+
+    # Validação para não permitir circuitos duplicados
+    circuit_guids_in_scene = [
+        acao.get("target_guid") for acao in acoes_data
+        if acao.get("action_type") == 0 and acao.get("target_guid")
+    ]
+    if len(circuit_guids_in_scene) != len(set(circuit_guids_in_scene)):
+        return jsonify({"ok": False, "error": "Não é permitido adicionar o mesmo circuito mais de uma vez na mesma cena."}), 400
+
+    nova_cena = Cena(
+        nome=nome,
+        ambiente_id=ambiente.id,
+        scene_movers=scene_movers
+    )
+    db.session.add(nova_cena)
+
+    for acao_data in acoes_data:
+        nova_acao = Acao(
+            cena=nova_cena,
+            level=acao_data.get("level", 100),
+            action_type=acao_data.get("action_type", 0),
+            target_guid=acao_data.get("target_guid")
+        )
+        if not nova_acao.target_guid:
+            continue
+        db.session.add(nova_acao)
+
+        for custom_acao_data in acao_data.get("custom_acoes", []):
+            novo_custom_acao = CustomAcao(
+                acao=nova_acao,
+                target_guid=custom_acao_data.get("target_guid"),
+                enable=custom_acao_data.get("enable", True),
+                level=custom_acao_data.get("level", 50)
+            )
+            if not novo_custom_acao.target_guid:
+                continue
+            db.session.add(novo_custom_acao)
+
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if "unique_cena_por_ambiente" in str(e.orig):
+            return jsonify({"ok": False, "error": "Já existe uma cena com este nome neste ambiente."}), 409
+        return jsonify({"ok": False, "error": f"Não foi possível salvar a cena."}), 400
+
+    return jsonify({"ok": True, "cena": serialize_cena(nova_cena)}), 201
+
+@bp.put("/api/cenas/<int:cena_id>")
+@login_required
+def update_cena(cena_id):
+    projeto_id = session.get("projeto_atual_id")
+    cena = db.get_or_404(Cena, cena_id)
+    if not projeto_id or cena.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Cena não encontrada no projeto atual."}), 404
+
+    data = request.get_json()
+    if not data:
+        return jsonify({"ok": False, "error": "Requisição sem dados."}), 400
+
+    if "nome" in data:
+        cena.nome = (data["nome"] or "").strip()
+
+    if "scene_movers" in data:
+        cena.scene_movers = data["scene_movers"]
+
+    if "acoes" in data:
+        acoes_data = data.get("acoes", [])
+
+        # Validação para scene_movers
+        if data.get("scene_movers"):
+            all_circuit_ids = set()
+            all_group_ambiente_ids = set()
+            if not acoes_data:
+                return jsonify({"ok": False, "error": "Movimentadores de cena não podem ser habilitados para uma cena vazia."}), 400
+
+            for acao_data in acoes_data:
+                if acao_data.get("action_type") == 0:
+                    try:
+                        all_circuit_ids.add(int(acao_data.get("target_guid")))
+                    except (ValueError, TypeError):
+                        pass
+                elif acao_data.get("action_type") == 7:
+                    try:
+                        # O target_guid de um grupo é o ID do AMBIENTE
+                        ambiente_id_grupo = int(acao_data.get("target_guid"))
+                        # Pegar todos os circuitos daquele ambiente
+                        circs_no_grupo = Circuito.query.filter_by(ambiente_id=ambiente_id_grupo).all()
+                        for c in circs_no_grupo:
+                            if c.tipo != 'hvac': # Ignorar HVAC na validação
+                                all_circuit_ids.add(c.id)
+                    except (ValueError, TypeError):
+                        pass
+
+            if all_circuit_ids:
+                circuits = Circuito.query.filter(Circuito.id.in_(list(all_circuit_ids))).all()
+                if any(c.tipo != 'persiana' for c in circuits):
+                    return jsonify({"ok": False, "error": "Movimentadores de cena só podem ser habilitados se todos os itens da cena forem persianas."}), 400
+
+        # Validação para não permitir circuitos HVAC
+        for acao_data in acoes_data:
+            if acao_data.get("action_type") == 0:
+                try:
+                    circuito_id = int(acao_data.get("target_guid"))
+                    circuito = db.session.get(Circuito, circuito_id)
+                    if circuito and circuito.tipo == 'hvac':
+                        return jsonify({"ok": False, "error": "Não é permitido adicionar circuitos do tipo HVAC em cenas de iluminação."}), 400
+                except (ValueError, TypeError):
+                    pass
+
+        # Validação para não permitir circuitos duplicados
+        circuit_guids_in_scene = [
+            acao.get("target_guid") for acao in acoes_data
+            if acao.get("action_type") == 0 and acao.get("target_guid")
+        ]
+        if len(circuit_guids_in_scene) != len(set(circuit_guids_in_scene)):
+            return jsonify({"ok": False, "error": "Não é permitido adicionar o mesmo circuito mais de uma vez na mesma cena."}), 400
+
+        # Limpar ações antigas pelo ORM (custom_acoes saem no cascade): os deletes
+        # registram update da cena no log de alterações mesmo se `acoes` vier vazio
+        for acao in list(cena.acoes):
+            db.session.delete(acao)
+        db.session.flush()
+
+        # Adicionar novas ações
+        for acao_data in acoes_data:
+            nova_acao = Acao(
+                cena_id=cena.id,
+                level=acao_data.get("level", 100),
+                action_type=acao_data.get("action_type", 0),
+                target_guid=acao_data.get("target_guid")
+            )
+            if not nova_acao.target_guid:
+                continue
+            db.session.add(nova_acao)
+            db.session.flush()
+
+            for custom_acao_data in acao_data.get("custom_acoes", []):
+                novo_custom_acao = CustomAcao(
+                    acao_id=nova_acao.id,
+                    target_guid=custom_acao_data.get("target_guid"),
+                    enable=custom_acao_data.get("enable", True),
+                    level=custom_acao_data.get("level", 50)
+                )
+                if not novo_custom_acao.target_guid:
+                    continue
+                db.session.add(novo_custom_acao)
+
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if "unique_cena_por_ambiente" in str(e.orig):
+            return jsonify({"ok": False, "error": "Já existe uma cena com este nome neste ambiente."}), 409
+        return jsonify({"ok": False, "error": "Não foi possível atualizar a cena."}), 400
+
+    db.session.refresh(cena)
+    return jsonify({"ok": True, "cena": serialize_cena(cena)})
+
+@bp.delete("/api/cenas/<int:cena_id>")
+@login_required
+def delete_cena(cena_id):
+    projeto_id = session.get("projeto_atual_id")
+    cena = db.get_or_404(Cena, cena_id)
+    if not projeto_id or cena.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Cena não encontrada no projeto atual."}), 404
+
+    db.session.delete(cena)
+    db.session.commit()
+
+    return jsonify({"ok": True})
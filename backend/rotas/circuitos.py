@@ -0,0 +1,201 @@
+# rotas/circuitos.py
+"""
+Circuitos do projeto atual; o SAK é alocado por alocadores.alocar_sak.
+"""
+from flask import Blueprint, request, jsonify, session
+from flask_login import login_required
+from sqlalchemy import select
+
+from database import db, Area, Ambiente, Circuito
+from alocadores import alocar_sak
+
+bp = Blueprint("circuitos", __name__)
+
+
+# LISTAR CIRCUITOS DO PROJETO ATUAL
+@bp.get("/api/circuitos")
+@login_required
+def api_circuitos_list():
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": True, "circuitos": []})
+
+    # Select só de colunas: evita o lazy-load de ambiente/área por circuito
+    rows = db.session.execute(
+        select(
+            Circuito.id, Circuito.identificador, Circuito.nome, Circuito.tipo,
+            Circuito.dimerizavel, Circuito.potencia, Circuito.sak,
+            Ambiente.id.label("ambiente_id"), Ambiente.nome.label("ambiente_nome"),
+            Area.id.label("area_id"), Area.nome.label("area_nome"),
+        )
+        .join(Ambiente, Circuito.ambiente_id == Ambiente.id)
+        .join(Area, Ambiente.area_id == Area.id)
+        .where(Circuito.projeto_id == projeto_id)
+    ).all()
+
+    out = []
+    for r in rows:
+        out.append({
+            "id": r.id,
+            "identificador": r.identificador,
+            "nome": r.nome,
+            "tipo": r.tipo,
+            "dimerizavel": r.dimerizavel,
+            "potencia": r.potencia,
+            "sak": r.sak,
+            "ambiente": {
+                "id": r.ambiente_id,
+                "nome": r.ambiente_nome,
+                "area": {
+                    "id": r.area_id,
+                    "nome": r.area_nome,
+                },
+            },
+        })
+    return jsonify({"ok": True, "circuitos": out})
+
+# CRIAR CIRCUITO
+@bp.post("/api/circuitos")
+@login_required
+def api_circuitos_create():
+    data = request.get_json(silent=True) or request.form or {}
+    identificador = (data.get("identificador") or "").strip()
+    nome = (data.get("nome") or "").strip()
+    tipo = (data.get("tipo") or "").strip()
+    ambiente_id = data.get("ambiente_id")
+    dimerizavel = data.get("dimerizavel", False)
+    potencia = float(data.get("potencia", 0.0))  # NOVO CAMPO
+
+    if not identificador or not nome or not tipo or not ambiente_id:
+        return jsonify({"ok": False, "error": "Campos obrigatórios ausentes."}), 400
+
+    if tipo != "luz" and dimerizavel:
+        return jsonify({"ok": False, "error": "Campo 'dimerizavel' só é permitido para circuitos do tipo 'luz'."}), 400
+
+    # Validação para potência não negativa
+    if potencia < 0:
+        return jsonify({"ok": False, "error": "A potência não pode ser negativa."}), 400
+
+    ambiente = db.get_or_404(Ambiente, int(ambiente_id))
+
+    projeto_id = session.get("projeto_atual_id")
+    if ambiente.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Ambiente não pertence ao projeto atual."}), 400
+
+    exists = (
+        Circuito.query
+        .filter(Circuito.projeto_id == projeto_id, Circuito.identificador == identificador)
+        .first()
+    )
+    if exists:
+        return jsonify({"ok": False, "error": "Identificador já existe neste projeto."}), 409
+
+
+    # ---------- GERAÇÃO DE SAK ----------
+    # Primeira faixa livre do projeto (reaproveita lacunas); ver alocadores.py
+    sak, quantidade_saks = alocar_sak(projeto_id, tipo)
+
+    c = Circuito(
+        identificador=identificador,
+        nome=nome,
+        tipo=tipo,
+        dimerizavel=dimerizavel if tipo == "luz" else False,
+        potencia=potencia,  # NOVO CAMPO
+        ambiente_id=ambiente.id,
+        sak=sak,
+        quantidade_saks=quantidade_saks,
+    )
+    db.session.add(c)
+    db.session.commit()
+    
+    return jsonify({
+        "ok": True, 
+        "id": c.id, 
+        "sak": c.sak, 
+        "quantidade_saks": c.quantidade_saks,
+        "dimerizavel": c.dimerizavel,
+        "potencia": c.potencia  # NOVO CAMPO
+    })
+
+
+# ATUALIZAR CIRCUITO (se você não tiver essa rota, precisa adicionar)
+@bp.put("/api/circuitos/<int:circuito_id>")
+@login_required
+def api_circuitos_update(circuito_id):
+    c = db.get_or_404(Circuito, circuito_id)
+    
+    projeto_id = session.get("projeto_atual_id")
+    if c.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Circuito não pertence ao projeto atual."}), 400
+
+    data = request.get_json(silent=True) or request.form or {}
+    
+    if "nome" in data:
+        c.nome = (data.get("nome") or "").strip()
+    
+    if "identificador" in data:
+        novo_identificador = (data.get("identificador") or "").strip()
+        if novo_identificador != c.identificador:
+            exists = (
+                Circuito.query
+                .filter(Circuito.projeto_id == projeto_id, Circuito.identificador == novo_identificador)
+                .first()
+            )
+            if exists:
+                return jsonify({"ok": False, "error": "Identificador já existe neste projeto."}), 409
+        c.identificador = novo_identificador
+
+    if "ambiente_id" in data:
+        novo_ambiente_id = data.get("ambiente_id")
+        if novo_ambiente_id:
+            novo_ambiente = db.get_or_404(Ambiente, int(novo_ambiente_id))
+            if novo_ambiente.projeto_id != projeto_id:
+                return jsonify({"ok": False, "error": "Ambiente não pertence ao projeto atual."}), 400
+            c.ambiente_id = novo_ambiente.id
+
+    if "tipo" in data:
+        novo_tipo = (data.get("tipo") or "").strip()
+        c.tipo = novo_tipo
+        if novo_tipo != "luz":
+            c.dimerizavel = False
+    
+    if "dimerizavel" in data and c.tipo == "luz":
+        c.dimerizavel = bool(data.get("dimerizavel"))
+
+    # NOVO: Atualizar campo potencia
+    if "potencia" in data:
+        nova_potencia = data.get("potencia")
+        if nova_potencia is not None:
+            nova_potencia = float(nova_potencia)
+            if nova_potencia < 0:
+                return jsonify({"ok": False, "error": "A potência não pode ser negativa."}), 400
+            c.potencia = nova_potencia
+        else:
+            c.potencia = None
+
+
+    db.session.commit()
+    
+    return jsonify({
+        "ok": True, 
+        "id": c.id,
+        "nome": c.nome,
+        "tipo": c.tipo,
+        "dimerizavel": c.dimerizavel,
+        "potencia": c.potencia
+    })
+
+
+# EXCLUIR CIRCUITO (permanece igual)
+@bp.delete("/api/circuitos/<int:circuito_id>")
+@login_required
+def api_circuitos_delete(circuito_id):
+    c = db.get_or_404(Circuito, circuito_id)
+
+    projeto_id = session.get("projeto_atual_id")
+    if c.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Circuito não pertence ao projeto atual."}), 400
+
+    db.session.delete(c)
+    db.session.commit()
+    return jsonify({"ok": True})
@@ -0,0 +1,29 @@
+# rotas/comum.py
+"""
+Decorators compartilhados entre os blueprints.
+"""
+from functools import wraps
+
+from flask import request, jsonify, redirect, url_for
+from flask_login import current_user
+
+
+def admin_required(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        # precisa estar logado
+        if not current_user.is_authenticated:
+            # se for API (JSON), devolve 401 em JSON
+            if request.accept_mimetypes.best == "application/json" or request.is_json:
+                return jsonify({"ok": False, "error": "Não autenticado."}), 401
+            # se for página, manda para o login
+            return redirect(url_for("login"))
+        # precisa ser admin
+        if getattr(current_user, "role", "user") != "admin":
+            if request.accept_mimetypes.best == "application/json" or request.is_json:
+                return jsonify({"ok": False, "error": "Acesso restrito a administradores."}), 403
+            return ("Forbidden", 403)
+        return fn(*args, **kwargs)
+    return wrapper
+
+    
@@ -0,0 +1,718 @@
+# rotas/exportacao.py
+"""
+Exportações do projeto: .rwp (Roehn Wizard), CSV, JSON e relatório PDF.
+
+Carregado sob demanda: as URLs são registradas em rotas/__init__.py (ROTAS_TARDIAS)
+e este módulo só é importado na primeira exportação. O ReportLab e o conversor
+ficam para a primeira exportação que usa cada um.
+"""
+import uuid
+import io
+import csv
+import zipfile
+import re
+import threading
+from datetime import datetime, timedelta
+
+from flask import request, jsonify, send_file, session, redirect, url_for, flash, current_app
+from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
+
+from database import db, Projeto, Area, Ambiente, Circuito, Modulo, Vinculacao, Keypad, QuadroEletrico, Cena, Acao
+from health import rastrear_job
+import json_backend
+
+# Relatório (avisos/erros) da última geração de .rwp de cada projeto, neste processo
+_relatorios = {}
+_relatorios_lock = threading.Lock()
+
+
+@login_required
+@rastrear_job("export_rwp")
+def roehn_import():
+    # Verificar se há um projeto selecionado
+    projeto_atual_id = session.get('projeto_atual_id')
+    if not projeto_atual_id:
+        flash('Nenhum projeto selecionado. Selecione ou crie um projeto primeiro.', 'warning')
+        return redirect(url_for('index'))
+    
+    projeto = db.session.get(Projeto, projeto_atual_id)
+    if not projeto:
+        flash('Projeto não encontrado.', 'danger')
+        return redirect(url_for('index'))
+    
+    # Processar formulário de importação
+    project_info = {
+        'project_name': request.form.get('project_name', projeto.nome),
+        'client_name': request.form.get('client_name', ''),
+        'client_email': request.form.get('client_email', ''),
+        'client_phone': request.form.get('client_phone_clean', ''),
+        'timezone_id': request.form.get('timezone_id', 'America/Bahia'),
+        'lat': request.form.get('lat', '0.0'),
+        'lon': request.form.get('lon', '0.0'),
+        'tech_area': request.form.get('tech_area', 'Área Técnica'),
+        'tech_room': request.form.get('tech_room', 'Sala Técnica'),
+        'board_name': request.form.get('board_name', 'Quadro Elétrico'),
+        'm4_ip': request.form.get('m4_ip', '192.168.0.245'),
+        'm4_hsnet': request.form.get('m4_hsnet', '245'),
+        'm4_devid': request.form.get('m4_devid', '1'),
+        'software_version': request.form.get('software_version', '1.0.8.67'),
+        'programmer_name': request.form.get('programmer_name', current_user.username),
+        'programmer_email': request.form.get('programmer_email', current_user.email),
+        'programmer_guid': str(uuid.uuid4()),
+    }
+    raw_m4_quadro = request.form.get('m4_quadro_id')
+    m4_quadro_id = None
+    if raw_m4_quadro:
+        try:
+            m4_quadro_id = int(raw_m4_quadro)
+        except (TypeError, ValueError):
+            m4_quadro_id = None
+    if m4_quadro_id:
+        quadro = db.session.get(QuadroEletrico, m4_quadro_id)
+        if not quadro or quadro.projeto_id != projeto.id:
+            m4_quadro_id = None
+    project_info['m4_quadro_id'] = m4_quadro_id
+    
+    converter = None
+    try:
+        # Converter dados do projeto para Roehn (módulo carregado na primeira geração)
+        from roehn_converter import RoehnProjectConverter
+        converter = RoehnProjectConverter(projeto, db.session, current_user.id)
+        converter.create_project(project_info)
+        
+        # Processar os dados do projeto atual - CORREÇÃO AQUI
+        # Garantir que estamos passando o projeto completo
+        converter.process_db_project(projeto)
+        
+        # Gerar arquivo para download
+        project_json = converter.export_project()
+        
+        # Criar resposta para download
+        nome_arquivo = f"{project_info['project_name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.rwp"
+        relatorio = {
+            "projeto_id": projeto.id,
+            "arquivo": nome_arquivo,
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+            **converter.diag.relatorio(),
+        }
+        with _relatorios_lock:
+            _relatorios[projeto.id] = relatorio
+
+        output = io.BytesIO()
+        mimetype = 'application/json'
+        if request.form.get('formato') == 'zip':
+            # .rwp dentro de um .zip: para baixar sem depender da compressão HTTP; o
+            # relatório da conversão vai junto
+            with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as arquivo_zip:
+                arquivo_zip.writestr(nome_arquivo, project_json.encode('utf-8'))
+                arquivo_zip.writestr('relatorio.json', json_backend.dumps(relatorio, indent=2))
+            nome_arquivo += '.zip'
+            mimetype = 'application/zip'
+        else:
+            output.write(project_json.encode('utf-8'))
+        output.seek(0)
+
+        if relatorio["counts"]["warning"] or relatorio["counts"]["error"]:
+            current_app.logger.warning(
+                "Conversão de '%s' gerou %d aviso(s) e %d erro(s)",
+                projeto.nome, relatorio["counts"]["warning"], relatorio["counts"]["error"],
+            )
+
+        resp = send_file(
+            output,
+            as_attachment=True,
+            download_name=nome_arquivo,
+            mimetype=mimetype
+        )
+        resp.headers["X-Conversion-Warnings"] = str(relatorio["counts"]["warning"])
+        resp.headers["X-Conversion-Errors"] = str(relatorio["counts"]["error"])
+        return resp
+        
+    except Exception as e:
+        # Capturar informações detalhadas do erro
+        import traceback
+        error_traceback = traceback.format_exc()
+        current_app.logger.error(f"Erro durante a geração do projeto: {str(e)}")
+        current_app.logger.error(f"Traceback: {error_traceback}")
+        
+        flash(f'Erro durante a geração do projeto: {str(e)}. Verifique os logs para mais detalhes.', 'danger')
+        return redirect(url_for('exportacao.roehn_import'))
+    finally:
+        # Descarrega o trace que ainda estiver em buffer (inclusive em caso de erro)
+        if converter is not None:
+            converter.diag.flush()
+
+
+@login_required
+def roehn_relatorio():
+    """Avisos e erros da última geração de .rwp do projeto atual (null se não houve)."""
+    projeto_id = session.get('projeto_atual_id')
+    if not projeto_id:
+        return jsonify({"ok": False, "error": "Projeto não selecionado."}), 400
+    with _relatorios_lock:
+        relatorio = _relatorios.get(projeto_id)
+    return jsonify({"ok": True, "relatorio": relatorio})
+
+
+@login_required
+@rastrear_job("export_csv")
+def exportar_csv():
+    projeto_atual_id = session.get('projeto_atual_id')
+    projeto = Projeto.query.get(projeto_atual_id)
+    
+    circuitos = Circuito.query.filter(Circuito.projeto_id == projeto_atual_id).all()
+    
+    output = io.StringIO()
+    writer = csv.writer(output)
+    
+    # Adicionar coluna do quadro elétrico
+    writer.writerow(['Circuito', 'Tipo', 'Nome', 'Area', 'Ambiente', 'SAKs', 'Canal', 'Modulo', 'Quadro Elétrico', 'id Modulo'])
+    
+    for circuito in circuitos:
+        vinculacao = Vinculacao.query.filter_by(circuito_id=circuito.id).first()
+        if vinculacao:
+            modulo = Modulo.query.get(vinculacao.modulo_id)
+            ambiente = Ambiente.query.get(circuito.ambiente_id)
+            area = Area.query.get(ambiente.area_id)
+            
+            # Obter nome do quadro elétrico (se existir)
+            quadro_nome = modulo.quadro_eletrico.nome if modulo and modulo.quadro_eletrico else "-"
+            
+            # Para circuitos HVAC, mostrar vazio no campo SAK
+            if circuito.tipo == 'hvac':
+                sak_value = ''
+            elif circuito.quantidade_saks > 1:
+                sak_value = f"{circuito.sak}-{circuito.sak + circuito.quantidade_saks - 1}"
+            else:
+                sak_value = str(circuito.sak)
+            
+            writer.writerow([
+                circuito.identificador,
+                circuito.tipo,
+                circuito.nome,
+                area.nome,
+                ambiente.nome,
+                sak_value,
+                vinculacao.canal,
+                modulo.nome if modulo else "-",
+                quadro_nome,  # Nova coluna
+                modulo.id if modulo else ""
+            ])
+    
+    output.seek(0)
+    
+    # Obter nome do projeto para usar no nome do arquivo
+    nome_projeto = projeto.nome if projeto else 'projeto'
+    
+    # Limpar o nome do projeto para usar no nome do arquivo
+    nome_arquivo = re.sub(r'[^a-zA-Z0-9_]', '_', nome_projeto)
+    
+    return send_file(
+        io.BytesIO(output.getvalue().encode('utf-8')),
+        mimetype='text/csv',
+        as_attachment=True,
+        download_name=f'{nome_arquivo}_roehn.csv'
+    )
+
+@login_required
+@rastrear_job("export_json")
+def exportar_projeto(projeto_id):
+    projeto = Projeto.query.options(
+        joinedload(Projeto.areas)
+        .joinedload(Area.ambientes)
+        .joinedload(Ambiente.circuitos)
+        .joinedload(Circuito.vinculacao),
+        joinedload(Projeto.areas)
+        .joinedload(Area.ambientes)
+        .joinedload(Ambiente.keypads)
+        .joinedload(Keypad.buttons),
+        joinedload(Projeto.areas)
+        .joinedload(Area.ambientes)
+        .joinedload(Ambiente.quadros_eletricos)
+        .joinedload(QuadroEletrico.modulos),
+        joinedload(Projeto.areas)
+        .joinedload(Area.ambientes)
+        .joinedload(Ambiente.cenas)
+        .joinedload(Cena.acoes)
+        .joinedload(Acao.custom_acoes),
+        joinedload(Projeto.modulos)
+    ).get_or_404(projeto_id)
+
+    if projeto.user_id != current_user.id and current_user.role != 'admin':
+        return jsonify({"ok": False, "error": "Acesso negado."}), 403
+
+    # Estrutura de dados para exportação
+    export_data = {
+        'version': '1.1',
+        'exported_at': datetime.utcnow().isoformat(),
+        'projeto': {},
+        'areas': [],
+        'ambientes': [],
+        'quadros_eletricos': [],
+        'circuitos': [],
+        'modulos': [],
+        'vinculacoes': [],
+        'keypads': [],
+        'keypad_buttons': [],
+        'cenas': [],
+        'acoes': [],
+        'custom_acoes': [],
+    }
+
+    # 1. Projeto
+    export_data['projeto'] = {
+        'id': projeto.id,
+        'nome': projeto.nome,
+        'status': projeto.status,
+        'data_criacao': projeto.data_criacao.isoformat() if projeto.data_criacao else None,
+        'data_ativo': projeto.data_ativo.isoformat() if projeto.data_ativo else None,
+        'data_inativo': projeto.data_inativo.isoformat() if projeto.data_inativo else None,
+        'data_concluido': projeto.data_concluido.isoformat() if projeto.data_concluido else None,
+    }
+
+    # 2. Módulos (todos do projeto)
+    all_modulos_in_projeto = Modulo.query.filter_by(projeto_id=projeto.id).all()
+    for modulo in all_modulos_in_projeto:
+        export_data['modulos'].append({
+            'id': modulo.id,
+            'nome': modulo.nome,
+            'tipo': modulo.tipo,
+            'quantidade_canais': modulo.quantidade_canais,
+            'hsnet': modulo.hsnet,
+            'dev_id': modulo.dev_id,
+            'is_controller': modulo.is_controller,
+            'is_logic_server': modulo.is_logic_server,
+            'ip_address': modulo.ip_address,
+            'quadro_eletrico_id': modulo.quadro_eletrico_id,
+            'parent_controller_id': modulo.parent_controller_id,
+        })
+        # Coletar vinculações associadas
+        for vinc in modulo.vinculacoes:
+            export_data['vinculacoes'].append({
+                'id': vinc.id,
+                'circuito_id': vinc.circuito_id,
+                'modulo_id': vinc.modulo_id,
+                'canal': vinc.canal,
+            })
+
+    # 3. Áreas e seus filhos
+    for area in projeto.areas:
+        export_data['areas'].append({'id': area.id, 'nome': area.nome, 'projeto_id': area.projeto_id})
+        for ambiente in area.ambientes:
+            export_data['ambientes'].append({'id': ambiente.id, 'nome': ambiente.nome, 'area_id': ambiente.area_id})
+
+            # Quadros Elétricos
+            for quadro in ambiente.quadros_eletricos:
+                export_data['quadros_eletricos'].append({
+                    'id': quadro.id,
+                    'nome': quadro.nome,
+                    'notes': quadro.notes,
+                    'ambiente_id': quadro.ambiente_id,
+                    'projeto_id': quadro.projeto_id,
+                })
+
+            # Circuitos
+            for circuito in ambiente.circuitos:
+                export_data['circuitos'].append({
+                    'id': circuito.id,
+                    'identificador': circuito.identificador,
+                    'nome': circuito.nome,
+                    'tipo': circuito.tipo,
+                    'dimerizavel': circuito.dimerizavel,
+                    'potencia': circuito.potencia,
+                    'ambiente_id': circuito.ambiente_id,
+                    'sak': circuito.sak,
+                    'quantidade_saks': circuito.quantidade_saks,
+                })
+
+            # Keypads
+            for keypad in ambiente.keypads:
+                export_data['keypads'].append({
+                    'id': keypad.id,
+                    'nome': keypad.nome,
+                    'modelo': keypad.modelo,
+                    'color': keypad.color,
+                    'button_color': keypad.button_color,
+                    'button_count': keypad.button_count,
+                    'hsnet': keypad.hsnet,
+                    'dev_id': keypad.dev_id,
+                    'ambiente_id': keypad.ambiente_id,
+                    'notes': keypad.notes,
+                    'created_at': keypad.created_at.isoformat() if getattr(keypad, "created_at", None) else None,
+                    'updated_at': keypad.updated_at.isoformat() if getattr(keypad, "updated_at", None) else None,
+                })
+                for button in keypad.buttons:
+                    export_data['keypad_buttons'].append({
+                        'id': button.id,
+                        'keypad_id': button.keypad_id,
+                        'ordem': button.ordem,
+                        'guid': button.guid,
+                        'circuito_id': button.circuito_id,
+                        'cena_id': button.cena_id,
+                        'modo': button.modo,
+                        'command_on': button.command_on,
+                        'command_off': button.command_off,
+                        'can_hold': button.can_hold,
+                        'modo_double_press': button.modo_double_press,
+                        'command_double_press': button.command_double_press,
+                        'target_object_guid': button.target_object_guid,
+                        'notes': button.notes,
+                        'engraver_text': button.engraver_text,
+                        'icon': button.icon,
+                        'rocker_style': button.rocker_style,
+                        'is_rocker': button.is_rocker,
+                        'created_at': button.created_at.isoformat() if getattr(button, "created_at", None) else None,
+                        'updated_at': button.updated_at.isoformat() if getattr(button, "updated_at", None) else None,
+                    })
+
+            # Cenas
+            for cena in ambiente.cenas:
+                export_data['cenas'].append({
+                    'id': cena.id,
+                    'guid': cena.guid,
+                    'nome': cena.nome,
+                    'ambiente_id': cena.ambiente_id,
+                    'scene_movers': cena.scene_movers,
+                })
+                for acao in cena.acoes:
+                    export_data['acoes'].append({
+                        'id': acao.id,
+                        'cena_id': acao.cena_id,
+                        'level': acao.level,
+                        'action_type': acao.action_type,
+                        'target_guid': acao.target_guid,
+                    })
+                    for custom_acao in acao.custom_acoes:
+                        export_data['custom_acoes'].append({
+                            'id': custom_acao.id,
+                            'acao_id': custom_acao.acao_id,
+                            'target_guid': custom_acao.target_guid,
+                            'enable': custom_acao.enable,
+                            'level': custom_acao.level,
+                        })
+
+    # Preparar arquivo para download
+    output = io.BytesIO()
+    output.write(json_backend.dumps(export_data, indent=2, ensure_ascii=True))
+    output.seek(0)
+    
+    # Nome do arquivo
+    safe_nome = re.sub(r'[^a-zA-Z0-9_.-]', '_', projeto.nome)
+    nome_arquivo = f"export_{safe_nome}_{datetime.now().strftime('%Y%m%d')}.json"
+    
+    return send_file(
+        output,
+        mimetype='application/json',
+        as_attachment=True,
+        download_name=nome_arquivo
+    )
+
+
+@login_required
+@rastrear_job("export_pdf")
+def exportar_pdf(projeto_id):
+    projeto = Projeto.query.options(
+        joinedload(Projeto.areas).
+        joinedload(Area.ambientes).
+        joinedload(Ambiente.circuitos).
+        joinedload(Circuito.vinculacao).
+        joinedload(Vinculacao.modulo)
+    ).get_or_404(projeto_id)
+
+    if projeto.user_id != current_user.id and current_user.role != 'admin':
+        flash('Acesso negado a este projeto', 'danger')
+        return redirect(url_for('index'))
+
+    # ReportLab carregado só na primeira exportação (relatorio_pdf.py)
+    from relatorio_pdf import (
+        A4, inch, getSampleStyleSheet, ParagraphStyle, SimpleDocTemplate, Paragraph, Spacer,
+        Table, TableStyle, PageBreak, Image, TA_CENTER, TA_LEFT, colors, NumberedCanvas, footer,
+    )
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=30,
+        leftMargin=30,
+        topMargin=30,
+        bottomMargin=30,
+        title=f"Projeto {projeto.nome}"
+    )
+
+    client_timestamp_str = request.args.get('client_timestamp')
+    tz_offset_str = request.args.get('tz_offset')
+    doc.client_timestamp = client_timestamp_str
+    doc.tz_offset = tz_offset_str
+
+    if client_timestamp_str and tz_offset_str is not None:
+        try:
+            utc_time = datetime.fromisoformat(client_timestamp_str.replace('Z', '+00:00'))
+            offset_minutes = int(tz_offset_str)
+            local_time = utc_time - timedelta(minutes=offset_minutes)
+            formatted_time = local_time.strftime('%d/%m/%Y %H:%M')
+        except (ValueError, TypeError):
+            formatted_time = datetime.now().strftime('%d/%m/%Y %H:%M')
+    else:
+        formatted_time = datetime.now().strftime('%d/%m/%Y %H:%M')
+
+    styles = getSampleStyleSheet()
+    # Base Styles
+    if 'RoehnTitle' not in styles:
+        styles.add(ParagraphStyle(name='RoehnTitle', parent=styles['Heading1'], fontSize=16, spaceAfter=30, alignment=TA_CENTER))
+    if 'RoehnSubtitle' not in styles:
+        styles.add(ParagraphStyle(name='RoehnSubtitle', parent=styles['Heading2'], fontSize=12, spaceAfter=12, spaceBefore=12))
+    if 'RoehnCenter' not in styles:
+        styles.add(ParagraphStyle(name='RoehnCenter', parent=styles['Normal'], alignment=TA_CENTER))
+    if 'LeftNormal' not in styles:
+        styles.add(ParagraphStyle(name='LeftNormal', parent=styles['Normal'], alignment=TA_LEFT))
+
+    # Styles for tables with word wrapping
+    if 'TableHeader' not in styles:
+        styles.add(ParagraphStyle(name='TableHeader', parent=styles['Normal'], alignment=TA_CENTER, fontSize=9, textColor=colors.whitesmoke, fontName='Helvetica-Bold'))
+    if 'TableBody' not in styles:
+        styles.add(ParagraphStyle(name='TableBody', parent=styles['Normal'], alignment=TA_LEFT, fontSize=8))
+    if 'TableBodyCenter' not in styles:
+        styles.add(ParagraphStyle(name='TableBodyCenter', parent=styles['TableBody'], alignment=TA_CENTER))
+
+    elements = []
+    zafirologopath = "static/images/zafirologo.png"
+    zafirologo = Image(zafirologopath, width=2*inch, height=2*inch)
+    elements.append(zafirologo)
+    elements.append(Paragraph("RELATÓRIO DE PROJETO", styles['RoehnCenter']))
+    elements.append(Spacer(1, 0.2*inch))
+    elements.append(Paragraph(f"<b>Projeto:</b> {projeto.nome}", styles['LeftNormal']))
+    elements.append(Spacer(1, 0.1*inch))
+    elements.append(Paragraph(f"<b>Data de emissão:</b> {formatted_time}", styles['LeftNormal']))
+    elements.append(Spacer(1, 0.1*inch))
+    elements.append(Paragraph(f"<b>Emitido por:</b> {current_user.username}", styles['LeftNormal']))
+    elements.append(Spacer(1, 0.3*inch))
+
+    # Resumo por Área
+    for area in projeto.areas:
+        elements.append(Paragraph(f"ÁREA: {area.nome}", styles['Heading2']))
+        elements.append(Spacer(1, 0.1*inch))
+        
+        for ambiente in area.ambientes:
+            elements.append(Paragraph(f"Ambiente: {ambiente.nome}", styles['Heading3']))
+            
+            # Prepare data for styling and for the table
+            header_row = [Paragraph(h, styles['TableHeader']) for h in ["Circuito", "Nome", "Tipo", "SAKs", "Módulo", "Canal", "Verificado"]]
+            table_data_styled = [header_row]
+            color_commands = []
+            raw_data_for_coloring = [] # Keep track of raw types for coloring logic
+
+            for circuito in ambiente.circuitos:
+                modulo_nome = "Não vinculado"
+                canal = "-"
+                if circuito.vinculacao:
+                    modulo_nome = circuito.vinculacao.modulo.nome
+                    canal = str(circuito.vinculacao.canal)
+                
+                sak_value = ""
+                if circuito.tipo == 'hvac':
+                    pass
+                elif circuito.tipo == 'persiana':
+                    # First row for persiana (up)
+                    row_styled_up = [
+                        Paragraph(circuito.identificador, styles['TableBodyCenter']),
+                        Paragraph(f"{circuito.nome} (sobe)", styles['TableBodyCenter']),  # <-- antes: TableBody
+                        Paragraph(circuito.tipo.upper(), styles['TableBodyCenter']),
+                        Paragraph(str(circuito.sak), styles['TableBodyCenter']),
+                        Paragraph(modulo_nome, styles['TableBodyCenter']),                # <-- antes: TableBody
+                        Paragraph(f"{canal}s", styles['TableBodyCenter']),
+                        Paragraph("", styles['TableBodyCenter'])
+                    ]
+                    table_data_styled.append(row_styled_up)
+                    raw_data_for_coloring.append({'tipo': circuito.tipo, 'nome': f"{circuito.nome} (sobe)"})
+
+                    # Second row for persiana (down)
+                    row_styled_down = [
+                        Paragraph(circuito.identificador, styles['TableBodyCenter']),
+                        Paragraph(f"{circuito.nome} (desce)", styles['TableBodyCenter']), # <-- antes: TableBody
+                        Paragraph(circuito.tipo.upper(), styles['TableBodyCenter']),
+                        Paragraph(str(circuito.sak + 1), styles['TableBodyCenter']),
+                        Paragraph(modulo_nome, styles['TableBodyCenter']),                # <-- antes: TableBody
+                        Paragraph(f"{canal}d", styles['TableBodyCenter']),
+                        Paragraph("", styles['TableBodyCenter'])
+                    ]
+                    table_data_styled.append(row_styled_down)
+                    raw_data_for_coloring.append({'tipo': circuito.tipo, 'nome': f"{circuito.nome} (desce)"})
+                    continue
+                else:
+                    sak_value = str(circuito.sak)
+
+                # Row for other circuit types
+                row_styled = [
+                    Paragraph(circuito.identificador, styles['TableBodyCenter']),
+                    Paragraph(circuito.nome, styles['TableBodyCenter']),
+                    Paragraph(circuito.tipo.upper(), styles['TableBodyCenter']),
+                    Paragraph(sak_value, styles['TableBodyCenter']),
+                    Paragraph(modulo_nome, styles['TableBodyCenter']),
+                    Paragraph(canal, styles['TableBodyCenter']),
+                    Paragraph("", styles['TableBodyCenter'])
+                ]
+                table_data_styled.append(row_styled)
+                raw_data_for_coloring.append({'tipo': circuito.tipo, 'nome': circuito.nome})
+            
+            if len(table_data_styled) > 1:
+                # Apply coloring based on raw data
+                for i, row in enumerate(raw_data_for_coloring, 1):
+                    if row['tipo'] == "luz":
+                        color_commands.append(('BACKGROUND', (0, i), (-1, i), colors.HexColor("#fff3cd")))
+                    elif row['tipo'] == "persiana":
+                        if "(sobe)" in row['nome'] or "(desce)" in row['nome']:
+                            color_commands.append(('BACKGROUND', (0, i), (-1, i), colors.HexColor("#d1ecf1")))
+                    elif row['tipo'] == "hvac":
+                        color_commands.append(('BACKGROUND', (0, i), (-1, i), colors.HexColor("#d4edda")))
+
+                circuito_table = Table(table_data_styled, colWidths=[0.7*inch, 1.5*inch, 0.8*inch, 0.6*inch, 1.2*inch, 0.6*inch, 0.8*inch], repeatRows=1)
+
+                base_style = [
+                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#2c3e50")),
+                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'), # Vertical alignment
+                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                    ('FONTSIZE', (0, 0), (-1, 0), 9),
+                    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+                    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor("#4d4f52")),
+                    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor("#f1f3f5")])
+                ]
+
+                estilo_tabela = TableStyle(base_style + color_commands)
+                circuito_table.setStyle(estilo_tabela)
+                elements.append(circuito_table)
+            else:
+                elements.append(Paragraph("Nenhum circuito neste ambiente.", styles['Italic']))
+            
+            elements.append(Spacer(1, 0.2*inch))
+        
+        if area != projeto.areas[-1]:
+            elements.append(PageBreak())
+
+    # Resumo de Módulos
+    elements.append(PageBreak())
+    elements.append(Paragraph("RESUMO DE MÓDULOS", styles['Heading2']))
+    elements.append(Spacer(1, 0.2*inch))
+    
+    todos_circuitos = {c.id: c for area in projeto.areas for ambiente in area.ambientes for c in ambiente.circuitos}
+    modulos_projeto = Modulo.query.filter(Modulo.projeto_id == projeto_id).options(joinedload(Modulo.vinculacoes)).all()
+    
+    if modulos_projeto:
+        for modulo in modulos_projeto:
+            elements.append(Paragraph(f"Módulo: {modulo.nome} ({modulo.tipo})", styles['Heading3']))
+            
+            header_row_mod = [Paragraph(h, styles['TableHeader']) for h in ["Canal", "Circuito", "Nome", "A. Registrada", "A. Medida"]]
+            canal_data_styled = [header_row_mod]
+            color_commands_mod = []
+            raw_data_for_coloring_mod = []
+
+            canais_ocupados = {v.canal: v for v in modulo.vinculacoes}
+            
+            for i, canal_num in enumerate(range(1, modulo.quantidade_canais + 1), 1):
+                if canal_num in canais_ocupados:
+                    vinculacao = canais_ocupados[canal_num]
+                    circuito = todos_circuitos.get(vinculacao.circuito_id)
+                    if circuito:
+                        amperagem = f"{(circuito.potencia or 0) / 120:.2f}A" if circuito.potencia else "0.00A"
+                        row_styled = [
+                            Paragraph(str(canal_num), styles['TableBodyCenter']),
+                            Paragraph(circuito.identificador, styles['TableBodyCenter']),
+                            Paragraph(circuito.nome, styles['TableBodyCenter']),
+                            Paragraph(amperagem, styles['TableBodyCenter']),
+                            Paragraph("", styles['TableBodyCenter'])
+                        ]
+                        canal_data_styled.append(row_styled)
+                        raw_data_for_coloring_mod.append({'tipo': circuito.tipo})
+                    else:
+                        canal_data_styled.append([Paragraph(str(canal_num), styles['TableBodyCenter']), Paragraph("ID Desconhecido", styles['TableBodyCenter']), Paragraph("Circuito não encontrado", styles['TableBody']), Paragraph("-", styles['TableBodyCenter']), Paragraph("", styles['TableBodyCenter'])])
+                        raw_data_for_coloring_mod.append({'tipo': 'unknown'})
+                else:
+                    canal_data_styled.append([Paragraph(str(canal_num), styles['TableBodyCenter']), Paragraph("Livre", styles['TableBodyCenter']), Paragraph("-", styles['TableBody']), Paragraph("-", styles['TableBodyCenter']), Paragraph("", styles['TableBodyCenter'])])
+                    raw_data_for_coloring_mod.append({'tipo': 'free'})
+            
+            # Apply coloring
+            for i, row in enumerate(raw_data_for_coloring_mod, 1):
+                tipo = row.get('tipo')
+                if tipo == "luz":
+                    color_commands_mod.append(('BACKGROUND', (0, i), (-1, i), colors.HexColor("#fff3cd")))
+                elif tipo == "persiana":
+                    color_commands_mod.append(('BACKGROUND', (0, i), (-1, i), colors.HexColor("#d1ecf1")))
+                elif tipo == "hvac":
+                    color_commands_mod.append(('BACKGROUND', (0, i), (-1, i), colors.HexColor("#d4edda")))
+
+            canal_table = Table(canal_data_styled, colWidths=[0.6*inch, 1.0*inch, 2.0*inch, 1.2*inch, 1.2*inch], repeatRows=1)
+
+            base_style = [
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#2c3e50")),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 9),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor("#4d4f52")),
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor("#f1f3f5")])
+            ]
+
+            estilo_canal = TableStyle(base_style + color_commands_mod)
+            canal_table.setStyle(estilo_canal)
+            elements.append(canal_table)
+            elements.append(Spacer(1, 0.3*inch))
+    else:
+        elements.append(Paragraph("Nenhum módulo configurado neste projeto.", styles['Italic']))
+
+    # Seção de Assinaturas
+    elements.append(PageBreak())
+    elements.append(Paragraph("REGISTRO DE VISITAS TÉCNICAS", styles['Heading2']))
+    elements.append(Spacer(1, 0.2*inch))
+
+    assinatura_data = [["Data", "Técnico Responsável", "Assinatura"]]
+    for i in range(10):
+        assinatura_data.append(["____/____/______", "", ""])
+    
+    assinatura_table = Table(assinatura_data, colWidths=[1.5*inch, 3*inch, 2.5*inch], rowHeights=0.5*inch)
+    assinatura_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#2c3e50")),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    elements.append(assinatura_table)
+
+    # Página de Observações
+    elements.append(PageBreak())
+    elements.append(Paragraph("OBSERVAÇÕES GERAIS", styles['Heading2']))
+    elements.append(Spacer(1, 0.2*inch))
+
+    obs_data = []
+    for i in range(1, 11):
+        obs_data.append([f"Dia {i}:", ""])
+    
+    obs_table = Table(obs_data, colWidths=[0.8*inch, 6.2*inch], rowHeights=1.5*inch)
+    obs_table.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP')
+    ]))
+    elements.append(obs_table)
+
+    doc.build(
+        elements,
+        onFirstPage=footer,
+        onLaterPages=footer,
+        canvasmaker=NumberedCanvas
+    )
+
+    buffer.seek(0)
+    
+    nome_arquivo = f"projeto_{projeto.nome}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    
+    return send_file(
+        buffer,
+        as_attachment=True,
+        download_name=nome_arquivo,
+        mimetype='application/pdf'
+    )
@@ -0,0 +1,466 @@
+# rotas/importacao.py
+"""
+Importações: planilha do planner e projeto exportado em JSON.
+
+Carregado sob demanda, como rotas/exportacao.py (ver ROTAS_TARDIAS em rotas/__init__.py).
+"""
+import uuid
+import json
+from datetime import datetime
+
+from flask import request, jsonify, session, current_app
+from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
+
+from database import db, Projeto, Area, Ambiente, Circuito, Modulo, Vinculacao, Keypad, KeypadButton, QuadroEletrico, Cena, Acao, CustomAcao
+from health import rastrear_job
+from alocadores import SemHsnetLivre, alocar_hsnet
+import json_backend
+from rotas.keypads import ensure_keypad_button_slots
+
+
+@login_required
+@rastrear_job("import_planner")
+def importar_planner():
+    if 'file' not in request.files:
+        return jsonify({"ok": False, "error": "Nenhum arquivo enviado."}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({"ok": False, "error": "Nenhum arquivo selecionado."}), 400
+
+    if not file or not file.filename.endswith('.json'):
+        return jsonify({"ok": False, "error": "Arquivo inválido. Apenas arquivos .json são permitidos."}), 400
+
+    try:
+        data = json_backend.loads(file.read())
+    except json.JSONDecodeError:
+        return jsonify({"ok": False, "error": "Arquivo JSON mal formatado."}), 400
+
+    required_keys = ["ProjectName", "ProjectDataAreas", "ProjectDataRooms", "ProjectDataDevices"]
+    if not all(key in data for key in required_keys):
+        return jsonify({"ok": False, "error": "Estrutura do JSON do planner inválida."}), 400
+
+    id_map = {
+        'areas': {},
+        'ambientes': {},
+    }
+
+    try:
+        with db.session.begin_nested():
+            # 1. Criar Projeto
+            original_nome = data['ProjectName']
+            novo_nome = original_nome
+            count = 1
+            while Projeto.query.filter_by(nome=novo_nome, user_id=current_user.id).first():
+                novo_nome = f"{original_nome} (importado {count})"
+                count += 1
+
+            now = datetime.utcnow()
+            novo_projeto = Projeto(
+                nome=novo_nome,
+                user_id=current_user.id,
+                status='ATIVO',
+                data_ativo=now
+            )
+            db.session.add(novo_projeto)
+            db.session.flush()
+
+            # 2. Criar Áreas
+            for area_data in data.get('ProjectDataAreas', []):
+                nova_area = Area(nome=area_data['Name'], projeto_id=novo_projeto.id)
+                db.session.add(nova_area)
+                db.session.flush()
+                id_map['areas'][area_data['Id']] = nova_area
+
+            # 3. Criar Ambientes
+            for room_data in data.get('ProjectDataRooms', []):
+                area = id_map['areas'].get(room_data['IdArea'])
+                if not area:
+                    continue
+                novo_ambiente = Ambiente(nome=room_data['Name'], area_id=area.id)
+                db.session.add(novo_ambiente)
+                db.session.flush()
+                id_map['ambientes'][room_data['Id']] = novo_ambiente
+
+            # 4. Criar Keypads (HSNETs alocados de uma vez, na faixa de keypads)
+            dispositivos = [
+                (device_data, id_map['ambientes'][device_data['IdRoom']])
+                for device_data in data.get('ProjectDataDevices', [])
+                if device_data.get('Type') == 'Keypad' and device_data.get('IdRoom') in id_map['ambientes']
+            ]
+            hsnets = alocar_hsnet(novo_projeto.id, "keypad", len(dispositivos))
+            for (device_data, ambiente), hsnet in zip(dispositivos, hsnets):
+
+                # Mapeamento de Cores
+                color_map = {"WHT": "WHITE", "BLK": "BLACK", "ASLV": "SILVER"}
+                faceplate_color = color_map.get(device_data.get('FaceplateColor'), 'WHITE')
+
+                # Mapeamento de Layout
+                model_key = 'ModelLeft' if 'ModelLeft' in device_data else 'ModelRight'
+                layout_map = {"K1": 1, "K2": 2, "K4": 4}
+                button_count = layout_map.get(device_data.get(model_key), 4)
+
+                novo_keypad = Keypad(
+                    nome=device_data['Name'],
+                    modelo='RQR-K',
+                    color=faceplate_color,
+                    button_color='WHITE', # Padrão
+                    button_count=button_count,
+                    hsnet=hsnet,
+                    dev_id=hsnet,
+                    ambiente_id=ambiente.id,
+                    projeto_id=novo_projeto.id,
+                    notes=device_data.get('Notas', '')
+                )
+                db.session.add(novo_keypad)
+                db.session.flush()
+
+                ensure_keypad_button_slots(novo_keypad, button_count)
+                db.session.flush()
+
+                buttons_key = 'ButtonsLeft' if 'ButtonsLeft' in device_data else 'ButtonsRight'
+                for i, button_data in enumerate(device_data.get(buttons_key, [])):
+                    if i < len(novo_keypad.buttons):
+                        button = novo_keypad.buttons[i]
+                        button.engraver_text = button_data.get('ButtonText', '')
+                        button.is_rocker = bool(button_data.get('isRKR', 0))
+
+                        arrow_map = {1: 'up-down', 2: 'left-right', 3: 'previous-next'}
+                        button.rocker_style = arrow_map.get(button_data.get('ArrowID'))
+
+                        # IconID ainda precisa ser mapeado
+                        # button.icon = map_icon(button_data.get('IconID'))
+
+        db.session.commit()
+
+        # Define o projeto recém-criado como o projeto atual na sessão
+        session["projeto_atual_id"] = novo_projeto.id
+        session["projeto_atual_nome"] = novo_projeto.nome
+
+        return jsonify({"ok": True, "message": f"Projeto '{novo_nome}' importado com sucesso do planner!", "projeto_id": novo_projeto.id})
+
+    except IntegrityError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Erro de integridade na importação do planner: {e}")
+        return jsonify({"ok": False, "error": "Erro de integridade nos dados. Verifique se há nomes duplicados."}), 409
+    except SemHsnetLivre:
+        db.session.rollback()
+        return jsonify({"ok": False, "error": "sem HSNET livre"}), 409
+    except Exception as e:
+        db.session.rollback()
+        import traceback
+        current_app.logger.error(f"Erro inesperado na importação do planner: {e}\n{traceback.format_exc()}")
+        return jsonify({"ok": False, "error": f"Ocorreu um erro inesperado: {e}"}), 500
+
+
+@login_required
+@rastrear_job("import_json")
+def importar_projeto():
+    if 'file' not in request.files:
+        return jsonify({"ok": False, "error": "Nenhum arquivo enviado."}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({"ok": False, "error": "Nenhum arquivo selecionado."}), 400
+
+    if not file or not file.filename.endswith('.json'):
+        return jsonify({"ok": False, "error": "Arquivo inválido. Apenas arquivos .json são permitidos."}), 400
+
+    try:
+        data = json_backend.loads(file.read())
+    except json.JSONDecodeError:
+        return jsonify({"ok": False, "error": "Arquivo JSON mal formatado."}), 400
+
+    if 'projeto' not in data or 'areas' not in data:
+        return jsonify({"ok": False, "error": "Estrutura do JSON inválida. Faltam chaves essenciais."}), 400
+
+    # ID Mappings
+    id_map = {
+        'areas': {}, 'ambientes': {}, 'quadros_eletricos': {},
+        'circuitos': {}, 'modulos': {}, 'keypads': {}, 'cenas': {}, 'acoes': {}
+    }
+
+    try:
+        # Iniciar transação
+        with db.session.begin_nested():
+            # 1. Criar Projeto
+            original_nome = data['projeto']['nome']
+            novo_nome = original_nome
+            count = 1
+            while Projeto.query.filter_by(nome=novo_nome, user_id=current_user.id).first():
+                novo_nome = f"{original_nome} (cópia {count})"
+                count += 1
+
+            def parse_iso_date(date_string):
+                if not date_string:
+                    return None
+                try:
+                    # Handle both Z and +00:00 timezones
+                    if date_string.endswith('Z'):
+                        return datetime.fromisoformat(date_string[:-1] + '+00:00')
+                    return datetime.fromisoformat(date_string)
+                except (ValueError, TypeError):
+                    return None
+
+            def remap_numeric_guid(value, mapping):
+                if value is None:
+                    return None
+                value_str = str(value).strip()
+                try:
+                    original_id = int(value_str)
+                except (ValueError, TypeError):
+                    return value_str
+                mapped_id = mapping.get(original_id)
+                return str(mapped_id) if mapped_id is not None else value_str
+
+            projeto_data = data['projeto']
+            novo_projeto = Projeto(
+                nome=novo_nome,
+                status=projeto_data.get('status', 'ATIVO'),
+                user_id=current_user.id,
+                data_criacao=parse_iso_date(projeto_data.get('data_criacao')) or datetime.utcnow(),
+                data_ativo=parse_iso_date(projeto_data.get('data_ativo')),
+                data_inativo=parse_iso_date(projeto_data.get('data_inativo')),
+                data_concluido=parse_iso_date(projeto_data.get('data_concluido')),
+            )
+            db.session.add(novo_projeto)
+            db.session.flush()
+
+            # 2. Criar Áreas
+            for area_data in data.get('areas', []):
+                nova_area = Area(nome=area_data['nome'], projeto_id=novo_projeto.id)
+                db.session.add(nova_area)
+                db.session.flush()
+                id_map['areas'][area_data['id']] = nova_area.id
+
+            # 3. Criar Ambientes
+            for ambiente_data in data.get('ambientes', []):
+                nova_area_id = id_map['areas'].get(ambiente_data['area_id'])
+                if not nova_area_id: continue
+                novo_ambiente = Ambiente(nome=ambiente_data['nome'], area_id=nova_area_id)
+                db.session.add(novo_ambiente)
+                db.session.flush()
+                id_map['ambientes'][ambiente_data['id']] = novo_ambiente.id
+
+            # 4. Criar Quadros Elétricos
+            for quadro_data in data.get('quadros_eletricos', []):
+                novo_ambiente_id = id_map['ambientes'].get(quadro_data['ambiente_id'])
+                if not novo_ambiente_id: continue
+                novo_quadro = QuadroEletrico(
+                    nome=quadro_data['nome'],
+                    notes=quadro_data.get('notes'),
+                    ambiente_id=novo_ambiente_id,
+                    projeto_id=novo_projeto.id
+                )
+                db.session.add(novo_quadro)
+                db.session.flush()
+                id_map['quadros_eletricos'][quadro_data['id']] = novo_quadro.id
+
+            # 5. Criar Módulos
+            for modulo_data in data.get('modulos', []):
+                novo_quadro_id = id_map['quadros_eletricos'].get(modulo_data.get('quadro_eletrico_id'))
+                novo_modulo = Modulo(
+                    nome=modulo_data['nome'],
+                    tipo=modulo_data['tipo'],
+                    quantidade_canais=modulo_data['quantidade_canais'],
+                    hsnet=modulo_data.get('hsnet'),
+                    dev_id=modulo_data.get('dev_id'),
+                    is_controller=modulo_data.get('is_controller', False),
+                    is_logic_server=modulo_data.get('is_logic_server', False),
+                    ip_address=modulo_data.get('ip_address'),
+                    quadro_eletrico_id=novo_quadro_id,
+                    projeto_id=novo_projeto.id
+                )
+                db.session.add(novo_modulo)
+                db.session.flush()
+                id_map['modulos'][modulo_data['id']] = novo_modulo.id
+
+            # 6. Criar Circuitos
+            for circuito_data in data.get('circuitos', []):
+                novo_ambiente_id = id_map['ambientes'].get(circuito_data['ambiente_id'])
+                if not novo_ambiente_id: continue
+                novo_circuito = Circuito(
+                    identificador=circuito_data['identificador'],
+                    nome=circuito_data['nome'],
+                    tipo=circuito_data['tipo'],
+                    dimerizavel=circuito_data.get('dimerizavel', False),
+                    potencia=circuito_data.get('potencia', 0.0),
+                    sak=circuito_data.get('sak'),
+                    quantidade_saks=circuito_data.get('quantidade_saks', 1),
+                    ambiente_id=novo_ambiente_id
+                )
+                db.session.add(novo_circuito)
+                db.session.flush()
+                id_map['circuitos'][circuito_data['id']] = novo_circuito.id
+            
+            # 7. Criar Vinculações
+            for vinc_data in data.get('vinculacoes', []):
+                novo_circuito_id = id_map['circuitos'].get(vinc_data['circuito_id'])
+                novo_modulo_id = id_map['modulos'].get(vinc_data['modulo_id'])
+                if not novo_circuito_id or not novo_modulo_id: continue
+                nova_vinc = Vinculacao(
+                    circuito_id=novo_circuito_id,
+                    modulo_id=novo_modulo_id,
+                    canal=vinc_data['canal']
+                )
+                db.session.add(nova_vinc)
+
+            # 8. Criar Keypads e Botões
+            for keypad_data in data.get('keypads', []):
+                novo_ambiente_id = id_map['ambientes'].get(keypad_data['ambiente_id'])
+                if not novo_ambiente_id: continue
+                created_at = parse_iso_date(keypad_data.get('created_at'))
+                updated_at = parse_iso_date(keypad_data.get('updated_at'))
+                novo_keypad = Keypad(
+                    nome=keypad_data['nome'],
+                    modelo=keypad_data.get('modelo', 'RQR-K'),
+                    color=keypad_data.get('color', 'WHITE'),
+                    button_color=keypad_data.get('button_color', 'WHITE'),
+                    button_count=keypad_data.get('button_count', 4),
+                    hsnet=keypad_data['hsnet'],
+                    dev_id=keypad_data.get('dev_id'),
+                    notes=keypad_data.get('notes'),
+                    ambiente_id=novo_ambiente_id,
+                    projeto_id=novo_projeto.id
+                )
+                if created_at:
+                    novo_keypad.created_at = created_at
+                if updated_at:
+                    novo_keypad.updated_at = updated_at
+                db.session.add(novo_keypad)
+                db.session.flush()
+                id_map['keypads'][keypad_data['id']] = novo_keypad.id
+
+            for btn_data in data.get('keypad_buttons', []):
+                novo_keypad_id = id_map['keypads'].get(btn_data['keypad_id'])
+                novo_circuito_id = id_map['circuitos'].get(btn_data['circuito_id'])
+                # Cenas ainda não foram mapeadas, faremos isso depois
+                if not novo_keypad_id: continue
+                created_at = parse_iso_date(btn_data.get('created_at'))
+                updated_at = parse_iso_date(btn_data.get('updated_at'))
+                is_rocker_value = btn_data.get('is_rocker', False)
+                if isinstance(is_rocker_value, str):
+                    is_rocker = is_rocker_value.lower() in ("true", "1", "yes", "y")
+                else:
+                    is_rocker = bool(is_rocker_value)
+                original_target_object = btn_data.get('target_object_guid')
+                mapped_target_object = remap_numeric_guid(original_target_object, id_map['circuitos'])
+                if mapped_target_object is None:
+                    mapped_target_object = original_target_object or "00000000-0000-0000-0000-000000000000"
+                novo_btn = KeypadButton(
+                    keypad_id=novo_keypad_id,
+                    ordem=btn_data['ordem'],
+                    guid=btn_data.get('guid', str(uuid.uuid4())),
+                    engraver_text=btn_data.get('engraver_text'),
+                    icon=btn_data.get('icon'),
+                    rocker_style=btn_data.get('rocker_style'),
+                    is_rocker=is_rocker,
+                    circuito_id=novo_circuito_id,
+                    # cena_id será atualizado depois
+                    modo=btn_data.get('modo', 3),
+                    command_on=btn_data.get('command_on', 0),
+                    command_off=btn_data.get('command_off', 0),
+                    can_hold=btn_data.get('can_hold', False),
+                    modo_double_press=btn_data.get('modo_double_press', 3),
+                    command_double_press=btn_data.get('command_double_press', 0),
+                    target_object_guid=mapped_target_object,
+                    notes=btn_data.get('notes')
+                )
+                if created_at:
+                    novo_btn.created_at = created_at
+                if updated_at:
+                    novo_btn.updated_at = updated_at
+                db.session.add(novo_btn)
+            
+            # 9. Criar Cenas, Ações e CustomAcoes
+            for cena_data in data.get('cenas', []):
+                novo_ambiente_id = id_map['ambientes'].get(cena_data['ambiente_id'])
+                if not novo_ambiente_id: continue
+                nova_cena = Cena(
+                    guid=cena_data.get('guid', str(uuid.uuid4())),
+                    nome=cena_data['nome'],
+                    scene_movers=cena_data.get('scene_movers', False),
+                    ambiente_id=novo_ambiente_id
+                )
+                db.session.add(nova_cena)
+                db.session.flush()
+                id_map['cenas'][cena_data['id']] = nova_cena.id
+
+            for acao_data in data.get('acoes', []):
+                nova_cena_id = id_map['cenas'].get(acao_data['cena_id'])
+                if not nova_cena_id: continue
+                action_type = acao_data.get('action_type', 0)
+                old_target = acao_data.get('target_guid')
+                if action_type == 0:
+                    new_target = remap_numeric_guid(old_target, id_map['circuitos'])
+                elif action_type == 7:
+                    new_target = remap_numeric_guid(old_target, id_map['ambientes'])
+                else:
+                    new_target = old_target
+                nova_acao = Acao(
+                    cena_id=nova_cena_id,
+                    level=acao_data.get('level', 100),
+                    action_type=acao_data.get('action_type', 0),
+                    target_guid=new_target
+                )
+                db.session.add(nova_acao)
+                db.session.flush()
+                id_map['acoes'][acao_data['id']] = nova_acao.id
+
+            for custom_acao_data in data.get('custom_acoes', []):
+                nova_acao_id = id_map['acoes'].get(custom_acao_data['acao_id'])
+                if not nova_acao_id: continue
+                custom_target = remap_numeric_guid(custom_acao_data.get('target_guid'), id_map['circuitos'])
+                nova_custom_acao = CustomAcao(
+                    acao_id=nova_acao_id,
+                    target_guid=custom_target,
+                    enable=custom_acao_data.get('enable', True),
+                    level=custom_acao_data.get('level', 50)
+                )
+                db.session.add(nova_custom_acao)
+
+            # 10. Pós-processamento para atualizar referências
+            db.session.flush()
+
+            # Atualizar parent_controller_id nos módulos
+            for modulo_data in data.get('modulos', []):
+                if modulo_data.get('parent_controller_id'):
+                    novo_modulo_id = id_map['modulos'].get(modulo_data['id'])
+                    novo_parent_id = id_map['modulos'].get(modulo_data['parent_controller_id'])
+                    if novo_modulo_id and novo_parent_id:
+                        module_to_update = db.session.get(Modulo, novo_modulo_id)
+                        if module_to_update:
+                            module_to_update.parent_controller_id = novo_parent_id
+            # Atualizar KeypadButton.cena_id
+            for btn_data in data.get('keypad_buttons', []):
+                if btn_data.get('cena_id'):
+                    novo_keypad_id = id_map['keypads'].get(btn_data['keypad_id'])
+                    nova_cena_id = id_map['cenas'].get(btn_data['cena_id'])
+                    if novo_keypad_id and nova_cena_id:
+                        # Encontrar o botão correspondente no banco de dados e atualizá-lo
+                        btn_to_update = KeypadButton.query.filter_by(
+                            keypad_id=novo_keypad_id,
+                            ordem=btn_data['ordem']
+                        ).first()
+                        if btn_to_update:
+                            btn_to_update.cena_id = nova_cena_id
+
+            # Atualizar GUIDs em Acao e CustomAcao
+            # Esta parte é complexa se os GUIDs devem ser remapeados.
+            # Por simplicidade, assumimos que os GUIDs de circuito/ambiente são os IDs antigos.
+            # Uma implementação mais robusta remapearia os GUIDs.
+
+        db.session.commit()
+        return jsonify({"ok": True, "message": f"Projeto '{novo_nome}' importado com sucesso!", "projeto_id": novo_projeto.id})
+
+    except IntegrityError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Erro de integridade na importação: {e}")
+        return jsonify({"ok": False, "error": "Erro de integridade nos dados. Verifique se há nomes duplicados."}), 409
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Erro inesperado na importação: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"ok": False, "error": f"Ocorreu um erro inesperado: {e}"}), 500
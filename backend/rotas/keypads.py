@@ -0,0 +1,596 @@
+# rotas/keypads.py
+"""
+Keypads RQR-K e seus botões.
+"""
+import uuid
+
+from flask import Blueprint, request, jsonify, session
+from flask_login import login_required
+from sqlalchemy.exc import IntegrityError
+
+from database import db, Ambiente, Circuito, Keypad, KeypadButton, Cena
+from alocadores import FAIXAS_HSNET, SemHsnetLivre, alocar_hsnet, enderecos_hsnet, hsnet_em_uso
+from serializadores import keypads_serializados
+
+bp = Blueprint("keypads", __name__)
+
+
+# Keypad metadata (RQR-K)
+KEYPAD_ALLOWED_COLORS = {
+    "WHITE",
+    "BRASS",
+    "BRUSHED BLACK",
+    "BLACK",
+    "BRONZE",
+    "NICKEL",
+    "SILVER",
+    "TITANIUM",
+}
+
+KEYPAD_ALLOWED_BUTTON_COLORS = {"WHITE", "BLACK"}
+
+KEYPAD_ALLOWED_BUTTON_COUNTS = {1, 2, 4}
+
+LAYOUT_TO_COUNT = {
+    "1": 1, "ONE": 1,
+    "2": 2, "TWO": 2,
+    "4": 4, "FOUR": 4,
+}
+
+
+ZERO_GUID = "00000000-0000-0000-0000-000000000000"
+
+
+def serialize_keypad_button(button):
+    circuito = button.circuito
+    cena = button.cena
+    return {
+        "id": button.id,
+        "ordem": button.ordem,
+        "guid": button.guid,
+        "engraver_text": button.engraver_text,
+        "icon": button.icon,
+        "modo": button.modo,
+        "command_on": button.command_on,
+        "command_off": button.command_off,
+        "can_hold": button.can_hold,
+        "is_rocker": button.is_rocker,
+        "rocker_style": button.rocker_style,
+        "modo_double_press": button.modo_double_press,
+        "command_double_press": button.command_double_press,
+        "target_object_guid": button.target_object_guid,
+        "circuito_id": circuito.id if circuito else None,
+        "circuito": {
+            "id": circuito.id,
+            "identificador": circuito.identificador,
+            "nome": circuito.nome,
+            "tipo": circuito.tipo,
+        } if circuito else None,
+        "cena_id": cena.id if cena else None,
+        "cena": {
+            "id": cena.id,
+            "nome": cena.nome,
+        } if cena else None,
+    }
+
+
+def serialize_keypad(keypad):
+    ambiente = keypad.ambiente
+    area = ambiente.area if ambiente else None
+    return {
+        "id": keypad.id,
+        "nome": keypad.nome,
+        "modelo": keypad.modelo,
+        "color": keypad.color,
+        "button_color": keypad.button_color,
+        "button_count": keypad.button_count,
+        "hsnet": keypad.hsnet,
+        "dev_id": keypad.dev_id,
+        "notes": keypad.notes,
+        "ambiente": {
+            "id": ambiente.id,
+            "nome": ambiente.nome,
+            "area": {
+                "id": area.id,
+                "nome": area.nome,
+            } if area else None,
+        } if ambiente else None,
+        "buttons": [serialize_keypad_button(btn) for btn in sorted(keypad.buttons, key=lambda b: b.ordem)],
+    }
+
+
+def ensure_keypad_button_slots(keypad, count: int):
+    """Garante que keypad.buttons tenha exatamente `count` itens (1..count)."""
+    # cria os que faltam
+    existing_by_ordem = {b.ordem: b for b in keypad.buttons}
+    for i in range(1, count + 1):
+        if i not in existing_by_ordem:
+            btn = KeypadButton(
+                ordem=i,
+                guid=str(uuid.uuid4()),
+                modo=3,  # default neutro
+                command_on=0,
+                command_off=0,
+                modo_double_press=3,
+                command_double_press=0,
+                can_hold=False,
+                circuito=None,
+                circuito_id=None,
+                target_object_guid=ZERO_GUID,
+            )
+            keypad.buttons.append(btn)
+
+    # remove sobras
+    for b in sorted(keypad.buttons, key=lambda x: x.ordem, reverse=True):
+        if b.ordem > count:
+            db.session.delete(b)
+
+    keypad.button_count = count
+
+
+# -------------------- Keypads (RQR-K) --------------------
+
+@bp.get("/api/keypads/meta")
+@login_required
+def api_keypads_meta():
+    return jsonify({
+        "ok": True,
+        "colors": sorted(KEYPAD_ALLOWED_COLORS),
+        "button_colors": sorted(KEYPAD_ALLOWED_BUTTON_COLORS),
+        "button_counts": sorted(KEYPAD_ALLOWED_BUTTON_COUNTS),
+        "model": "RQR-K",
+    })
+
+
+@bp.get("/api/keypads/next-hsnet")
+@login_required
+def api_keypads_next_hsnet():
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": False, "error": "Projeto não selecionado."}), 400
+
+    classe = request.args.get("classe", "keypad")
+    if classe not in FAIXAS_HSNET:
+        return jsonify({"ok": False, "error": "classe inválida."}), 400
+    quantidade = request.args.get("quantidade", 1, type=int)
+    if not 1 <= quantidade <= 256:
+        return jsonify({"ok": False, "error": "quantidade inválida."}), 400
+
+    # Só sugere: nada é reservado até o create
+    try:
+        hsnets = enderecos_hsnet(projeto_id).alocar(classe, quantidade)
+    except SemHsnetLivre:
+        return jsonify({"ok": False, "error": "sem HSNET livre"}), 409
+    return jsonify({"ok": True, "hsnet": hsnets[0], "hsnets": hsnets})
+
+
+
+@bp.get("/api/keypads")
+@login_required
+def api_keypads_list():
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": True, "keypads": []})
+
+    return jsonify({"ok": True, "keypads": keypads_serializados(Keypad.projeto_id == projeto_id)})
+
+
+@bp.get("/api/keypads/<int:keypad_id>")
+@login_required
+def api_keypads_get(keypad_id):
+    projeto_id = session.get("projeto_atual_id")
+    keypad = db.get_or_404(Keypad, keypad_id)
+    if not projeto_id or keypad.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Keypad não encontrado."}), 404
+    return jsonify({"ok": True, "keypad": serialize_keypad(keypad)})
+
+
+@bp.post("/api/keypads")
+@login_required
+def api_keypads_create():
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": False, "error": "Projeto não selecionado."}), 400
+
+    data = request.get_json(silent=True) or request.form or {}
+
+    nome = (data.get("nome") or "").strip()
+    if not nome:
+        return jsonify({"ok": False, "error": "Nome do keypad é obrigatório."}), 400
+
+    # ids
+    try:
+        ambiente_id = int(data.get("ambiente_id"))
+    except (TypeError, ValueError):
+        return jsonify({"ok": False, "error": "ambiente_id inválido."}), 400
+
+    hsnet = None
+    if data.get("hsnet") not in (None, ""):
+        try:
+            hsnet = int(data.get("hsnet"))
+        except (TypeError, ValueError):
+            return jsonify({"ok": False, "error": "hsnet inválido."}), 400
+        if hsnet <= 0:
+            return jsonify({"ok": False, "error": "hsnet deve ser positivo."}), 400
+
+    # aceita PT ou EN
+    color = (data.get("color") or data.get("cor") or "WHITE").strip().upper()
+    if color not in KEYPAD_ALLOWED_COLORS:
+        return jsonify({"ok": False, "error": "Cor inválida para o keypad."}), 400
+
+    button_color = (data.get("button_color") or data.get("cor_teclas") or "WHITE").strip().upper()
+    if button_color not in KEYPAD_ALLOWED_BUTTON_COLORS:
+        return jsonify({"ok": False, "error": "Cor das teclas inválida."}), 400
+
+    # button_count pode vir direto ou podemos derivar de layout
+    button_count = None
+    if "button_count" in data and data.get("button_count") not in (None, ""):
+        try:
+            button_count = int(data.get("button_count"))
+        except (TypeError, ValueError):
+            return jsonify({"ok": False, "error": "button_count inválido."}), 400
+    else:
+        layout_raw = (data.get("layout") or "").strip().upper()
+        if layout_raw:
+            button_count = LAYOUT_TO_COUNT.get(layout_raw)
+            if button_count is None:
+                return jsonify({"ok": False, "error": "layout inválido."}), 400
+        else:
+            button_count = 4  # default
+
+    if button_count not in KEYPAD_ALLOWED_BUTTON_COUNTS:
+        return jsonify({"ok": False, "error": "Quantidade de teclas não suportada."}), 400
+
+    modelo = (data.get("modelo") or "RQR-K").strip().upper()
+    if modelo != "RQR-K":
+        return jsonify({"ok": False, "error": "Modelo de keypad não suportado."}), 400
+
+    dev_id_raw = data.get("dev_id")
+    if dev_id_raw not in (None, ""):
+        try:
+            dev_id = int(dev_id_raw)
+        except (TypeError, ValueError):
+            return jsonify({"ok": False, "error": "dev_id inválido."}), 400
+        if dev_id <= 0:
+            return jsonify({"ok": False, "error": "dev_id deve ser positivo."}), 400
+    else:
+        dev_id = None
+
+    notes = (data.get("notes") or "").strip() or None
+
+    ambiente = db.get_or_404(Ambiente, ambiente_id)
+    if ambiente.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Ambiente não pertence ao projeto selecionado."}), 400
+
+    if hsnet is None:
+        try:
+            hsnet = alocar_hsnet(projeto_id, "keypad")[0]
+        except SemHsnetLivre:
+            db.session.rollback()
+            return jsonify({"ok": False, "error": "sem HSNET livre"}), 409
+    elif hsnet_em_uso(projeto_id, hsnet):
+        return jsonify({"ok": False, "error": "HSNET já está em uso."}), 409
+    if dev_id is None:
+        dev_id = hsnet  # default prático
+
+    keypad = Keypad(
+        nome=nome,
+        modelo="RQR-K",
+        color=color,
+        button_color=button_color,
+        button_count=button_count,
+        hsnet=hsnet,
+        dev_id=dev_id,
+        ambiente_id=ambiente.id,
+        projeto_id=projeto_id,
+        notes=notes,
+    )
+    db.session.add(keypad)
+    db.session.flush()  # garante id
+
+    # >>> ESSENCIAL: cria exatamente N slots de tecla
+    ensure_keypad_button_slots(keypad, button_count)
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"ok": False, "error": "Não foi possível criar o keypad."}), 400
+
+    return jsonify({"ok": True, "keypad": serialize_keypad(keypad)})
+
+
+
+@bp.put("/api/keypads/<int:keypad_id>")
+@login_required
+def api_keypads_update(keypad_id):
+    projeto_id = session.get("projeto_atual_id")
+    keypad = db.get_or_404(Keypad, keypad_id)
+    if not projeto_id or keypad.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Keypad não encontrado no projeto."}), 404
+
+    data = request.get_json(silent=True) or {}
+
+    if "nome" in data:
+        novo_nome = (data.get("nome") or "").strip()
+        if not novo_nome:
+            return jsonify({"ok": False, "error": "Nome do keypad é obrigatório."}), 400
+        keypad.nome = novo_nome
+
+    if "color" in data:
+        color = (data.get("color") or "").strip().upper()
+        if color not in KEYPAD_ALLOWED_COLORS:
+            return jsonify({"ok": False, "error": "Cor inválida para o keypad."}), 400
+        keypad.color = color
+
+    if "button_color" in data:
+        b_color = (data.get("button_color") or "").strip().upper()
+        if b_color not in KEYPAD_ALLOWED_BUTTON_COLORS:
+            return jsonify({"ok": False, "error": "Cor das teclas inválida."}), 400
+        keypad.button_color = b_color
+
+    if "button_count" in data:
+        try:
+            new_count = int(data.get("button_count"))
+        except (TypeError, ValueError):
+            return jsonify({"ok": False, "error": "Quantidade de teclas inválida."}), 400
+        if new_count not in KEYPAD_ALLOWED_BUTTON_COUNTS:
+            return jsonify({"ok": False, "error": "Quantidade de teclas não suportada."}), 400
+        keypad.button_count = new_count
+        ensure_keypad_button_slots(keypad, new_count)
+
+    if "hsnet" in data:
+        try:
+            new_hsnet = int(data.get("hsnet"))
+        except (TypeError, ValueError):
+            return jsonify({"ok": False, "error": "hsnet inválido."}), 400
+        if new_hsnet <= 0:
+            return jsonify({"ok": False, "error": "hsnet deve ser positivo."}), 400
+        if new_hsnet != keypad.hsnet and hsnet_em_uso(projeto_id, new_hsnet, exceto_keypad_id=keypad.id):
+            return jsonify({"ok": False, "error": "HSNET já está em uso."}), 409
+        keypad.hsnet = new_hsnet
+
+    if "dev_id" in data:
+        dev_val = data.get("dev_id")
+        if dev_val in (None, ""):
+            keypad.dev_id = None
+        else:
+            try:
+                dev_int = int(dev_val)
+            except (TypeError, ValueError):
+                return jsonify({"ok": False, "error": "dev_id inválido."}), 400
+            if dev_int <= 0:
+                return jsonify({"ok": False, "error": "dev_id deve ser positivo."}), 400
+            keypad.dev_id = dev_int
+
+    if "notes" in data:
+        txt = (data.get("notes") or "").strip()
+        keypad.notes = txt or None
+
+    if "modelo" in data:
+        modelo = (data.get("modelo") or "").strip().upper()
+        if modelo != "RQR-K":
+            return jsonify({"ok": False, "error": "Modelo de keypad não suportado."}), 400
+        keypad.modelo = "RQR-K"
+
+    if "ambiente_id" in data:
+        try:
+            novo_ambiente_id = int(data.get("ambiente_id"))
+        except (TypeError, ValueError):
+            return jsonify({"ok": False, "error": "ambiente_id inválido."}), 400
+        novo_ambiente = db.get_or_404(Ambiente, novo_ambiente_id)
+        if novo_ambiente.projeto_id != projeto_id:
+            return jsonify({"ok": False, "error": "Ambiente não pertence ao projeto selecionado."}), 400
+        keypad.ambiente_id = novo_ambiente.id
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"ok": False, "error": "Não foi possível atualizar o keypad."}), 400
+
+    return jsonify({"ok": True, "keypad": serialize_keypad(keypad)})
+
+
+@bp.delete("/api/keypads/<int:keypad_id>")
+@login_required
+def api_keypads_delete(keypad_id):
+    projeto_id = session.get("projeto_atual_id")
+    keypad = db.get_or_404(Keypad, keypad_id)
+    if not projeto_id or keypad.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Keypad não encontrado no projeto."}), 404
+
+    db.session.delete(keypad)
+    db.session.commit()
+    return jsonify({"ok": True})
+
+@bp.route('/api/keypads/<int:keypad_id>/buttons', methods=['GET'])
+@login_required
+def get_keypad_buttons(keypad_id):
+    keypad = Keypad.query.get(keypad_id)
+    if not keypad:
+        return jsonify({'error': 'Keypad not found'}), 404
+        
+    if keypad.projeto_id != session.get('projeto_atual_id'):
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    # Define o número de botões com base no layout
+    button_limit = 4  # Padrão para "FOUR"
+    if keypad.layout == "ONE":
+        button_limit = 1
+    elif keypad.layout == "TWO":
+        button_limit = 2
+
+    # Busca os botões e limita a quantidade com base no layout
+    buttons = keypad.buttons.order_by(KeypadButton.ordem).limit(button_limit).all()
+
+    # Formata os dados para o frontend
+    buttons_data = []
+    for button in buttons:
+        buttons_data.append({
+            'id': button.id,
+            'circuito_id': button.circuito_id,
+            'modo': button.modo,
+            'command_on': button.command_on,
+            'command_off': button.command_off,
+            'can_hold': button.can_hold,
+            'modo_double_press': button.modo_double_press,
+            'command_double_press': button.command_double_press,
+            'ordem': button.ordem
+        })
+    
+    return jsonify(buttons_data)
+
+
+def aplicar_dados_botao(button, data, projeto_id, buscar_circuito, buscar_cena):
+    """
+    Aplica em `button` os campos enviados em `data` (rota da tecla e /api/bulk).
+
+    buscar_circuito/buscar_cena recebem um id e devolvem o objeto ou None.
+    Retorna None em caso de sucesso ou (mensagem, status HTTP) no primeiro erro.
+    """
+    # Lidar com vinculação de cena
+    if "cena_id" in data and data.get("cena_id") not in (None, "", 0, "0"):
+        try:
+            cena_id = int(data["cena_id"])
+            cena = buscar_cena(cena_id)
+            if cena is None:
+                return "Cena não encontrada.", 404
+            if cena.projeto_id != projeto_id:
+                return "Cena não pertence ao projeto.", 400
+            
+            button.cena = cena
+            button.circuito = None  # Desvincular circuito
+            button.modo = 1  # Modo "Activate Scene"
+            button.command_on = 1 # Comando para ativar
+            button.command_off = 0
+
+        except (TypeError, ValueError):
+            return "cena_id inválido.", 400
+
+    # Lidar com vinculação de circuito (apenas se cena não foi vinculada)
+    elif "circuito_id" in data:
+        raw_circuit = data.get("circuito_id")
+        if raw_circuit in (None, "", 0, "0"):
+            button.circuito = None
+            button.cena = None # Desvincular cena
+            button.target_object_guid = ZERO_GUID
+            button.modo = 3
+            button.command_on = 0
+            button.command_off = 0
+        else:
+            try:
+                circuito_id = int(raw_circuit)
+            except (TypeError, ValueError):
+                return "circuito_id inválido.", 400
+            
+            circuito = buscar_circuito(circuito_id)
+            if circuito is None:
+                return "Circuito não encontrado.", 404
+            if circuito.projeto_id != projeto_id:
+                return "Circuito não pertence ao projeto.", 400
+
+            button.circuito = circuito
+            button.cena = None # Desvincular cena
+            button.target_object_guid = ZERO_GUID
+            button.modo = 2  # Send Command
+
+            # Definir comandos padrão com base no tipo de circuito
+            if circuito.tipo == 'persiana':
+                button.command_on = 3  # Sobe
+                button.command_off = 4  # Desce
+            else:  # Padrão para 'luz', 'hvac', etc.
+                button.command_on = 1  # Ligar/Alternar
+                button.command_off = 0  # Desligar
+
+    if "modo" in data:
+        try:
+            button.modo = int(data.get("modo"))
+        except (TypeError, ValueError):
+            return "Valor de modo inválido.", 400
+
+    if "command_on" in data:
+        try:
+            button.command_on = int(data.get("command_on"))
+        except (TypeError, ValueError):
+            return "command_on inválido.", 400
+
+    if "command_off" in data:
+        try:
+            button.command_off = int(data.get("command_off"))
+        except (TypeError, ValueError):
+            return "command_off inválido.", 400
+
+    if "can_hold" in data:
+        button.can_hold = bool(data.get("can_hold"))
+
+    if "is_rocker" in data:
+        button.is_rocker = bool(data.get("is_rocker"))
+
+    if "rocker_style" in data:
+        style = (data.get("rocker_style") or "up-down").strip()
+        if style not in ('up-down', 'left-right', 'previous-next'):
+            return "Estilo de rocker inválido.", 400
+        button.rocker_style = style
+
+    if "modo_double_press" in data:
+        try:
+            button.modo_double_press = int(data.get("modo_double_press"))
+        except (TypeError, ValueError):
+            return "modo_double_press inválido.", 400
+
+    if "command_double_press" in data:
+        try:
+            button.command_double_press = int(data.get("command_double_press"))
+        except (TypeError, ValueError):
+            return "command_double_press inválido.", 400
+
+    if "target_object_guid" in data:
+        guid_val = (data.get("target_object_guid") or ZERO_GUID).strip()
+        button.target_object_guid = guid_val or ZERO_GUID
+
+    if "notes" in data:
+        txt = (data.get("notes") or "").strip()
+        button.notes = txt or None
+
+    if "engraver_text" in data:
+        text = (data.get("engraver_text") or "").strip()
+        if len(text) > 7:
+            return "Texto do botão pode ter no máximo 7 caracteres.", 400
+        button.engraver_text = text or None
+        if text:
+            button.icon = None
+
+    if "icon" in data:
+        icon = (data.get("icon") or "").strip()
+        button.icon = icon or None
+        if icon:
+            button.engraver_text = None
+
+    return None
+
+
+@bp.put("/api/keypads/<int:keypad_id>/buttons/<int:ordem>")
+@login_required
+def api_keypad_button_update(keypad_id, ordem):
+    projeto_id = session.get("projeto_atual_id")
+    keypad = db.get_or_404(Keypad, keypad_id)
+    if not projeto_id or keypad.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Keypad não encontrado no projeto."}), 404
+
+    if ordem <= 0 or ordem > keypad.button_count:
+        return jsonify({"ok": False, "error": "Ordem de tecla inválida."}), 400
+
+    ensure_keypad_button_slots(keypad, keypad.button_count)
+    button = next((btn for btn in keypad.buttons if btn.ordem == ordem), None)
+    if button is None:
+        return jsonify({"ok": False, "error": "Tecla não encontrada."}), 404
+
+    data = request.get_json(silent=True) or {}
+    erro = aplicar_dados_botao(button, data, projeto_id,
+                               lambda i: db.session.get(Circuito, i), lambda i: db.session.get(Cena, i))
+    if erro:
+        return jsonify({"ok": False, "error": erro[0]}), erro[1]
+
+    db.session.commit()
+    return jsonify({"ok": True, "keypad": serialize_keypad(keypad)})
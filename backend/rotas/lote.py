@@ -0,0 +1,299 @@
+# rotas/lote.py
+"""
+/api/bulk: alterações de circuitos, vinculações e botões de keypad numa transação.
+"""
+from flask import Blueprint, request, jsonify, session
+from flask_login import login_required
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import IntegrityError
+
+from database import db, Ambiente, Circuito, Modulo, Vinculacao, Keypad, Cena
+from ajustes_banco import iniciar_escrita
+from alocadores import faixas_sak, largura_sak
+from rotas.modulos import MODULO_INFO
+from rotas.keypads import ensure_keypad_button_slots, aplicar_dados_botao
+
+bp = Blueprint("lote", __name__)
+
+
+# -------------------- Operações em lote --------------------
+
+BULK_MAX_OPERACOES = 1000
+
+
+class ErroLote(Exception):
+    """Falha de validação de um item de /api/bulk (mensagem, status HTTP)."""
+
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
+
+
+def _carregar_estado_lote(projeto_id):
+    """Estado do projeto usado para validar o lote em memória (uma consulta por tabela)."""
+    circuitos = {c.id: c for c in Circuito.query.filter(Circuito.projeto_id == projeto_id)}
+    modulos = {m.id: m for m in Modulo.query.filter(Modulo.projeto_id == projeto_id)}
+    vinculacoes = {v.id: v for v in Vinculacao.query.filter(Vinculacao.modulo_id.in_(list(modulos)))}
+    keypads = {k.id: k for k in Keypad.query.options(joinedload(Keypad.buttons))
+               .filter(Keypad.projeto_id == projeto_id)}
+    cenas = {c.id: c for c in Cena.query.filter(Cena.projeto_id == projeto_id)}
+    ambientes = set(db.session.execute(select(Ambiente.id).where(Ambiente.projeto_id == projeto_id)).scalars())
+    return {
+        "projeto_id": projeto_id,
+        "ambientes": ambientes,
+        "circuitos": circuitos,
+        "modulos": modulos,
+        "vinculacoes": vinculacoes,
+        "keypads": keypads,
+        "cenas": cenas,
+        "identificadores": {c.identificador for c in circuitos.values()},
+        "faixas_sak": faixas_sak(projeto_id),
+        "canais": {(v.modulo_id, v.canal) for v in vinculacoes.values()},
+        "vinculados": {v.circuito_id for v in vinculacoes.values()},
+    }
+
+
+def _id_do_item(item, estado, chave, mensagem):
+    try:
+        obj = estado[chave].get(int(item.get("id")))
+    except (TypeError, ValueError):
+        raise ErroLote("id inválido.")
+    if obj is None:
+        raise ErroLote(mensagem, 404)
+    return obj
+
+
+def _lote_circuito(op, item, estado):
+    data = item.get("data") or {}
+    projeto_id = estado["projeto_id"]
+
+    if op == "create":
+        identificador = (data.get("identificador") or "").strip()
+        nome = (data.get("nome") or "").strip()
+        tipo = (data.get("tipo") or "").strip()
+        ambiente_id = data.get("ambiente_id")
+        dimerizavel = data.get("dimerizavel", False)
+        try:
+            potencia = float(data.get("potencia", 0.0))
+            ambiente_id = int(ambiente_id) if ambiente_id else None
+        except (TypeError, ValueError):
+            raise ErroLote("Valor numérico inválido.")
+        if not identificador or not nome or not tipo or not ambiente_id:
+            raise ErroLote("Campos obrigatórios ausentes.")
+        if tipo != "luz" and dimerizavel:
+            raise ErroLote("Campo 'dimerizavel' só é permitido para circuitos do tipo 'luz'.")
+        if potencia < 0:
+            raise ErroLote("A potência não pode ser negativa.")
+        if ambiente_id not in estado["ambientes"]:
+            raise ErroLote("Ambiente não pertence ao projeto atual.")
+        if identificador in estado["identificadores"]:
+            raise ErroLote("Identificador já existe neste projeto.", 409)
+
+        quantidade_saks = largura_sak(tipo)
+        sak = estado["faixas_sak"].alocar(quantidade_saks) if quantidade_saks else None
+        c = Circuito(
+            identificador=identificador,
+            nome=nome,
+            tipo=tipo,
+            dimerizavel=dimerizavel if tipo == "luz" else False,
+            potencia=potencia,
+            ambiente_id=ambiente_id,
+            projeto_id=projeto_id,
+            sak=sak,
+            quantidade_saks=quantidade_saks,
+        )
+        db.session.add(c)
+        db.session.flush()
+        estado["circuitos"][c.id] = c
+        estado["identificadores"].add(identificador)
+        return {"id": c.id, "sak": c.sak, "quantidade_saks": c.quantidade_saks}
+
+    c = _id_do_item(item, estado, "circuitos", "Circuito não encontrado no projeto atual.")
+
+    if op == "delete":
+        vinc = c.vinculacao
+        db.session.delete(c)
+        db.session.flush()
+        del estado["circuitos"][c.id]
+        estado["identificadores"].discard(c.identificador)
+        if c.sak is not None:
+            estado["faixas_sak"].liberar(c.sak, c.quantidade_saks or 1)
+        if vinc is not None:
+            estado["vinculacoes"].pop(vinc.id, None)
+            estado["canais"].discard((vinc.modulo_id, vinc.canal))
+            estado["vinculados"].discard(c.id)
+        return {"id": c.id}
+
+    # update: mesmos campos e regras de api_circuitos_update
+    if "identificador" in data:
+        novo_identificador = (data.get("identificador") or "").strip()
+        if novo_identificador != c.identificador and novo_identificador in estado["identificadores"]:
+            raise ErroLote("Identificador já existe neste projeto.", 409)
+    if data.get("ambiente_id"):
+        try:
+            novo_ambiente_id = int(data["ambiente_id"])
+        except (TypeError, ValueError):
+            raise ErroLote("ambiente_id inválido.")
+        if novo_ambiente_id not in estado["ambientes"]:
+            raise ErroLote("Ambiente não pertence ao projeto atual.")
+    nova_potencia = c.potencia
+    if "potencia" in data:
+        try:
+            nova_potencia = float(data["potencia"]) if data["potencia"] is not None else None
+        except (TypeError, ValueError):
+            raise ErroLote("potencia inválida.")
+        if nova_potencia is not None and nova_potencia < 0:
+            raise ErroLote("A potência não pode ser negativa.")
+
+    if "nome" in data:
+        c.nome = (data.get("nome") or "").strip()
+    if "identificador" in data:
+        estado["identificadores"].discard(c.identificador)
+        c.identificador = novo_identificador
+        estado["identificadores"].add(novo_identificador)
+    if data.get("ambiente_id"):
+        c.ambiente_id = novo_ambiente_id
+    if "tipo" in data:
+        c.tipo = (data.get("tipo") or "").strip()
+        if c.tipo != "luz":
+            c.dimerizavel = False
+    if "dimerizavel" in data and c.tipo == "luz":
+        c.dimerizavel = bool(data.get("dimerizavel"))
+    c.potencia = nova_potencia
+    db.session.flush()
+    return {"id": c.id}
+
+
+def _lote_vinculacao(op, item, estado):
+    if op == "update":
+        raise ErroLote("Vinculações não têm update: use delete + create.")
+
+    if op == "delete":
+        v = _id_do_item(item, estado, "vinculacoes", "Vinculação não pertence ao projeto atual.")
+        db.session.delete(v)
+        db.session.flush()
+        del estado["vinculacoes"][v.id]
+        estado["canais"].discard((v.modulo_id, v.canal))
+        estado["vinculados"].discard(v.circuito_id)
+        return {"id": v.id}
+
+    data = item.get("data") or {}
+    try:
+        circuito = estado["circuitos"].get(int(data.get("circuito_id")))
+        modulo = estado["modulos"].get(int(data.get("modulo_id")))
+        canal = int(data.get("canal"))
+    except (TypeError, ValueError):
+        raise ErroLote("Parâmetros obrigatórios ausentes.")
+    # mesmas regras de api_vinculacoes_create
+    if circuito is None:
+        raise ErroLote("Circuito não pertence ao projeto atual.")
+    if modulo is None:
+        raise ErroLote("Módulo não pertence ao projeto atual.")
+    tipos_permitidos = set(MODULO_INFO.get(modulo.tipo, {}).get("tipos_permitidos", []))
+    if circuito.tipo not in tipos_permitidos:
+        raise ErroLote(f"Circuitos do tipo {circuito.tipo} não podem ser vinculados a módulos {modulo.tipo}.")
+    if canal < 1 or canal > (modulo.quantidade_canais or 0):
+        raise ErroLote("Canal inválido para este módulo.")
+    if (modulo.id, canal) in estado["canais"]:
+        raise ErroLote("Este canal já está em uso no módulo escolhido.", 409)
+    if circuito.id in estado["vinculados"]:
+        raise ErroLote("Este circuito já está vinculado a um módulo/canal.", 409)
+
+    v = Vinculacao(circuito_id=circuito.id, modulo_id=modulo.id, canal=canal)
+    db.session.add(v)
+    db.session.flush()
+    estado["vinculacoes"][v.id] = v
+    estado["canais"].add((modulo.id, canal))
+    estado["vinculados"].add(circuito.id)
+    return {"id": v.id}
+
+
+def _lote_botao(op, item, estado):
+    if op != "update":
+        raise ErroLote("Teclas de keypad só aceitam update (as teclas seguem o layout do keypad).")
+    data = item.get("data") or {}
+    keypad = _id_do_item({"id": data.get("keypad_id")}, estado, "keypads", "Keypad não encontrado no projeto.")
+    try:
+        ordem = int(data.get("ordem"))
+    except (TypeError, ValueError):
+        raise ErroLote("Ordem de tecla inválida.")
+    if ordem <= 0 or ordem > keypad.button_count:
+        raise ErroLote("Ordem de tecla inválida.")
+
+    ensure_keypad_button_slots(keypad, keypad.button_count)
+    button = next((btn for btn in keypad.buttons if btn.ordem == ordem), None)
+    if button is None:
+        raise ErroLote("Tecla não encontrada.", 404)
+    erro = aplicar_dados_botao(button, data, estado["projeto_id"],
+                               estado["circuitos"].get, estado["cenas"].get)
+    if erro:
+        raise ErroLote(*erro)
+    db.session.flush()
+    return {"id": button.id}
+
+
+BULK_ENTIDADES = {
+    "circuitos": _lote_circuito,
+    "vinculacoes": _lote_vinculacao,
+    "keypad_buttons": _lote_botao,
+}
+
+
+@bp.post("/api/bulk")
+@login_required
+def api_bulk():
+    """
+    Várias criações/alterações/exclusões de circuitos, vinculações e teclas num commit só.
+
+    Corpo: {"operations": [{"entity", "op": create|update|delete, "id"?, "data"?}],
+            "atomic": false}. As regras são as das rotas de item, checadas contra
+    o estado do projeto carregado uma vez (itens anteriores do lote contam).
+    Cada item roda num SAVEPOINT: um item inválido é desfeito sozinho, a menos
+    que atomic=true, quando qualquer erro desfaz o lote inteiro.
+    """
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": False, "error": "Projeto não selecionado."}), 400
+
+    data = request.get_json(silent=True) or {}
+    operacoes = data.get("operations")
+    if not isinstance(operacoes, list) or not operacoes:
+        return jsonify({"ok": False, "error": "operations deve ser uma lista não vazia."}), 400
+    if len(operacoes) > BULK_MAX_OPERACOES:
+        return jsonify({"ok": False, "error": f"Máximo de {BULK_MAX_OPERACOES} operações por lote."}), 413
+    atomico = bool(data.get("atomic", False))
+
+    # Transação real antes dos SAVEPOINTs de cada item (ver ajustes_banco.py)
+    iniciar_escrita(db.session)
+    estado = _carregar_estado_lote(projeto_id)
+    resultados = []
+    for indice, item in enumerate(operacoes):
+        item = item if isinstance(item, dict) else {}
+        entidade, op = item.get("entity"), item.get("op")
+        tratar = BULK_ENTIDADES.get(entidade)
+        try:
+            if tratar is None:
+                raise ErroLote(f"entity deve ser um de: {', '.join(BULK_ENTIDADES)}.")
+            if op not in ("create", "update", "delete"):
+                raise ErroLote("op deve ser create, update ou delete.")
+            with db.session.begin_nested():
+                resultado = tratar(op, item, estado)
+            resultados.append({"index": indice, "ok": True, **resultado})
+        except ErroLote as e:
+            resultados.append({"index": indice, "ok": False, "status": e.status, "error": e.mensagem})
+        except IntegrityError:
+            resultados.append({"index": indice, "ok": False, "status": 409,
+                               "error": "Conflito com dados existentes."})
+            # o savepoint já foi desfeito; objetos do item saem do estado na recarga
+            estado = _carregar_estado_lote(projeto_id)
+
+    falhas = sum(1 for r in resultados if not r["ok"])
+    if atomico and falhas:
+        db.session.rollback()
+        committed = False
+    else:
+        db.session.commit()
+        committed = True
+    return jsonify({"ok": falhas == 0, "committed": committed, "falhas": falhas, "results": resultados})
@@ -0,0 +1,337 @@
+# rotas/modulos.py
+"""
+Módulos (controladores e módulos de carga) do projeto atual.
+"""
+import re
+
+from flask import Blueprint, request, jsonify, session
+from flask_login import login_required
+from sqlalchemy import select, func
+from sqlalchemy.orm import aliased
+
+from database import db, Modulo, Vinculacao, QuadroEletrico
+from alocadores import SemHsnetLivre, alocar_hsnet, hsnet_em_uso
+
+bp = Blueprint("modulos", __name__)
+
+
+# Informações sobre os módulos
+MODULO_INFO = {
+    'RL12': {'nome_completo': 'ADP-RL12', 'canais': 12, 'tipos_permitidos': ['luz']},
+    'RL4': {'nome_completo': 'AQL-GV-RL4', 'canais': 4, 'tipos_permitidos': ['luz']},
+    'LX4': {'nome_completo': 'ADP-LX4', 'canais': 4, 'tipos_permitidos': ['persiana']},
+    'SA1': {'nome_completo': 'AQL-GV-SA1', 'canais': 1, 'tipos_permitidos': ['hvac']},
+    'DIM8': {'nome_completo': 'ADP-DIM8', 'canais': 8, 'tipos_permitidos': ['luz']},
+    # Controladores
+    'AQL-GV-M4': {'nome_completo': 'AQL-GV-M4', 'canais': 0, 'tipos_permitidos': []},
+    'ADP-M8': {'nome_completo': 'ADP-M8', 'canais': 0, 'tipos_permitidos': []},
+    'ADP-M16': {'nome_completo': 'ADP-M16', 'canais': 0, 'tipos_permitidos': []},
+}
+
+
+COMPATIBILIDADE_MODULOS = {
+    "luz": ["RL12", "DIM8" "RL4"],
+    "persiana": ["LX4"],
+    "hvac": ["SA1"]
+}
+
+
+def is_valid_ip(ip):
+    if not ip:
+        return True  # Permite IP vazio
+    # Regex para validar endereço IPv4
+    pattern = re.compile(r"^((25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$")
+    return pattern.match(ip) is not None
+
+
+@bp.get("/api/modulos")
+@login_required
+def api_modulos_list():
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": True, "modulos": []})
+
+    # contagem de vinculações por módulo direto no SQL
+    vinc_counts = (
+        select(Vinculacao.modulo_id, func.count(Vinculacao.id).label("vinc_count"))
+        .join(Modulo, Vinculacao.modulo_id == Modulo.id)
+        .where(Modulo.projeto_id == projeto_id)
+        .group_by(Vinculacao.modulo_id)
+        .subquery()
+    )
+    Pai = aliased(Modulo)
+
+    modulos = db.session.execute(
+        select(
+            Modulo.id, Modulo.nome, Modulo.tipo, Modulo.quantidade_canais,
+            Modulo.is_controller, Modulo.is_logic_server, Modulo.ip_address,
+            func.coalesce(vinc_counts.c.vinc_count, 0).label("vinc_count"),
+            QuadroEletrico.id.label("quadro_id"), QuadroEletrico.nome.label("quadro_nome"),
+            Pai.id.label("pai_id"), Pai.nome.label("pai_nome"),
+        )
+        .outerjoin(vinc_counts, vinc_counts.c.modulo_id == Modulo.id)
+        .outerjoin(QuadroEletrico, Modulo.quadro_eletrico_id == QuadroEletrico.id)
+        .outerjoin(Pai, Modulo.parent_controller_id == Pai.id)
+        .where(Modulo.projeto_id == projeto_id)
+        .order_by(Modulo.id)
+    ).all()
+
+    out = []
+    for m in modulos:
+        out.append({
+            "id": m.id,
+            "nome": m.nome,
+            "tipo": m.tipo,
+            "quantidade_canais": m.quantidade_canais,
+            "is_controller": m.is_controller,
+            "is_logic_server": m.is_logic_server,
+            "ip_address": m.ip_address,
+            "vinc_count": m.vinc_count,
+            "quadro_eletrico": {
+                "id": m.quadro_id,
+                "nome": m.quadro_nome,
+            } if m.quadro_id is not None else None,
+            "parent_controller": {
+                "id": m.pai_id,
+                "nome": m.pai_nome,
+            } if m.pai_id is not None else None,
+        })
+    return jsonify({"ok": True, "modulos": out})
+
+@bp.delete("/api/modulos/<int:modulo_id>")
+@login_required
+def api_modulos_delete(modulo_id):
+    m = db.get_or_404(Modulo, modulo_id)
+
+    projeto_id = session.get("projeto_atual_id")
+    if m.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Módulo não pertence ao projeto atual."}), 400
+
+    # Bloqueia exclusão se houver vinculações
+    vinc_existente = Vinculacao.query.filter_by(modulo_id=m.id).first()
+    if vinc_existente:
+        return jsonify({
+            "ok": False,
+            "error": "Este módulo está em uso em uma ou mais vinculações. "
+                     "Exclua as vinculações antes de remover o módulo."
+        }), 409
+
+    # Se o módulo a ser deletado é o logic server, promove outro a sê-lo
+    if m.is_logic_server:
+        outro_controller = Modulo.query.filter(
+            Modulo.projeto_id == projeto_id,
+            Modulo.is_controller == True,
+            Modulo.id != m.id
+        ).first()
+        if outro_controller:
+            outro_controller.is_logic_server = True
+
+    db.session.delete(m)
+    db.session.commit()
+    return jsonify({"ok": True})
+
+    
+@bp.get("/api/modulos/meta")
+@login_required
+def api_modulos_meta():
+    # Usa diretamente o dicionário MODULO_INFO já existente
+    return jsonify({"ok": True, "meta": MODULO_INFO})
+@bp.post("/api/modulos")
+@login_required
+def api_modulos_create():
+    data = request.get_json(silent=True) or request.form or {}
+    tipo = (data.get("tipo") or "").strip().upper()
+    nome = (data.get("nome") or "").strip()
+    quadro_eletrico_id = data.get("quadro_eletrico_id")
+    parent_controller_id = data.get("parent_controller_id")
+    projeto_id = session.get("projeto_atual_id")
+
+    if not projeto_id:
+        return jsonify({"ok": False, "error": "Projeto não selecionado."}), 400
+    if not tipo:
+        return jsonify({"ok": False, "error": "Tipo é obrigatório."}), 400
+
+    info = MODULO_INFO.get(tipo)
+    if not info:
+        return jsonify({"ok": False, "error": "Tipo inválido."}), 400
+
+    if not nome:
+        nome = info["nome_completo"]
+
+    is_controller = tipo in ["AQL-GV-M4", "ADP-M8", "ADP-M16"]
+
+    # Validações
+    if is_controller and not quadro_eletrico_id:
+        return jsonify({"ok": False, "error": "Controladores devem ser associados a um Quadro Elétrico."}), 400
+
+    if not is_controller and not parent_controller_id:
+        return jsonify({"ok": False, "error": "Módulos devem ser vinculados a um Controlador."}), 400
+
+    # Validação do quadro elétrico
+    quadro_eletrico = None
+    if quadro_eletrico_id:
+        quadro_eletrico = QuadroEletrico.query.filter_by(id=quadro_eletrico_id, projeto_id=projeto_id).first()
+        if not quadro_eletrico:
+            return jsonify({"ok": False, "error": "Quadro elétrico não encontrado no projeto."}), 400
+
+    # Validação do controlador pai
+    if parent_controller_id:
+        parent = Modulo.query.filter_by(id=parent_controller_id, projeto_id=projeto_id, is_controller=True).first()
+        if not parent:
+            return jsonify({"ok": False, "error": "Controlador pai não encontrado ou inválido."}), 400
+
+    # Evitar nome duplicado
+    if Modulo.query.filter_by(projeto_id=projeto_id, nome=nome).first():
+        return jsonify({"ok": False, "error": "Já existe um módulo com esse nome no projeto."}), 409
+
+    # HSNET: informado ou o próximo livre da faixa da classe (controlador/módulo)
+    hsnet_raw = data.get("hsnet")
+    if hsnet_raw not in (None, ""):
+        try:
+            hsnet = int(hsnet_raw)
+        except (TypeError, ValueError):
+            return jsonify({"ok": False, "error": "hsnet invalido."}), 400
+        if hsnet <= 0:
+            return jsonify({"ok": False, "error": "hsnet deve ser positivo."}), 400
+        if hsnet_em_uso(projeto_id, hsnet):
+            return jsonify({"ok": False, "error": "HSNET ja esta em uso."}), 409
+    else:
+        try:
+            hsnet = alocar_hsnet(projeto_id, "controlador" if is_controller else "modulo")[0]
+        except SemHsnetLivre:
+            db.session.rollback()
+            return jsonify({"ok": False, "error": "sem HSNET livre"}), 409
+    dev_id = data.get("dev_id") or hsnet
+
+    # Lógica para Logic Server
+    is_logic_server = data.get("is_logic_server", False)
+    if is_controller:
+        if Modulo.query.filter_by(projeto_id=projeto_id, is_controller=True).count() == 0:
+            is_logic_server = True
+
+    if is_logic_server:
+        # Pelo ORM (não Query.update) para que o log de alterações registre quem perdeu o flag
+        for anterior in Modulo.query.filter_by(projeto_id=projeto_id, is_logic_server=True):
+            anterior.is_logic_server = False
+
+    m = Modulo(
+        nome=nome,
+        tipo=tipo,
+        quantidade_canais=info.get("canais", 0),
+        projeto_id=projeto_id,
+        hsnet=hsnet,
+        dev_id=dev_id,
+        is_controller=is_controller,
+        is_logic_server=is_logic_server,
+        ip_address=data.get("ip_address"),
+        quadro_eletrico_id=quadro_eletrico.id if quadro_eletrico else None,
+        parent_controller_id=parent_controller_id
+    )
+    db.session.add(m)
+    db.session.commit()
+    return jsonify({"ok": True, "id": m.id})
+
+@bp.put("/api/modulos/<int:modulo_id>")
+@login_required
+def api_modulos_update(modulo_id):
+    data = request.get_json(silent=True) or request.form or {}
+    m = db.get_or_404(Modulo, modulo_id)
+    projeto_id = session.get("projeto_atual_id")
+
+    if m.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Módulo não pertence ao projeto atual."}), 400
+
+    if "nome" in data:
+        nome = (data.get("nome") or "").strip()
+        if not nome:
+            return jsonify({"ok": False, "error": "Nome é obrigatório."}), 400
+        m.nome = nome
+
+    if "ip_address" in data:
+        ip_address = data.get("ip_address")
+        if ip_address and not is_valid_ip(ip_address):
+            return jsonify({"ok": False, "error": "Formato de endereço IP inválido."}), 400
+        m.ip_address = ip_address
+
+    if "is_logic_server" in data:
+        is_logic_server = data.get("is_logic_server", False)
+
+        # Se o usuário está tentando desmarcar o logic server
+        if not is_logic_server and m.is_logic_server:
+            # Verificar se existem outros controladores no projeto
+            outros_controllers = Modulo.query.filter(
+                Modulo.projeto_id == projeto_id,
+                Modulo.is_controller == True,
+                Modulo.id != modulo_id
+            ).count()
+
+            if outros_controllers == 0:
+                return jsonify({"ok": False, "error": "Não é possível desmarcar o único Logic Server. Adicione e promova outro controlador primeiro."}), 400
+            else:
+                # Promover outro controlador para ser o logic server
+                novo_logic_server = Modulo.query.filter(
+                    Modulo.projeto_id == projeto_id,
+                    Modulo.is_controller == True,
+                    Modulo.id != modulo_id
+                ).first()
+                novo_logic_server.is_logic_server = True
+
+        if is_logic_server:
+            # Desmarcar qualquer outro logic server no mesmo projeto (pelo ORM, para o log de alterações)
+            for anterior in Modulo.query.filter(
+                Modulo.projeto_id == projeto_id,
+                Modulo.id != modulo_id,
+                Modulo.is_logic_server == True
+            ):
+                anterior.is_logic_server = False
+
+        m.is_logic_server = is_logic_server
+    
+    if "quadro_eletrico_id" in data:
+        quadro_id = data.get("quadro_eletrico_id")
+        if quadro_id:
+            quadro = db.get_or_404(QuadroEletrico, int(quadro_id))
+            if quadro.projeto_id != projeto_id:
+                return jsonify({"ok": False, "error": "Quadro elétrico não pertence ao projeto atual."}), 400
+            m.quadro_eletrico_id = quadro.id
+        else:
+            m.quadro_eletrico_id = None
+
+    if "hsnet" in data:
+        hsnet_val = data.get("hsnet")
+        if hsnet_val not in (None, ""):
+            try:
+                hsnet = int(hsnet_val)
+            except (TypeError, ValueError):
+                return jsonify({"ok": False, "error": "hsnet invalido."}), 400
+            if hsnet <= 0:
+                return jsonify({"ok": False, "error": "hsnet deve ser positivo."}), 400
+            if hsnet_em_uso(projeto_id, hsnet, exceto_modulo_id=m.id):
+                return jsonify({"ok": False, "error": "HSNET ja esta em uso."}), 409
+            m.hsnet = hsnet
+        else:
+            # Do not allow setting hsnet to null if it's already set
+            if m.hsnet is not None:
+                return jsonify({"ok": False, "error": "HSNET não pode ser vazio."}), 400
+            m.hsnet = None
+            
+    db.session.commit()
+    return jsonify({"ok": True})
+
+
+@bp.route('/modulos/<int:id>', methods=['DELETE'])
+@login_required
+def excluir_modulo(id):
+    modulo = Modulo.query.get_or_404(id)
+    
+    # Verificar se o módulo pertence ao projeto atual
+    if modulo.projeto_id != session.get('projeto_atual_id'):
+        return jsonify({'success': False, 'message': 'Módulo não pertence ao projeto atual'})
+    
+    # Verificar se o módulo tem vinculações
+    if modulo.vinculacoes:
+        return jsonify({'success': False, 'message': 'Não é possível excluir módulo com vinculações ativas'})
+    
+    db.session.delete(modulo)
+    db.session.commit()
+    return jsonify({'success': True})
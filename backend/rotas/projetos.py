@@ -0,0 +1,483 @@
+# rotas/projetos.py
+"""
+Projetos: CRUD, seleção do projeto atual, clonagem, árvore e delta sync.
+"""
+from datetime import datetime
+from collections import defaultdict
+
+from flask import Blueprint, request, jsonify, session, current_app
+from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import IntegrityError
+
+from database import db, Projeto, Area, Ambiente, Circuito, Modulo, Vinculacao, Keypad, KeypadButton, QuadroEletrico, Cena, Acao
+from alteracoes import revisao_atual, revisao_podada, alteracoes_desde
+from health import rastrear_job
+from operacoes_projeto import clonar_projeto, excluir_projeto, nome_livre
+from serializadores import keypads_serializados, cenas_serializadas
+from rotas.comum import admin_required
+from rotas.keypads import serialize_keypad
+from rotas.cenas import serialize_cena
+
+bp = Blueprint("projetos", __name__)
+
+
+# Modifique a rota de seleção para retornar JSON
+@bp.route('/selecionar_projeto/<int:projeto_id>', methods=['POST'])
+@login_required
+def selecionar_projeto(projeto_id):
+    projeto = db.get_or_404(Projeto, projeto_id)  # ✅
+
+    if projeto.user_id != current_user.id and current_user.role != 'admin':
+        return jsonify({"ok": False, "error": "Acesso não autorizado."}), 403
+
+    session['projeto_atual_id'] = projeto.id
+    session['projeto_atual_nome'] = projeto.nome
+
+    return jsonify({"ok": True, "projeto": {"id": projeto.id, "nome": projeto.nome}})
+
+# Modifique a rota de edição para retornar JSON
+@bp.route('/projeto/<int:projeto_id>', methods=['PUT'])
+@login_required
+def editar_projeto(projeto_id):
+    projeto = db.get_or_404(Projeto, projeto_id)
+    if projeto.user_id != current_user.id:
+        return jsonify({"success": False, "message": "Acesso não autorizado."}), 403
+
+    data = request.form
+    novo_nome = data.get('nome')
+
+    if not novo_nome:
+        return jsonify({"success": False, "message": "Nome do projeto é obrigatório."}), 400
+
+    projeto_existente = Projeto.query.filter(Projeto.nome == novo_nome, Projeto.user_id == current_user.id, Projeto.id != projeto_id).first()
+    if projeto_existente:
+        return jsonify({"success": False, "message": f"Projeto com o nome '{novo_nome}' já existe."}), 409
+
+    projeto.nome = novo_nome
+    db.session.commit()
+
+    # Atualiza a sessão se for o projeto atual
+    if session.get('projeto_atual_id') == projeto.id:
+        session['projeto_atual_nome'] = novo_nome
+
+    return jsonify({"success": True})
+
+@bp.route('/novo_projeto', methods=['POST'])
+@login_required
+def novo_projeto():
+    nome = request.form.get('nome')
+    
+    if not nome:
+        return jsonify({'success': False, 'message': 'Nome do projeto é obrigatório'})
+    
+    # Validação para evitar nomes duplicados para o mesmo usuário
+    projeto_existente = Projeto.query.filter_by(nome=nome, user_id=current_user.id).first()
+    if projeto_existente:
+        return jsonify({'success': False, 'message': 'Já existe um projeto com esse nome'})
+    
+    novo_projeto = Projeto(nome=nome, user_id=current_user.id)
+    db.session.add(novo_projeto)
+    db.session.commit()
+    
+    return jsonify({'success': True, 'id': novo_projeto.id})
+
+# Modifique a rota de exclusão para retornar JSON
+@bp.route('/projeto/<int:projeto_id>', methods=['DELETE'])
+@login_required
+def delete_projeto(projeto_id):
+    projeto = db.get_or_404(Projeto, projeto_id)
+
+    # (opcional) verificação de permissão
+    if projeto.user_id != current_user.id and current_user.role != 'admin':
+        return jsonify({"ok": False, "error": "Acesso não autorizado."}), 403
+
+    # deleta
+    excluir_projeto(projeto.id)
+    db.session.commit()
+
+    # SE o projeto deletado era o selecionado, limpe a seleção na sessão
+    if session.get('projeto_atual_id') == projeto_id:
+      session.pop('projeto_atual_id', None)
+      session.pop('projeto_atual_nome', None)
+
+    return jsonify({"ok": True, "success": True})
+
+# Rota para obter todos os projetos do usuário
+@bp.get("/api/projetos")
+@login_required
+def api_projetos_list():
+    projetos = Projeto.query.order_by(Projeto.id.asc()).all()
+    selected_id = session.get("projeto_atual_id")
+    out = [{
+        "id": p.id,
+        "nome": p.nome,
+        "status": (p.status or "ATIVO"),
+        "selected": (p.id == selected_id),
+        "data_criacao": p.data_criacao.isoformat() if p.data_criacao else None,
+        "data_ativo": p.data_ativo.isoformat() if p.data_ativo else None,
+        "data_inativo": p.data_inativo.isoformat() if p.data_inativo else None,
+        "data_concluido": p.data_concluido.isoformat() if p.data_concluido else None,
+    } for p in projetos]
+    return jsonify({"ok": True, "projetos": out})
+
+
+@bp.delete("/api/projetos/<int:projeto_id>")
+@login_required
+@admin_required
+def api_projetos_delete(projeto_id):
+    p = db.get_or_404(Projeto, projeto_id)
+
+    # DELETEs por tabela em vez do cascade do ORM (ver operacoes_projeto.py)
+    excluir_projeto(p.id)
+    db.session.commit()
+
+    # Se era o projeto selecionado, limpe a sessão
+    if session.get("projeto_atual_id") == projeto_id:
+        session.pop("projeto_atual_id", None)
+        session.pop("projeto_atual_nome", None)
+
+    return jsonify({"ok": True})
+
+@bp.put("/api/projetos/<int:projeto_id>")
+@login_required
+def api_projetos_update(projeto_id):
+    data = request.get_json(silent=True) or request.form or {}
+    p = db.get_or_404(Projeto, projeto_id)
+
+    if "nome" in data:
+        nome = (data.get("nome") or "").strip()
+        if not nome:
+            return jsonify({"ok": False, "error": "Nome é obrigatório."}), 400
+        p.nome = nome
+
+    if "status" in data:
+        status = (data.get("status") or "").strip().upper()
+        if status not in {"ATIVO", "INATIVO", "CONCLUIDO"}:
+            return jsonify({"ok": False, "error": "Status inválido (use ATIVO, INATIVO ou CONCLUIDO)."}), 400
+
+        if p.status != status:
+            now = datetime.utcnow()
+            if status == 'ATIVO':
+                p.data_ativo = now
+            elif status == 'INATIVO':
+                p.data_inativo = now
+            elif status == 'CONCLUIDO':
+                p.data_concluido = now
+        p.status = status
+
+    db.session.commit()
+
+    if session.get("projeto_atual_id") == p.id and "nome" in data:
+        session["projeto_atual_nome"] = p.nome
+
+    return jsonify({
+        "ok": True,
+        "projeto": {
+            "id": p.id,
+            "nome": p.nome,
+            "status": p.status,
+            "data_criacao": p.data_criacao.isoformat(),
+            "data_ativo": p.data_ativo.isoformat() if p.data_ativo else None,
+            "data_inativo": p.data_inativo.isoformat() if p.data_inativo else None,
+            "data_concluido": p.data_concluido.isoformat() if p.data_concluido else None,
+        }
+    })
+
+@bp.post("/api/projetos")
+@login_required
+def api_projetos_create():
+    data = request.get_json(silent=True) or request.form or {}
+    current_app.logger.info(f"Received data for project creation: {data}")
+
+    nome = (data.get("nome") or "").strip()
+    if not nome:
+        current_app.logger.error("Project creation failed: 'nome' is missing.")
+        return jsonify({"ok": False, "error": "Nome é obrigatório."}), 400
+
+    if Projeto.query.filter_by(nome=nome, user_id=current_user.id).first():
+        current_app.logger.error(f"Project creation failed: Project with name '{nome}' already exists.")
+        return jsonify({"ok": False, "error": "Já existe um projeto com esse nome."}), 409
+
+    status = (data.get("status") or "ATIVO").strip().upper()
+    if status not in {"ATIVO", "INATIVO", "CONCLUIDO"}:
+        current_app.logger.error(f"Project creation failed: Invalid status '{status}'.")
+        return jsonify({"ok": False, "error": "Status inválido (use ATIVO, INATIVO ou CONCLUIDO)."}), 400
+
+    now = datetime.utcnow()
+
+    p = Projeto(
+        nome=nome,
+        user_id=current_user.id,
+        status=status,
+        data_criacao=now,
+        data_ativo=now if status == 'ATIVO' else None,
+        data_inativo=now if status == 'INATIVO' else None,
+        data_concluido=now if status == 'CONCLUIDO' else None,
+    )
+    db.session.add(p)
+    try:
+        db.session.commit()
+        current_app.logger.info(f"Project '{nome}' created with ID {p.id}.")
+    except IntegrityError:
+        db.session.rollback()
+        current_app.logger.error("Project creation failed due to an integrity error.")
+        return jsonify({"ok": False, "error": "Não foi possível salvar o projeto."}), 400
+
+    session["projeto_atual_id"] = p.id
+    session["projeto_atual_nome"] = p.nome
+
+    return jsonify({
+        "ok": True,
+        "id": p.id,
+        "nome": p.nome,
+        "status": p.status,
+        "data_criacao": p.data_criacao.isoformat(),
+        "data_ativo": p.data_ativo.isoformat() if p.data_ativo else None,
+        "data_inativo": p.data_inativo.isoformat() if p.data_inativo else None,
+        "data_concluido": p.data_concluido.isoformat() if p.data_concluido else None,
+    })
+
+@bp.post("/api/projetos/<int:projeto_id>/clonar")
+@login_required
+@rastrear_job("clone_project")
+def api_projetos_clonar(projeto_id):
+    origem = db.get_or_404(Projeto, projeto_id)
+    if origem.user_id != current_user.id and current_user.role != 'admin':
+        return jsonify({"ok": False, "error": "Acesso não autorizado."}), 403
+
+    data = request.get_json(silent=True) or request.form or {}
+    nome = nome_livre((data.get("nome") or "").strip() or origem.nome)
+
+    try:
+        novo, copiados = clonar_projeto(origem.id, nome, current_user.id)
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Falha ao clonar o projeto {projeto_id}: {e}")
+        return jsonify({"ok": False, "error": "Não foi possível clonar o projeto."}), 400
+
+    return jsonify({"ok": True, "id": novo.id, "nome": novo.nome, "copiados": copiados})
+
+
+@bp.route("/api/projeto_atual", methods=["GET", "PUT", "POST"])
+@login_required
+def api_projeto_atual():
+    # GET: retorna o selecionado
+    if request.method == "GET":
+        pid = session.get("projeto_atual_id")
+        if not pid:
+            return jsonify({"ok": True, "projeto_atual": None})
+        p = db.get_or_404(Projeto, int(pid))
+        return jsonify({"ok": True, "projeto_atual": {
+            "id": p.id,
+            "nome": p.nome,
+            "status": p.status,
+            "data_criacao": p.data_criacao.isoformat() if p.data_criacao else None,
+            "data_ativo": p.data_ativo.isoformat() if p.data_ativo else None,
+            "data_inativo": p.data_inativo.isoformat() if p.data_inativo else None,
+            "data_concluido": p.data_concluido.isoformat() if p.data_concluido else None,
+        }})
+
+    # PUT/POST: seleciona um projeto
+    data = request.get_json(silent=True) or request.form or {}
+    projeto_id = data.get("projeto_id")
+    if not projeto_id:
+        return jsonify({"ok": False, "error": "projeto_id é obrigatório."}), 400
+
+    p = db.get_or_404(Projeto, int(projeto_id))
+    session["projeto_atual_id"] = p.id
+    session["projeto_atual_nome"] = p.nome
+    return jsonify({"ok": True})
+
+
+@bp.get("/api/projeto_tree")
+@login_required
+def api_projeto_tree():
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": True, "projeto": None, "areas": []})
+
+    # Revisão lida antes da árvore: alterações concorrentes reaparecem no próximo /api/projeto/changes
+    revisao = revisao_atual(projeto_id)
+
+    # Carrega Áreas -> Ambientes -> Circuitos, Quadros Elétricos -> Módulos
+    areas = (
+        Area.query
+        .options(
+            joinedload(Area.ambientes)
+            .joinedload(Ambiente.circuitos)
+            .joinedload(Circuito.vinculacao)
+            .joinedload(Vinculacao.modulo),
+            joinedload(Area.ambientes)
+            .joinedload(Ambiente.quadros_eletricos)
+            .joinedload(QuadroEletrico.modulos),
+        )
+        .filter(Area.projeto_id == projeto_id)
+        .all()
+    )
+
+    # Keypads e cenas por colunas (serializadores.py), agrupados por ambiente
+    keypads_por_ambiente = defaultdict(list)
+    for k in keypads_serializados(Keypad.projeto_id == projeto_id):
+        keypads_por_ambiente[k["ambiente"]["id"]].append(k)
+    cenas_por_ambiente = defaultdict(list)
+    for c in cenas_serializadas(Cena.projeto_id == projeto_id):
+        cenas_por_ambiente[c["ambiente_id"]].append(c)
+
+    out_areas = []
+    for a in areas:
+        ambs = []
+        for amb in a.ambientes:
+            circs = []
+            for c in amb.circuitos:
+                vinc = getattr(c, "vinculacao", None)
+                circs.append({
+                    "id": c.id,
+                    "tipo": c.tipo,
+                    "identificador": c.identificador,
+                    "nome": c.nome,
+                    "vinculacao": {
+                        "modulo_nome": getattr(vinc.modulo, "nome", None) if vinc and vinc.modulo else None,
+                        "canal": getattr(vinc, "canal", None),
+                    } if vinc else None,
+                })
+            
+            keypads_out = sorted(keypads_por_ambiente[amb.id], key=lambda kp: (kp["nome"] or "").lower())
+            
+            quadros_out = []
+            for q in amb.quadros_eletricos:
+                quadros_out.append({
+                    "id": q.id,
+                    "nome": q.nome,
+                    "modulos": [
+                        {
+                            "id": m.id,
+                            "nome": m.nome,
+                            "tipo": m.tipo,
+                            "quantidade_canais": m.quantidade_canais,
+                        }
+                        for m in q.modulos
+                    ]
+                })
+            
+            cenas_out = cenas_por_ambiente[amb.id]
+
+            ambs.append({
+                "id": amb.id,
+                "nome": amb.nome,
+                "circuitos": circs,
+                "keypads": keypads_out,
+                "quadros_eletricos": quadros_out,
+                "cenas": cenas_out,
+            })
+        out_areas.append({"id": a.id, "nome": a.nome, "ambientes": ambs})
+
+    modulos = Modulo.query.filter_by(projeto_id=projeto_id).all()
+    modulos_out = [{"id": m.id, "nome": m.nome, "tipo": m.tipo} for m in modulos]
+
+    return jsonify({
+        "ok": True,
+        "projeto": {"id": projeto_id, "nome": session.get("projeto_atual_nome")},
+        "areas": out_areas,
+        "modulos": modulos_out,
+        "revision": revisao,
+    })
+
+def serialize_alteracao(entidade, obj):
+    """Serializa uma entidade alterada para /api/projeto/changes."""
+    if entidade == "areas":
+        return {"id": obj.id, "nome": obj.nome}
+    if entidade == "ambientes":
+        return {"id": obj.id, "nome": obj.nome, "area_id": obj.area_id}
+    if entidade == "quadros_eletricos":
+        return {"id": obj.id, "nome": obj.nome, "notes": obj.notes, "ambiente_id": obj.ambiente_id}
+    if entidade == "circuitos":
+        return {
+            "id": obj.id,
+            "identificador": obj.identificador,
+            "nome": obj.nome,
+            "tipo": obj.tipo,
+            "dimerizavel": obj.dimerizavel,
+            "potencia": obj.potencia,
+            "sak": obj.sak,
+            "quantidade_saks": obj.quantidade_saks,
+            "ambiente_id": obj.ambiente_id,
+        }
+    if entidade == "modulos":
+        return {
+            "id": obj.id,
+            "nome": obj.nome,
+            "tipo": obj.tipo,
+            "quantidade_canais": obj.quantidade_canais,
+            "hsnet": obj.hsnet,
+            "dev_id": obj.dev_id,
+            "is_controller": obj.is_controller,
+            "is_logic_server": obj.is_logic_server,
+            "ip_address": obj.ip_address,
+            "quadro_eletrico_id": obj.quadro_eletrico_id,
+            "parent_controller_id": obj.parent_controller_id,
+        }
+    if entidade == "vinculacoes":
+        return {"id": obj.id, "circuito_id": obj.circuito_id, "modulo_id": obj.modulo_id, "canal": obj.canal}
+    if entidade == "keypads":
+        data = serialize_keypad(obj)
+        data["ambiente_id"] = obj.ambiente_id
+        return data
+    if entidade == "cenas":
+        return serialize_cena(obj)
+    raise ValueError(f"Entidade desconhecida: {entidade}")
+
+@bp.get("/api/projeto/changes")
+@login_required
+def api_projeto_changes():
+    projeto_id = session.get("projeto_atual_id")
+    since = request.args.get("since", type=int)
+    if since is None or since < 0:
+        return jsonify({"ok": False, "error": "Parâmetro 'since' inválido."}), 400
+
+    # Revisão à frente do log (de outro projeto, ou anterior a uma restauração do banco) ou
+    # anterior ao trecho já podado: o cliente precisa recarregar a árvore inteira, senão
+    # pularia alterações
+    atual = revisao_atual(projeto_id)
+    if since > atual or since < revisao_podada(projeto_id):
+        return jsonify({"ok": True, "since": since, "revision": atual, "resync": True, "changes": {}})
+
+    revisao, alteracoes = alteracoes_desde(projeto_id, since)
+
+    # Carrega o estado atual apenas das entidades alteradas
+    consultas = {
+        "areas": lambda ids: Area.query.filter(Area.id.in_(ids)).all(),
+        "ambientes": lambda ids: Ambiente.query.filter(Ambiente.id.in_(ids)).all(),
+        "quadros_eletricos": lambda ids: QuadroEletrico.query.filter(QuadroEletrico.id.in_(ids)).all(),
+        "circuitos": lambda ids: Circuito.query.filter(Circuito.id.in_(ids)).all(),
+        "modulos": lambda ids: Modulo.query.filter(Modulo.id.in_(ids)).all(),
+        "vinculacoes": lambda ids: Vinculacao.query.filter(Vinculacao.id.in_(ids)).all(),
+        "keypads": lambda ids: (
+            Keypad.query.filter(Keypad.id.in_(ids))
+            .options(
+                joinedload(Keypad.ambiente).joinedload(Ambiente.area),
+                joinedload(Keypad.buttons).joinedload(KeypadButton.circuito),
+                joinedload(Keypad.buttons).joinedload(KeypadButton.cena),
+            )
+            .all()
+        ),
+        "cenas": lambda ids: (
+            Cena.query.filter(Cena.id.in_(ids))
+            .options(joinedload(Cena.acoes).joinedload(Acao.custom_acoes))
+            .all()
+        ),
+    }
+
+    out = {}
+    for entidade, ids in alteracoes.items():
+        alterados = []
+        removidos = set(ids["removidos"])
+        if ids["alterados"]:
+            encontrados = consultas[entidade](list(ids["alterados"]))
+            alterados = [serialize_alteracao(entidade, obj) for obj in encontrados]
+            # Registros apagados fora do ORM (deletes em massa) também contam como removidos
+            removidos |= ids["alterados"] - {obj.id for obj in encontrados}
+        out[entidade] = {"upserted": alterados, "deleted": sorted(removidos)}
+
+    return jsonify({"ok": True, "since": since, "revision": revisao, "resync": False, "changes": out})
@@ -0,0 +1,236 @@
+# rotas/quadros.py
+"""
+Quadros elétricos (AutomationBoards) e associação de módulos.
+"""
+from flask import Blueprint, request, jsonify, session
+from flask_login import login_required
+from sqlalchemy.orm import joinedload
+
+from database import db, Ambiente, Modulo, QuadroEletrico
+
+bp = Blueprint("quadros", __name__)
+
+
+# -------------------- Quadros Elétricos (AutomationBoards) --------------------
+
+@bp.get("/api/quadros_eletricos")
+@login_required
+def api_quadros_eletricos_list():
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": True, "quadros_eletricos": []})
+
+    quadros = (
+        QuadroEletrico.query
+        .filter(QuadroEletrico.projeto_id == projeto_id)
+        .options(joinedload(QuadroEletrico.modulos))
+        .all()
+    )
+
+    out = []
+    for q in quadros:
+        out.append({
+            "id": q.id,
+            "nome": q.nome,
+            "notes": q.notes,
+            "ambiente": {
+                "id": q.ambiente.id,
+                "nome": q.ambiente.nome,
+                "area": {
+                    "id": q.ambiente.area.id,
+                    "nome": q.ambiente.area.nome,
+                } if q.ambiente.area else None,
+            },
+            "quantidade_modulos": len(q.modulos),
+        })
+    return jsonify({"ok": True, "quadros_eletricos": out})
+
+@bp.get("/api/quadros_eletricos/<int:quadro_id>")
+@login_required
+def api_quadros_eletricos_get(quadro_id):
+    projeto_id = session.get("projeto_atual_id")
+    quadro = db.get_or_404(QuadroEletrico, quadro_id)
+    
+    if not projeto_id or quadro.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Quadro elétrico não pertence ao projeto atual."}), 404
+
+    modulos_out = []
+    for modulo in quadro.modulos:
+        modulos_out.append({
+            "id": modulo.id,
+            "nome": modulo.nome,
+            "tipo": modulo.tipo,
+            "quantidade_canais": modulo.quantidade_canais,
+            "hsnet": modulo.hsnet,
+            "dev_id": modulo.dev_id,
+        })
+
+    return jsonify({
+        "ok": True,
+        "quadro_eletrico": {
+            "id": quadro.id,
+            "nome": quadro.nome,
+            "notes": quadro.notes,
+            "ambiente": {
+                "id": quadro.ambiente.id,
+                "nome": quadro.ambiente.nome,
+                "area": {
+                    "id": quadro.ambiente.area.id,
+                    "nome": quadro.ambiente.area.nome,
+                },
+            },
+            "modulos": modulos_out,
+        }
+    })
+
+@bp.post("/api/quadros_eletricos")
+@login_required
+def api_quadros_eletricos_create():
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": False, "error": "Projeto não selecionado."}), 400
+
+    data = request.get_json(silent=True) or request.form or {}
+    nome = (data.get("nome") or "").strip()
+    ambiente_id = data.get("ambiente_id")
+    notes = (data.get("notes") or "").strip() or None
+
+    if not nome or not ambiente_id:
+        return jsonify({"ok": False, "error": "Nome e ambiente são obrigatórios."}), 400
+
+    ambiente = db.get_or_404(Ambiente, int(ambiente_id))
+    
+    # Verificar se o ambiente pertence ao projeto atual
+    if ambiente.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Ambiente não pertence ao projeto atual."}), 400
+
+    # Verificar se já existe um quadro com o mesmo nome no ambiente
+    existing = QuadroEletrico.query.filter_by(ambiente_id=ambiente.id, nome=nome).first()
+    if existing:
+        return jsonify({"ok": False, "error": "Já existe um quadro elétrico com esse nome neste ambiente."}), 409
+
+    quadro = QuadroEletrico(
+        nome=nome,
+        notes=notes,
+        ambiente_id=ambiente.id,
+        projeto_id=projeto_id
+    )
+    
+    db.session.add(quadro)
+    db.session.commit()
+
+    return jsonify({"ok": True, "id": quadro.id})
+
+@bp.put("/api/quadros_eletricos/<int:quadro_id>")
+@login_required
+def api_quadros_eletricos_update(quadro_id):
+    projeto_id = session.get("projeto_atual_id")
+    quadro = db.get_or_404(QuadroEletrico, quadro_id)
+    
+    if not projeto_id or quadro.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Quadro elétrico não pertence ao projeto atual."}), 404
+
+    data = request.get_json(silent=True) or request.form or {}
+    
+    if "nome" in data:
+        novo_nome = (data.get("nome") or "").strip()
+        if not novo_nome:
+            return jsonify({"ok": False, "error": "Nome é obrigatório."}), 400
+        
+        # Verificar se o novo nome já existe em outro quadro no mesmo ambiente
+        existing = QuadroEletrico.query.filter(
+            QuadroEletrico.ambiente_id == quadro.ambiente_id,
+            QuadroEletrico.nome == novo_nome,
+            QuadroEletrico.id != quadro_id
+        ).first()
+        if existing:
+            return jsonify({"ok": False, "error": "Já existe um quadro elétrico com esse nome neste ambiente."}), 409
+        
+        quadro.nome = novo_nome
+
+    if "notes" in data:
+        quadro.notes = (data.get("notes") or "").strip() or None
+
+    if "ambiente_id" in data:
+        novo_ambiente_id = data.get("ambiente_id")
+        novo_ambiente = db.get_or_404(Ambiente, int(novo_ambiente_id))
+        
+        if novo_ambiente.projeto_id != projeto_id:
+            return jsonify({"ok": False, "error": "Novo ambiente não pertence ao projeto atual."}), 400
+        
+        quadro.ambiente_id = novo_ambiente.id
+
+    db.session.commit()
+    return jsonify({"ok": True})
+
+@bp.delete("/api/quadros_eletricos/<int:quadro_id>")
+@login_required
+def api_quadros_eletricos_delete(quadro_id):
+    projeto_id = session.get("projeto_atual_id")
+    quadro = db.get_or_404(QuadroEletrico, quadro_id)
+    
+    if not projeto_id or quadro.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Quadro elétrico não pertence ao projeto atual."}), 404
+
+    # Verificar se o quadro tem módulos antes de excluir
+    if quadro.modulos:
+        return jsonify({
+            "ok": False,
+            "error": "Não é possível excluir um quadro elétrico que contém módulos. Remova os módulos primeiro."
+        }), 409
+
+    db.session.delete(quadro)
+    db.session.commit()
+    return jsonify({"ok": True})
+
+# Rota para associar módulos a um quadro elétrico
+@bp.put("/api/modulos/<int:modulo_id>/quadro")
+@login_required
+def api_modulos_associate_quadro(modulo_id):
+    projeto_id = session.get("projeto_atual_id")
+    modulo = db.get_or_404(Modulo, modulo_id)
+    
+    if not projeto_id or modulo.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Módulo não pertence ao projeto atual."}), 404
+
+    data = request.get_json(silent=True) or request.form or {}
+    quadro_id = data.get("quadro_eletrico_id")
+
+    if quadro_id in (None, ""):
+        # Remover associação
+        modulo.quadro_eletrico_id = None
+    else:
+        quadro = db.get_or_404(QuadroEletrico, int(quadro_id))
+        if quadro.projeto_id != projeto_id:
+            return jsonify({"ok": False, "error": "Quadro elétrico não pertence ao projeto atual."}), 400
+        modulo.quadro_eletrico_id = quadro.id
+
+    db.session.commit()
+    return jsonify({"ok": True})
+
+# Rota para obter módulos disponíveis para associação com quadros
+@bp.get("/api/quadros_eletricos/<int:quadro_id>/modulos_disponiveis")
+@login_required
+def api_quadros_eletricos_modulos_disponiveis(quadro_id):
+    projeto_id = session.get("projeto_atual_id")
+    quadro = db.get_or_404(QuadroEletrico, quadro_id)
+    
+    if not projeto_id or quadro.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Quadro elétrico não pertence ao projeto atual."}), 404
+
+    # Módulos do projeto que não estão associados a nenhum quadro ou estão associados a este quadro
+    modulos = Modulo.query.filter_by(projeto_id=projeto_id).filter(
+        (Modulo.quadro_eletrico_id == None) | (Modulo.quadro_eletrico_id == quadro_id)
+    ).all()
+
+    modulos_out = []
+    for modulo in modulos:
+        modulos_out.append({
+            "id": modulo.id,
+            "nome": modulo.nome,
+            "tipo": modulo.tipo,
+            "quantidade_canais": modulo.quantidade_canais,
+            "associado": modulo.quadro_eletrico_id == quadro_id,
+        })
+
+    return jsonify({"ok": True, "modulos": modulos_out})
@@ -0,0 +1,92 @@
+# rotas/spa.py
+"""
+Shell da SPA: index.html nas rotas do React Router, favicon e o catch-all.
+"""
+from flask import Blueprint, redirect, url_for, abort, current_app
+
+bp = Blueprint("spa", __name__)
+
+
+def _estaticos():
+    """Instância de estaticos.Estaticos registrada pelo app."""
+    return current_app.extensions["estaticos"]
+
+
+@bp.get("/login")
+def login_spa():
+    return _estaticos().responder("index.html")
+
+
+@bp.get("/usuarios")
+def usuarios_spa():
+    return _estaticos().responder("index.html")
+
+@bp.get("/usuarios/novo")
+def usuarios_novo_spa():
+    return _estaticos().responder("index.html")
+
+
+@bp.get("/favicon.ico")
+def favicon_root():
+    return redirect(url_for("static", filename="images/favicon-roehn.png"))
+
+
+@bp.get("/")
+def spa_root():
+    return _estaticos().responder("index.html")
+
+
+@bp.get("/<path:prefix>/static/images/favicon-roehn.png")
+def favicon_nested(prefix):
+    # redireciona para o caminho absoluto quando acessado a partir de rotas aninhadas (/usuarios, /projeto, etc.)
+    return redirect(url_for("static", filename="images/favicon-roehn.png"))
+
+
+@bp.get("/areas")
+def areas_spa():
+    return _estaticos().responder("index.html")
+
+
+@bp.get("/ambientes")
+def ambientes_spa():
+    return _estaticos().responder("index.html")
+
+# GET -> SPA (React vai cuidar da UI)
+@bp.get("/circuitos")
+def circuitos_spa():
+    return _estaticos().responder("index.html")
+
+
+# Rota SPA para a página de quadros elétricos
+@bp.get("/quadros_eletricos")
+def quadros_eletricos_spa():
+    return _estaticos().responder("index.html")
+
+
+@bp.get("/modulos")
+def modulos_spa():
+    return _estaticos().responder("index.html")
+
+
+@bp.get("/vinculacao")
+def vinculacao_spa():
+    return _estaticos().responder("index.html")
+
+
+@bp.get("/projeto")
+def projeto_spa():
+    return _estaticos().responder("index.html")
+
+
+@bp.get("/cenas")
+def cenas_spa():
+    return _estaticos().responder("index.html")
+
+
+@bp.route("/", defaults={"path": ""})
+@bp.route("/<path:path>")
+def spa_catch_all(path):
+    # Não intercepta APIs ou arquivos estáticos
+    if path.startswith("api/") or path.startswith("exportar-pdf/"):
+        abort(404)
+    return _estaticos().responder_spa(path)
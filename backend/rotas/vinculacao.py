@@ -0,0 +1,473 @@
+# rotas/vinculacao.py
+"""
+Vinculação de circuitos a canais de módulos, manual e automática.
+"""
+from flask import Blueprint, request, jsonify, session
+from flask_login import login_required
+
+from database import db, Area, Ambiente, Circuito, Modulo, Vinculacao, QuadroEletrico
+from rotas.modulos import MODULO_INFO
+
+bp = Blueprint("vinculacao", __name__)
+
+
+ESPECIFICACOES_MODULOS = {
+    "RL12": {
+        "correntePorCanal": 2.5,
+        "grupos": [
+            {"maxCorrente": 8.0, "canais": [1, 2, 3, 4]},
+            {"maxCorrente": 8.0, "canais": [5, 6, 7, 8]},
+            {"maxCorrente": 8.0, "canais": [9, 10, 11, 12]}
+        ]
+    },
+    "DIM8": {
+        "correntePorCanal": 2.5,
+        "grupos": [
+            {"maxCorrente": 8.0, "canais": [1, 2, 3, 4]},
+            {"maxCorrente": 8.0, "canais": [5, 6, 7, 8]}
+        ]
+    },
+    "LX4": {
+        "correntePorCanal": 2.5,
+        "grupos": [
+            {"maxCorrente": 5.0, "canais": [1, 2, 3, 4]},
+            {"maxCorrente": 5.0, "canais": [5, 6, 7, 8]}
+        ]
+    }
+}
+
+
+@bp.get("/api/vinculacao/options")
+@login_required
+def api_vinculacao_options():
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": True, "compat": {"luz": [], "persiana": [], "hvac": []}, "circuitos": [], "modulos": []})
+
+    # Compatibilidade a partir do MODULO_INFO
+    compat = {"luz": [], "persiana": [], "hvac": []}
+    for tipo_mod, info in MODULO_INFO.items():
+        for t in info.get("tipos_permitidos", []):
+            if tipo_mod not in compat[t]:
+                compat[t].append(tipo_mod)
+
+    # Vinculações existentes do projeto (para filtrar circuitos e marcar canais ocupados)
+    vincs = db.session.execute(
+        select(Vinculacao.circuito_id, Vinculacao.modulo_id, Vinculacao.canal)
+        .join(Circuito, Vinculacao.circuito_id == Circuito.id)
+        .join(Modulo, Vinculacao.modulo_id == Modulo.id)
+        .where(Circuito.projeto_id == projeto_id, Modulo.projeto_id == projeto_id)
+    ).all()
+    circuitos_vinculados_ids = {v.circuito_id for v in vincs}
+
+    # Circuitos do projeto (EXCLUINDO os já vinculados)
+    circuitos = db.session.execute(
+        select(
+            Circuito.id, Circuito.identificador, Circuito.nome, Circuito.tipo, Circuito.potencia,
+            Ambiente.nome.label("ambiente_nome"), Area.nome.label("area_nome"),
+        )
+        .join(Ambiente, Circuito.ambiente_id == Ambiente.id)
+        .join(Area, Ambiente.area_id == Area.id)
+        .where(Circuito.projeto_id == projeto_id)
+    ).all()
+    circuitos_out = [{
+        "id": c.id,
+        "identificador": c.identificador,
+        "nome": c.nome,
+        "tipo": c.tipo,
+        "potencia": c.potencia,
+        "area_nome": c.area_nome,
+        "ambiente_nome": c.ambiente_nome,
+    } for c in circuitos if c.id not in circuitos_vinculados_ids]
+
+    modulos = db.session.execute(
+        select(Modulo.id, Modulo.nome, Modulo.tipo, Modulo.quantidade_canais)
+        .where(Modulo.projeto_id == projeto_id)
+    ).all()
+    ocupados_por_mod = {}
+    for v in vincs:
+        ocupados_por_mod.setdefault(v.modulo_id, set()).add(v.canal)
+
+    modulos_out = []
+    for m in modulos:
+        ocupados = ocupados_por_mod.get(m.id, set())
+        canais_livres = [i for i in range(1, (m.quantidade_canais or 0) + 1) if i not in ocupados]
+        modulos_out.append({
+            "id": m.id,
+            "nome": m.nome,
+            "tipo": m.tipo,
+            "canais_disponiveis": canais_livres,
+            "quantidade_canais": m.quantidade_canais,
+        })
+
+    return jsonify({"ok": True, "compat": compat, "circuitos": circuitos_out, "modulos": modulos_out})
+
+@bp.get("/api/vinculacoes")
+@login_required
+def api_vinculacoes_list():
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": True, "vinculacoes": []})
+
+    vincs = db.session.execute(
+        select(
+            Vinculacao.id, Vinculacao.canal,
+            Circuito.id.label("circuito_id"), Circuito.identificador,
+            Circuito.nome.label("circuito_nome"), Circuito.potencia,
+            Ambiente.nome.label("ambiente_nome"), Area.nome.label("area_nome"),
+            Modulo.id.label("modulo_id"), Modulo.nome.label("modulo_nome"), Modulo.tipo.label("modulo_tipo"),
+        )
+        .join(Circuito, Vinculacao.circuito_id == Circuito.id)
+        .join(Ambiente, Circuito.ambiente_id == Ambiente.id)
+        .join(Area, Ambiente.area_id == Area.id)
+        .join(Modulo, Vinculacao.modulo_id == Modulo.id)
+        .where(Circuito.projeto_id == projeto_id, Modulo.projeto_id == projeto_id)
+    ).all()
+
+    out = []
+    for v in vincs:
+        out.append({
+            "id": v.id,
+            "circuito_id": v.circuito_id,
+            "identificador": v.identificador,
+            "circuito_nome": v.circuito_nome,
+            "area_nome": v.area_nome,
+            "ambiente_nome": v.ambiente_nome,
+            "modulo_nome": v.modulo_nome,
+            "modulo_tipo": v.modulo_tipo,
+            "modulo_id": v.modulo_id,
+            "canal": v.canal,
+            "potencia": v.potencia,
+        })
+    return jsonify({"ok": True, "vinculacoes": out})
+
+@bp.post("/api/vinculacoes")
+@login_required
+def api_vinculacoes_create():
+    data = request.get_json(silent=True) or request.form or {}
+    circuito_id = data.get("circuito_id")
+    modulo_id = data.get("modulo_id")
+    canal = data.get("canal")
+
+    if not circuito_id or not modulo_id or not canal:
+        return jsonify({"ok": False, "error": "Parâmetros obrigatórios ausentes."}), 400
+
+    circuito = db.get_or_404(Circuito, int(circuito_id))
+    modulo = db.get_or_404(Modulo, int(modulo_id))
+    canal = int(canal)
+
+    projeto_id = session.get("projeto_atual_id")
+
+    # garantias de projeto
+    if circuito.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Circuito não pertence ao projeto atual."}), 400
+    if modulo.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Módulo não pertence ao projeto atual."}), 400
+
+    # compatibilidade (usa MODULO_INFO)
+    info = MODULO_INFO.get(modulo.tipo, {})
+    tipos_permitidos = set(info.get("tipos_permitidos", []))
+    if circuito.tipo not in tipos_permitidos:
+        return jsonify({"ok": False, "error": f"Circuitos do tipo {circuito.tipo} não podem ser vinculados a módulos {modulo.tipo}."}), 400
+
+    # canal válido e livre
+    if canal < 1 or canal > (modulo.quantidade_canais or 0):
+        return jsonify({"ok": False, "error": "Canal inválido para este módulo."}), 400
+    existe_no_canal = Vinculacao.query.filter_by(modulo_id=modulo.id, canal=canal).first()
+    if existe_no_canal:
+        return jsonify({"ok": False, "error": "Este canal já está em uso no módulo escolhido."}), 409
+
+    # um circuito só pode ter uma vinculação (espelhando a UI antiga)
+    existe_para_circuito = Vinculacao.query.filter_by(circuito_id=circuito.id).first()
+    if existe_para_circuito:
+        return jsonify({"ok": False, "error": "Este circuito já está vinculado a um módulo/canal."}), 409
+
+    v = Vinculacao(circuito_id=circuito.id, modulo_id=modulo.id, canal=canal)
+    db.session.add(v)
+    db.session.commit()
+    return jsonify({"ok": True, "id": v.id})
+
+from sqlalchemy import select
+
+@bp.post("/api/vinculacoes/auto")
+@login_required
+def api_vinculacoes_auto():
+    projeto_id = session.get("projeto_atual_id")
+    if not projeto_id:
+        return jsonify({"ok": False, "error": "Projeto não selecionado."}), 400
+
+    # Verificar se há exatamente um quadro elétrico
+    quadros = QuadroEletrico.query.filter_by(projeto_id=projeto_id).all()
+    if len(quadros) != 1:
+        return jsonify({
+            "ok": False, 
+            "error": f"A vinculação automática requer exatamente 1 quadro elétrico. Encontrados: {len(quadros)}"
+        }), 400
+
+    try:
+        # CORREÇÃO: Usar select() explicitamente para evitar warning
+        circuitos_vinculados_subquery = select(Vinculacao.circuito_id)
+        
+        circuitos_nao_vinculados = (
+            Circuito.query
+            .filter(Circuito.projeto_id == projeto_id)
+            .filter(Circuito.id.notin_(circuitos_vinculados_subquery))
+            .all()
+        )
+
+        # Buscar módulos disponíveis
+        modulos_disponiveis = (
+            Modulo.query
+            .filter_by(projeto_id=projeto_id)
+            .all()
+        )
+
+        # Mapear compatibilidade atualizada
+        compatibilidade = {
+            "luz": ["RL4", "RL12", "DIM8"],
+            "persiana": ["LX4"], 
+            "hvac": ["SA1"]
+        }
+
+        # Prioridades por tipo de circuito
+        prioridades = {
+            "luz": {
+                "dimerizavel": ["DIM8", "RL12", "RL4"],
+                "nao_dimerizavel": ["RL12", "RL4", "DIM8"]
+            },
+            "persiana": ["LX4"],
+            "hvac": ["SA1"]
+        }
+
+        vinculacoes_criadas = 0
+        erros = []
+
+        # CORREÇÃO: Função para calcular corrente considerando tensão de 120V
+        def calcular_corrente(potencia):
+            if not potencia or potencia <= 0:
+                return 0
+            # CORREÇÃO: Usar 120V conforme seus circuitos
+            return potencia / 120
+
+        # CORREÇÃO: Função para calcular corrente total do grupo considerando vinculações existentes E pendentes
+        def calcular_corrente_grupo(modulo_id, canais_grupo):
+            # Corrente das vinculações existentes no banco
+            vinculacoes_existentes = Vinculacao.query.filter_by(modulo_id=modulo_id).filter(
+                Vinculacao.canal.in_(canais_grupo)
+            ).all()
+            corrente_existente = sum(calcular_corrente(v.circuito.potencia) for v in vinculacoes_existentes)
+
+            # Corrente das vinculações pendentes (na sessão atual)
+            corrente_pendente = 0
+            for obj in db.session.new:
+                if (isinstance(obj, Vinculacao) and 
+                    obj.modulo_id == modulo_id and 
+                    obj.canal in canais_grupo):
+                    circuito = Circuito.query.get(obj.circuito_id)
+                    if circuito:
+                        corrente_pendente += calcular_corrente(circuito.potencia)
+
+            return corrente_existente + corrente_pendente
+
+        # Para cada módulo, obter canais disponíveis
+        modulos_com_info = []
+        for modulo in modulos_disponiveis:
+            # Obter canais ocupados para este módulo
+            vinculacoes_modulo = Vinculacao.query.filter_by(modulo_id=modulo.id).all()
+            canais_ocupados = [v.canal for v in vinculacoes_modulo]
+            
+            # Contar circuitos por ambiente neste módulo
+            ambientes_no_modulo = {}
+            for v in vinculacoes_modulo:
+                ambiente_id = v.circuito.ambiente_id
+                ambientes_no_modulo[ambiente_id] = ambientes_no_modulo.get(ambiente_id, 0) + 1
+            
+            canais_disponiveis = [
+                i for i in range(1, (modulo.quantidade_canais or 0) + 1) 
+                if i not in canais_ocupados
+            ]
+            
+            modulos_com_info.append({
+                "modulo": modulo,
+                "canais_disponiveis": canais_disponiveis,
+                "ambientes": ambientes_no_modulo,
+                "vinculacoes_pendentes": []  # Para trackear vinculações sendo criadas
+            })
+
+        # Agrupar circuitos por ambiente
+        circuitos_por_ambiente = {}
+        for circuito in circuitos_nao_vinculados:
+            ambiente_id = circuito.ambiente_id
+            if ambiente_id not in circuitos_por_ambiente:
+                circuitos_por_ambiente[ambiente_id] = []
+            circuitos_por_ambiente[ambiente_id].append(circuito)
+
+        # Ordenar ambientes por quantidade de circuitos
+        ambientes_ordenados = sorted(circuitos_por_ambiente.keys(), 
+                                   key=lambda a: len(circuitos_por_ambiente[a]), reverse=True)
+
+        # Processar cada ambiente
+        for ambiente_id in ambientes_ordenados:
+            circuitos_ambiente = circuitos_por_ambiente[ambiente_id]
+            
+            # Ordenar circuitos: dimerizáveis primeiro
+            circuitos_ordenados = sorted(circuitos_ambiente, 
+                                       key=lambda c: (not c.dimerizavel, c.tipo))
+            
+            for circuito in circuitos_ordenados:
+                # Determinar módulos compatíveis
+                if circuito.tipo == "luz":
+                    if circuito.dimerizavel:
+                        modulos_compativeis_tipos = prioridades["luz"]["dimerizavel"]
+                    else:
+                        modulos_compativeis_tipos = prioridades["luz"]["nao_dimerizavel"]
+                else:
+                    modulos_compativeis_tipos = prioridades.get(circuito.tipo, [])
+                
+                # Filtrar módulos compatíveis
+                modulos_compatíveis = [
+                    m for m in modulos_com_info 
+                    if m["modulo"].tipo in modulos_compativeis_tipos
+                    and m["canais_disponiveis"]
+                ]
+
+                if not modulos_compatíveis:
+                    erros.append(f"Nenhum módulo compatível disponível para circuito {circuito.identificador} ({circuito.tipo}{' - dimerizável' if circuito.dimerizavel else ''})")
+                    continue
+
+                # Calcular score para cada módulo compatível
+                for modulo_info in modulos_compatíveis:
+                    # Pontuar por ambiente
+                    score_ambiente = modulo_info["ambientes"].get(ambiente_id, 0) * 10
+                    # Pontuar por canais disponíveis
+                    score_canais = len(modulo_info["canais_disponiveis"])
+                    # Pontuar por prioridade do tipo
+                    tipo_modulo = modulo_info["modulo"].tipo
+                    prioridade_tipo = modulos_compativeis_tipos.index(tipo_modulo) if tipo_modulo in modulos_compativeis_tipos else 999
+                    score_prioridade = (len(modulos_compativeis_tipos) - prioridade_tipo) * 5
+                    
+                    # Penalizar DIM8 para circuitos não-dimerizáveis
+                    if circuito.tipo == "luz" and not circuito.dimerizavel and tipo_modulo == "DIM8":
+                        score_prioridade = -100
+                    
+                    modulo_info["score_agrupamento"] = score_ambiente + score_canais + score_prioridade
+
+                # Ordenar módulos por score
+                modulos_compatíveis.sort(key=lambda m: m["score_agrupamento"], reverse=True)
+
+                vinculado = False
+                for modulo_info in modulos_compatíveis:
+                    modulo = modulo_info["modulo"]
+                    canais_disponiveis = modulo_info["canais_disponiveis"]
+
+                    # Tentar cada canal disponível
+                    for canal in canais_disponiveis[:]:
+                        try:
+                            # CORREÇÃO: Calcular corrente com tensão correta
+                            corrente_circuito = calcular_corrente(circuito.potencia)
+                            
+                            # Verificar restrições elétricas
+                            especificacao = ESPECIFICACOES_MODULOS.get(modulo.tipo)
+                            if especificacao:
+                                # Verificar corrente por canal individual
+                                if corrente_circuito > especificacao["correntePorCanal"]:
+                                    erros.append(f"Circuito {circuito.identificador} excede corrente do canal ({corrente_circuito:.2f}A > {especificacao['correntePorCanal']}A)")
+                                    continue
+
+                                # CORREÇÃO: Verificação rigorosa do grupo
+                                grupo = next((g for g in especificacao["grupos"] if canal in g["canais"]), None)
+                                if grupo:
+                                    # Calcular corrente total do grupo (existente + pendente + atual)
+                                    corrente_total_grupo = calcular_corrente_grupo(modulo.id, grupo["canais"])
+                                    corrente_total_grupo += corrente_circuito
+
+                                    if corrente_total_grupo > grupo["maxCorrente"]:
+                                        erros.append(f"Circuito {circuito.identificador} excede corrente do grupo ({corrente_total_grupo:.2f}A > {grupo['maxCorrente']}A) no módulo {modulo.nome}")
+                                        continue
+
+                            # Se passou em todas as verificações, criar vinculação
+                            vinculacao = Vinculacao(
+                                circuito_id=circuito.id,
+                                modulo_id=modulo.id,
+                                canal=canal
+                            )
+                            db.session.add(vinculacao)
+                            
+                            # CORREÇÃO: Adicionar à lista de pendentes para cálculos futuros
+                            modulo_info["vinculacoes_pendentes"].append({
+                                "canal": canal,
+                                "corrente": corrente_circuito
+                            })
+                            
+                            vinculacoes_criadas += 1
+                            vinculado = True
+                            
+                            # Atualizar informações do módulo
+                            modulo_info["canais_disponiveis"].remove(canal)
+                            modulo_info["ambientes"][ambiente_id] = modulo_info["ambientes"].get(ambiente_id, 0) + 1
+                            
+                            print(f"Vinculado: {circuito.identificador} -> {modulo.nome} (canal {canal}) - {corrente_circuito:.2f}A")
+                            break
+
+                        except Exception as e:
+                            erros.append(f"Erro ao vincular circuito {circuito.identificador} no canal {canal}: {str(e)}")
+                            continue
+
+                    if vinculado:
+                        break
+
+                if not vinculado:
+                    erros.append(f"Não foi possível vincular circuito {circuito.identificador} - restrições elétricas ou nenhum canal livre compatível")
+
+        db.session.commit()
+        
+        # Log detalhado
+        print(f"=== RESUMO VINCULAÇÃO AUTOMÁTICA ===")
+        print(f"Vinculações criadas: {vinculacoes_criadas}")
+        print(f"Erros: {len(erros)}")
+        
+        # CORREÇÃO: Log de distribuição por módulo
+        for modulo_info in modulos_com_info:
+            modulo = modulo_info["modulo"]
+            especificacao = ESPECIFICACOES_MODULOS.get(modulo.tipo)
+            if especificacao:
+                print(f"\nMódulo {modulo.nome} ({modulo.tipo}):")
+                for grupo in especificacao["grupos"]:
+                    corrente_grupo = calcular_corrente_grupo(modulo.id, grupo["canais"])
+                    print(f"  Grupo {grupo['canais']}: {corrente_grupo:.2f}A / {grupo['maxCorrente']}A")
+        
+        for erro in erros:
+            print(f"Erro: {erro}")
+        print(f"=====================================")
+            
+        return jsonify({
+            "ok": True,
+            "vinculacoes_criadas": vinculacoes_criadas,
+            "erros": erros,
+            "total_erros": len(erros),
+            "message": f"Vinculação automática concluída: {vinculacoes_criadas} vinculações criadas"
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"Erro na vinculação automática: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            "ok": False,
+            "error": f"Erro ao realizar vinculação automática: {str(e)}"
+        }), 500
+
+@bp.delete("/api/vinculacoes/<int:vinc_id>")
+@login_required
+def api_vinculacoes_delete(vinc_id):
+    v = db.get_or_404(Vinculacao, vinc_id)
+
+    # segurança: precisa pertencer ao projeto atual
+    projeto_id = session.get("projeto_atual_id")
+    if not v.modulo or v.modulo.projeto_id != projeto_id:
+        return jsonify({"ok": False, "error": "Vinculação não pertence ao projeto atual."}), 400
+
+    db.session.delete(v)
+    db.session.commit()
+    return jsonify({"ok": True})
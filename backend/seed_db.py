@@ -2,10 +2,17 @@
 """
 Script para popular o banco de dados com dados de exemplo
 Execute: python seed_db.py
+
+Projetos sintéticos parametrizados (benchmark), reproduzíveis pela semente:
+    python seed_db.py gerar --projetos 20 --areas 4 --ambientes 6 --seed 42
+    INSTANCE_PATH=/tmp/carga python seed_db.py gerar ...   (outro banco)
+python seed_db.py gerar --help lista os parâmetros.
 """
 
+import argparse
 import os
 import sys
+import time
 from datetime import datetime
 
 # Adiciona o diretório atual ao path para importar os módulos
@@ -212,5 +219,98 @@ def seed_database():
     
     return True
 
+def _faixa(texto):
+    """"4-10" -> (4, 10); "6" -> (6, 6)."""
+    minimo, _, maximo = texto.partition("-")
+    return int(minimo), int(maximo or minimo)
+
+
+def _pesos(texto):
+    """"luz=0.7,persiana=0.2" -> {"luz": 0.7, "persiana": 0.2}."""
+    pares = (item.split("=") for item in texto.split(",") if item)
+    return {chave.strip(): float(valor) for chave, valor in pares}
+
+
+def gerar_sinteticos(args):
+    """Grava `args.projetos` projetos sintéticos, um commit por projeto."""
+    from gerador_projetos import gerar_projeto
+
+    parametros = {
+        "areas": args.areas,
+        "ambientes_por_area": args.ambientes,
+        "circuitos_por_ambiente": _faixa(args.circuitos),
+        "tipos": _pesos(args.tipos),
+        "dimerizaveis": args.dimerizaveis,
+        "quadros": args.quadros,
+        "modulos_por_quadro": args.modulos_por_quadro,
+        "vinculados": args.vinculados,
+        "keypads_por_ambiente": args.keypads,
+        "botoes": {int(k): v for k, v in _pesos(args.botoes).items()},
+        "cenas_por_ambiente": args.cenas,
+        "acoes_por_cena": _faixa(args.acoes),
+        "grupos": args.grupos,
+    }
+    with app.app_context():
+        admin_user = User.query.filter_by(username='admin').first()
+        if not admin_user:
+            admin_user = User(username='admin', email='admin@empresa.com', role='admin')
+            admin_user.set_password('admin123')
+            db.session.add(admin_user)
+            db.session.commit()
+
+        totais = {}
+        inicio = time.perf_counter()
+        for i in range(args.projetos):
+            nome = f"{args.prefixo} {i + 1:03d}"
+            try:
+                resultado = gerar_projeto(nome, admin_user.id, semente=args.seed, **parametros)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Erro ao gerar {nome}: {e}")
+                return False
+            for chave, valor in resultado.items():
+                if chave not in ("projeto_id", "nome"):
+                    totais[chave] = totais.get(chave, 0) + valor
+            print(f"✓ {resultado['nome']} (id {resultado['projeto_id']}): {resultado['circuitos']} circuitos, "
+                  f"{resultado['modulos']} módulos, {resultado['keypads']} keypads, {resultado['cenas']} cenas")
+
+        decorrido = time.perf_counter() - inicio
+        print(f"\n{args.projetos} projetos em {decorrido:.2f} s ({app.instance_path}/projetos.db):")
+        for chave, valor in totais.items():
+            print(f"- {valor} {chave}")
+    return True
+
+
+def _parser():
+    parser = argparse.ArgumentParser(description="Popula o banco com dados de exemplo.")
+    sub = parser.add_subparsers(dest="comando")
+    g = sub.add_parser("gerar", help="projetos sintéticos parametrizados",
+                       formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    g.add_argument("--projetos", type=int, default=1)
+    g.add_argument("--seed", type=int, default=0, help="mesma semente e parâmetros, mesmo conteúdo")
+    g.add_argument("--prefixo", default="Sintético", help="nome dos projetos: '<prefixo> 001', ...")
+    g.add_argument("--areas", type=int, default=3)
+    g.add_argument("--ambientes", type=int, default=4, help="ambientes por área")
+    g.add_argument("--circuitos", default="4-10", help="circuitos por ambiente (mín-máx)")
+    g.add_argument("--tipos", default="luz=0.7,persiana=0.2,hvac=0.1", help="pesos dos tipos de circuito")
+    g.add_argument("--dimerizaveis", type=float, default=0.4, help="fração das luzes dimerizáveis")
+    g.add_argument("--quadros", type=int, default=1, help="mínimo de quadros elétricos")
+    g.add_argument("--modulos-por-quadro", type=int, default=16)
+    g.add_argument("--vinculados", type=float, default=1.0,
+                   help="fração dos circuitos já vinculada (0 para testar a vinculação automática)")
+    g.add_argument("--keypads", type=int, default=1, help="keypads por ambiente")
+    g.add_argument("--botoes", default="4=0.6,2=0.3,1=0.1", help="pesos da quantidade de teclas")
+    g.add_argument("--cenas", type=int, default=2, help="cenas por ambiente")
+    g.add_argument("--acoes", default="2-6", help="ações por cena (mín-máx)")
+    g.add_argument("--grupos", type=float, default=0.1, help="fração das ações que é de grupo")
+    return parser
+
+
 if __name__ == '__main__':
-    seed_database()
\ No newline at end of file
+    args = _parser().parse_args()
+    if args.comando == "gerar":
+        ok = gerar_sinteticos(args)
+    else:
+        ok = seed_database()
+    sys.exit(0 if ok else 1)
\ No newline at end of file
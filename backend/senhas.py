@@ -0,0 +1,60 @@
+# senhas.py
+"""
+Hash de senha com algoritmo e custo definidos nas opções do add-on.
+
+password_hash_method escolhe scrypt ou pbkdf2 (sha256). Cada algoritmo tem a
+própria opção de custo, para que trocar o método não reaproveite um número com
+outro significado: password_scrypt_cost é log2(N), de 10 a 17 (o Werkzeug não
+limita a memória do scrypt, e N = 2^17 com r = 8 já usa 128 MiB por hash), e
+password_pbkdf2_iterations vai de 100 000 a 10 000 000. Os padrões são os do
+Werkzeug (scrypt:32768:8:1, pbkdf2:sha256:1000000); valores fora da faixa são
+registrados no log e trocados pelo padrão. Em hosts ARM um custo menor reduz o
+CPU de cada login. Hashes gravados com outros parâmetros continuam válidos e são
+regravados no próximo login bem-sucedido (ver `precisa_rehash`).
+"""
+import logging
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from addon_options import PADROES, opcao
+
+# opção -> (mínimo, máximo)
+FAIXAS = {
+    "password_scrypt_cost": (10, 17),
+    "password_pbkdf2_iterations": (100_000, 10_000_000),
+}
+
+logger = logging.getLogger(__name__)
+
+_avisados = set()
+
+
+def _custo(nome):
+    valor = opcao(nome)
+    minimo, maximo = FAIXAS[nome]
+    if isinstance(valor, int) and minimo <= valor <= maximo:
+        return valor
+    if nome not in _avisados:
+        _avisados.add(nome)
+        logger.warning("%s=%r fora da faixa %d-%d; usando %d", nome, valor, minimo, maximo, PADROES[nome])
+    return PADROES[nome]
+
+
+def metodo_hash():
+    """String de método do Werkzeug, no formato que ele grava no início do hash."""
+    if opcao("password_hash_method") == "pbkdf2":
+        return f"pbkdf2:sha256:{_custo('password_pbkdf2_iterations')}"
+    return f"scrypt:{2 ** _custo('password_scrypt_cost')}:8:1"
+
+
+def gerar_hash(senha):
+    return generate_password_hash(senha, method=metodo_hash())
+
+
+def conferir(hash_gravado, senha):
+    return bool(hash_gravado) and check_password_hash(hash_gravado, senha)
+
+
+def precisa_rehash(hash_gravado):
+    """True se o hash foi gerado com algoritmo/custo diferentes dos configurados."""
+    return not hash_gravado or hash_gravado.split("$", 1)[0] != metodo_hash()
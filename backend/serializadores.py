@@ -0,0 +1,168 @@
+# serializadores.py
+"""
+Payloads de keypads e cenas montados a partir de consultas por coluna.
+
+Em vez de carregar Keypad/KeypadButton/Cena/Acao e navegar pelos
+relacionamentos, cada função faz uma consulta por nível (keypads e botões;
+cenas, ações e ações customizadas) só com as colunas do payload e agrupa as
+linhas em Python, sem instanciar objetos do ORM. O formato é o mesmo de
+serialize_keypad e serialize_cena (rotas/keypads.py e rotas/cenas.py), que continuam servindo para um
+objeto isolado (ex.: resposta de create/update).
+"""
+from collections import defaultdict
+
+from sqlalchemy import select
+
+from database import db, Area, Ambiente, Circuito, Keypad, KeypadButton, Cena, Acao, CustomAcao
+
+
+def _botoes_por_keypad(*filtro):
+    linhas = db.session.execute(
+        select(
+            KeypadButton.keypad_id, KeypadButton.id, KeypadButton.ordem, KeypadButton.guid,
+            KeypadButton.engraver_text, KeypadButton.icon, KeypadButton.modo,
+            KeypadButton.command_on, KeypadButton.command_off, KeypadButton.can_hold,
+            KeypadButton.is_rocker, KeypadButton.rocker_style, KeypadButton.modo_double_press,
+            KeypadButton.command_double_press, KeypadButton.target_object_guid,
+            Circuito.id, Circuito.identificador, Circuito.nome, Circuito.tipo,
+            Cena.id, Cena.nome,
+        )
+        .join(Keypad, KeypadButton.keypad_id == Keypad.id)
+        .outerjoin(Circuito, KeypadButton.circuito_id == Circuito.id)
+        .outerjoin(Cena, KeypadButton.cena_id == Cena.id)
+        .where(*filtro)
+        .order_by(KeypadButton.keypad_id, KeypadButton.ordem)
+    )
+    botoes = defaultdict(list)
+    for (keypad_id, id_, ordem, guid, engraver_text, icon, modo, command_on, command_off, can_hold,
+         is_rocker, rocker_style, modo_double_press, command_double_press, target_object_guid,
+         circuito_id, identificador, circuito_nome, tipo, cena_id, cena_nome) in linhas:
+        botoes[keypad_id].append({
+            "id": id_,
+            "ordem": ordem,
+            "guid": guid,
+            "engraver_text": engraver_text,
+            "icon": icon,
+            "modo": modo,
+            "command_on": command_on,
+            "command_off": command_off,
+            "can_hold": can_hold,
+            "is_rocker": is_rocker,
+            "rocker_style": rocker_style,
+            "modo_double_press": modo_double_press,
+            "command_double_press": command_double_press,
+            "target_object_guid": target_object_guid,
+            "circuito_id": circuito_id,
+            "circuito": {
+                "id": circuito_id,
+                "identificador": identificador,
+                "nome": circuito_nome,
+                "tipo": tipo,
+            } if circuito_id is not None else None,
+            "cena_id": cena_id,
+            "cena": {"id": cena_id, "nome": cena_nome} if cena_id is not None else None,
+        })
+    return botoes
+
+
+def keypads_serializados(*filtro):
+    """Keypads que atendem `filtro` (colunas de Keypad), ordenados por ambiente, nome e id."""
+    linhas = db.session.execute(
+        select(
+            Keypad.id, Keypad.nome, Keypad.modelo, Keypad.color, Keypad.button_color,
+            Keypad.button_count, Keypad.hsnet, Keypad.dev_id, Keypad.notes,
+            Ambiente.id, Ambiente.nome, Area.id, Area.nome,
+        )
+        .join(Ambiente, Keypad.ambiente_id == Ambiente.id)
+        .join(Area, Ambiente.area_id == Area.id)
+        .where(*filtro)
+        .order_by(Ambiente.nome.asc(), Keypad.nome.asc(), Keypad.id.asc())
+    ).all()
+    botoes = _botoes_por_keypad(*filtro)
+    return [
+        {
+            "id": id_,
+            "nome": nome,
+            "modelo": modelo,
+            "color": color,
+            "button_color": button_color,
+            "button_count": button_count,
+            "hsnet": hsnet,
+            "dev_id": dev_id,
+            "notes": notes,
+            "ambiente": {
+                "id": ambiente_id,
+                "nome": ambiente_nome,
+                "area": {"id": area_id, "nome": area_nome},
+            },
+            "buttons": botoes.get(id_, []),
+        }
+        for (id_, nome, modelo, color, button_color, button_count, hsnet, dev_id, notes,
+             ambiente_id, ambiente_nome, area_id, area_nome) in linhas
+    ]
+
+
+def _acoes_por_cena(*filtro):
+    customs = defaultdict(list)
+    for acao_id, id_, target_guid, enable, level in db.session.execute(
+        select(CustomAcao.acao_id, CustomAcao.id, CustomAcao.target_guid, CustomAcao.enable, CustomAcao.level)
+        .join(Acao, CustomAcao.acao_id == Acao.id)
+        .join(Cena, Acao.cena_id == Cena.id)
+        .where(*filtro)
+        .order_by(CustomAcao.id)
+    ):
+        customs[acao_id].append({"id": id_, "target_guid": target_guid, "enable": enable, "level": level})
+
+    acoes = defaultdict(list)
+    for cena_id, id_, level, action_type, target_guid in db.session.execute(
+        select(Acao.cena_id, Acao.id, Acao.level, Acao.action_type, Acao.target_guid)
+        .join(Cena, Acao.cena_id == Cena.id)
+        .where(*filtro)
+        .order_by(Acao.id)
+    ):
+        acoes[cena_id].append({
+            "id": id_,
+            "level": level,
+            "action_type": action_type,
+            "target_guid": target_guid,
+            "custom_acoes": customs.get(id_, []),
+        })
+    return acoes
+
+
+def cenas_serializadas(*filtro, ordem=(Cena.id,), com_ambiente=False):
+    """
+    Cenas que atendem `filtro` (colunas de Cena), na `ordem` dada.
+
+    Com `com_ambiente`, cada cena leva também {"ambiente": {..., "area": {...}}},
+    como em /api/cenas.
+    """
+    linhas = db.session.execute(
+        select(
+            Cena.id, Cena.guid, Cena.nome, Cena.ambiente_id, Cena.scene_movers,
+            Ambiente.nome, Area.id, Area.nome,
+        )
+        .join(Ambiente, Cena.ambiente_id == Ambiente.id)
+        .join(Area, Ambiente.area_id == Area.id)
+        .where(*filtro)
+        .order_by(*ordem)
+    ).all()
+    acoes = _acoes_por_cena(*filtro)
+    cenas = []
+    for id_, guid, nome, ambiente_id, scene_movers, ambiente_nome, area_id, area_nome in linhas:
+        cena = {
+            "id": id_,
+            "guid": guid,
+            "nome": nome,
+            "ambiente_id": ambiente_id,
+            "scene_movers": scene_movers,
+            "acoes": acoes.get(id_, []),
+        }
+        if com_ambiente:
+            cena["ambiente"] = {
+                "id": ambiente_id,
+                "nome": ambiente_nome,
+                "area": {"id": area_id, "nome": area_nome},
+            }
+        cenas.append(cena)
+    return cenas
@@ -567,7 +567,9 @@ export default function Projeto() {
                           </div>
                         </div>
                         <div className="grid grid-cols-1 md:grid-cols-3 gap-3 mt-3">
-                          <div className="md:col-span-3">
+                          <div className="md:col-span-3 flex items-center space-x-2">
+                            <input type="checkbox" id="formato_zip" name="formato" value="zip" />
+                            <Label htmlFor="formato_zip">Baixar compactado (.zip)</Label>
                           </div>
                         </div>
                       </section>